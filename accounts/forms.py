@@ -3,6 +3,7 @@ from django.contrib.auth.models import User
 from django.contrib.auth.forms import UserCreationForm
 from django.core.exceptions import ValidationError
 from .models import UserProfile, Employee, Role, Permission, EmployeePermission
+from graduates.phones import normalize_phone
 import random
 import string
 
@@ -134,6 +135,12 @@ class EmployeeForm(forms.ModelForm):
         if Employee.objects.filter(employee_id=employee_id).exists() and not self.instance.pk:
             raise ValidationError('رقم الموظف هذا مستخدم بالفعل')
         return employee_id
+    
+    def clean_whatsapp(self):
+        whatsapp = self.cleaned_data.get('whatsapp')
+        if whatsapp and not normalize_phone(whatsapp):
+            raise ValidationError('رقم الواتساب غير صالح')
+        return whatsapp
 
 
 class EmployeeUpdateForm(forms.ModelForm):
@@ -157,6 +164,12 @@ class EmployeeUpdateForm(forms.ModelForm):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.fields['manager'].queryset = Employee.objects.filter(status='active')
+    
+    def clean_whatsapp(self):
+        whatsapp = self.cleaned_data.get('whatsapp')
+        if whatsapp and not normalize_phone(whatsapp):
+            raise ValidationError('رقم الواتساب غير صالح')
+        return whatsapp
 
 
 class EmployeePermissionForm(forms.ModelForm):
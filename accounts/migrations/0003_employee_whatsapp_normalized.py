@@ -0,0 +1,18 @@
+# Generated by Django 5.2.3 on 2026-10-19 05:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_permission_alter_activitylog_options_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='employee',
+            name='whatsapp_normalized',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=16, verbose_name='رقم الواتساب الموحد'),
+        ),
+    ]
@@ -6,6 +6,7 @@ from django.conf import settings
 import random
 import string
 from django.utils import timezone
+from graduates.phones import normalize_phone
 
 # نموذج ملف المستخدم الإضافي
 class UserProfile(models.Model):
@@ -108,6 +109,7 @@ class Employee(models.Model):
     position = models.CharField(max_length=100, verbose_name='المنصب')
     phone = models.CharField(max_length=20, verbose_name='رقم الهاتف')
     whatsapp = models.CharField(max_length=20, blank=True, null=True, verbose_name='رقم الواتساب')
+    whatsapp_normalized = models.CharField(max_length=16, blank=True, default='', db_index=True, editable=False, verbose_name='رقم الواتساب الموحد')
     email = models.EmailField(verbose_name='البريد الإلكتروني')
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='active', verbose_name='الحالة')
     hire_date = models.DateField(verbose_name='تاريخ التعيين')
@@ -123,6 +125,13 @@ class Employee(models.Model):
     def __str__(self):
         return f"{self.user.get_full_name()} - {self.position}"
     
+    def save(self, *args, **kwargs):
+        self.whatsapp_normalized = normalize_phone(self.whatsapp)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'whatsapp' in update_fields:
+            kwargs['update_fields'] = set(update_fields) | {'whatsapp_normalized'}
+        super().save(*args, **kwargs)
+    
     def generate_password(self):
         """توليد كلمة مرور عشوائية"""
         characters = string.ascii_letters + string.digits + "!@#$%^&*"
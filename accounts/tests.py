@@ -0,0 +1,27 @@
+from datetime import date
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+
+from .models import Employee, UserProfile
+
+
+class PhoneNormalizationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('employee', password='x')
+
+    def test_user_profile_create(self):
+        profile = UserProfile.objects.create(user=self.user, phone='0501234567')
+        self.assertEqual(UserProfile.objects.get(user=self.user).pk, profile.pk)
+
+    def test_employee_whatsapp_normalized_on_save(self):
+        employee = Employee.objects.create(
+            user=self.user, employee_id='E1', department='القسم', position='المنصب',
+            phone='0501234567', whatsapp='050 123 4567', email='e@example.com', hire_date=date(2024, 1, 1),
+        )
+        self.assertEqual(employee.whatsapp_normalized, '+966501234567')
+
+        employee.whatsapp = '+44 7911 123456'
+        employee.save(update_fields=['whatsapp'])
+        employee.refresh_from_db()
+        self.assertEqual(employee.whatsapp_normalized, '+447911123456')
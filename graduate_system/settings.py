@@ -195,3 +195,64 @@ EMAIL_TIMEOUT = int(os.environ.get('EMAIL_TIMEOUT', 20))
 
 # Pagination
 PAGINATE_BY = 10
+
+# سجلات إرسال الاستبيانات
+# حجم الدفعة عند كتابة السجلات، وعدد أيام الاحتفاظ بالسجلات التفصيلية قبل تلخيصها وحذفها
+SURVEY_SEND_LOG_BATCH_SIZE = int(os.environ.get('SURVEY_SEND_LOG_BATCH_SIZE', 500))
+SURVEY_SEND_LOG_RETENTION_DAYS = int(os.environ.get('SURVEY_SEND_LOG_RETENTION_DAYS', 90))
+
+# حملات الإرسال
+# عند التعطيل تبقى الحملات في قائمة الانتظار ويشغلها الأمر run_send_campaigns
+SURVEY_CAMPAIGNS_IN_BACKGROUND = os.environ.get('SURVEY_CAMPAIGNS_IN_BACKGROUND', 'True') == 'True'
+SURVEY_CAMPAIGN_CHUNK_SIZE = int(os.environ.get('SURVEY_CAMPAIGN_CHUNK_SIZE', 200))
+# الحملة الجارية التي لم تُحدّث نشاطها خلال هذه المدة (مثلاً بعد إعادة تشغيل
+# العامل أثناء الإرسال في الخلفية) يستأنفها الأمر run_send_campaigns
+SURVEY_CAMPAIGN_STALE_MINUTES = int(os.environ.get('SURVEY_CAMPAIGN_STALE_MINUTES', 15))
+
+# حصص مزودي الإرسال
+# يمكن تعريف عدة حسابات SMTP وأرقام واتساب ليتم التدوير بينها، مثال:
+# SURVEY_EMAIL_ACCOUNTS = [
+#     {'name': 'main', 'host': 'smtp.gmail.com', 'port': 587, 'username': '...', 'password': '...',
+#      'daily_limit': 500, 'per_minute': 20},
+# ]
+# SURVEY_WHATSAPP_NUMBERS = [
+#     {'name': 'main', 'phone_number_id': '...', 'access_token': '...', 'daily_limit': 1000, 'per_minute': 60},
+# ]
+# عند عدم التعريف يُستخدم حساب البريد ورقم الواتساب الحاليان بالحدود الافتراضية
+SURVEY_EMAIL_ACCOUNTS = []
+SURVEY_WHATSAPP_NUMBERS = []
+SURVEY_EMAIL_DEFAULT_LIMITS = {
+    'daily_limit': int(os.environ.get('SURVEY_EMAIL_DAILY_LIMIT', 500)),
+    'per_minute': int(os.environ.get('SURVEY_EMAIL_PER_MINUTE', 20)),
+}
+SURVEY_WHATSAPP_DEFAULT_LIMITS = {
+    'daily_limit': int(os.environ.get('SURVEY_WHATSAPP_DAILY_LIMIT', 1000)),
+    'per_minute': int(os.environ.get('SURVEY_WHATSAPP_PER_MINUTE', 60)),
+}
+# عدد خيوط الإرسال لكل قناة، وتعمل القناتان بالتوازي عند الإرسال بكليهما
+SURVEY_CHANNEL_WORKERS = {
+    'email': int(os.environ.get('SURVEY_EMAIL_WORKERS', 4)),
+    'whatsapp': int(os.environ.get('SURVEY_WHATSAPP_WORKERS', 8)),
+}
+# ساعات الهدوء بالتوقيت المحلي (من، إلى) ولا يتم الإرسال خلالها
+SURVEY_QUIET_HOURS = (22, 7)
+
+# تذكيرات الاستبيانات (يشغلها الأمر send_survey_reminders)
+SURVEY_REMINDER_BATCH_SIZE = int(os.environ.get('SURVEY_REMINDER_BATCH_SIZE', 200))
+
+# الحفظ المؤجل للاستجابات العامة: تُحفظ الاستجابة في جدول انتظار بعملية واحدة
+# ويحولها الأمر flush_survey_submissions إلى استجابات وإجابات على دفعات
+SURVEY_BUFFERED_SUBMISSIONS = os.environ.get('SURVEY_BUFFERED_SUBMISSIONS', 'False') == 'True'
+SURVEY_SUBMISSION_FLUSH_BATCH_SIZE = int(os.environ.get('SURVEY_SUBMISSION_FLUSH_BATCH_SIZE', 1000))
+
+# webhook حالة رسائل الواتساب: سر التطبيق للتحقق من التوقيع ورمز تأكيد الاشتراك
+WHATSAPP_APP_SECRET = os.environ.get('WHATSAPP_APP_SECRET', '')
+WHATSAPP_VERIFY_TOKEN = os.environ.get('WHATSAPP_VERIFY_TOKEN', '')
+
+# أحداث الاستبيانات (فتح الروابط وتتبع البريد) تُكتب في ملفات إلحاق في هذا
+# المجلد ويطبقها الأمر flush_survey_events على قاعدة البيانات دورياً
+SURVEY_EVENTS_DIR = os.environ.get('SURVEY_EVENTS_DIR', str(BASE_DIR / 'var' / 'survey_events'))
+
+# لقطات نتائج الاستبيانات المغلقة يبنيها الأمر build_survey_snapshots دورياً،
+# وخط ملف PDF (TTF يدعم العربية) مرفق افتراضياً مع التطبيق
+SURVEY_PDF_FONT = os.environ.get('SURVEY_PDF_FONT', str(BASE_DIR / 'surveys' / 'fonts' / 'DejaVuSans.ttf'))
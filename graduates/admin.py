@@ -14,7 +14,7 @@ class GraduateAdmin(admin.ModelAdmin):
     ]
     search_fields = [
         'first_name', 'last_name', 'email', 'student_id', 
-        'national_id', 'phone'
+        'national_id', 'phone', 'phone_normalized'
     ]
     readonly_fields = ['created_at', 'updated_at']
     
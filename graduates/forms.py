@@ -1,6 +1,7 @@
 from django import forms
 from django.core.exceptions import ValidationError
 from .models import Graduate, GraduateNote
+from .phones import normalize_phone
 from datetime import date
 
 
@@ -110,6 +111,12 @@ class GraduateForm(forms.ModelForm):
             raise ValidationError('هذا البريد الإلكتروني مستخدم بالفعل')
         return email
     
+    def clean_phone(self):
+        phone = self.cleaned_data.get('phone')
+        if phone and not normalize_phone(phone):
+            raise ValidationError('رقم الهاتف غير صالح')
+        return phone
+    
     def clean_national_id(self):
         national_id = self.cleaned_data.get('national_id')
         if national_id and Graduate.objects.filter(national_id=national_id).exclude(pk=self.instance.pk).exists():
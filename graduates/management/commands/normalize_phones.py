@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+
+from accounts.models import Employee
+from graduates.models import Graduate
+from graduates.phones import normalize_phone
+
+
+class Command(BaseCommand):
+    """
+    توحيد أرقام هواتف الخريجين وأرقام واتساب الموظفين بصيغة E.164 على دفعات،
+    وعرض عدد الأرقام غير الصالحة لمراجعتها.
+    """
+    help = 'توحيد أرقام الهواتف المخزنة والتحقق من صلاحيتها'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument('--show-invalid', action='store_true', help='عرض الأرقام غير الصالحة')
+
+    def handle(self, *args, **options):
+        self._normalize(Graduate, 'phone', 'phone_normalized', 'الخريجين', options)
+        self._normalize(Employee, 'whatsapp', 'whatsapp_normalized', 'الموظفين', options)
+
+    def _normalize(self, model, source, target, label, options):
+        updated = invalid = 0
+        last_id = 0
+        queryset = model.objects.exclude(**{f'{source}__isnull': True}).exclude(**{source: ''}).order_by('pk')
+        while True:
+            rows = list(queryset.filter(pk__gt=last_id).only('pk', source, target)[:options['chunk_size']])
+            if not rows:
+                break
+            changed = []
+            for row in rows:
+                normalized = normalize_phone(getattr(row, source))
+                if not normalized:
+                    invalid += 1
+                    if options['show_invalid']:
+                        self.stdout.write(f'  {label} #{row.pk}: {getattr(row, source)}')
+                if getattr(row, target) != normalized:
+                    setattr(row, target, normalized)
+                    changed.append(row)
+            model.objects.bulk_update(changed, [target])
+            updated += len(changed)
+            last_id = rows[-1].pk
+
+        self.stdout.write(f'{label}: تم تحديث {updated} رقم، وعدد الأرقام غير الصالحة {invalid}.')
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.3 on 2026-10-19 05:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('graduates', '0002_allow_null_fields'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='graduate',
+            name='phone_normalized',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=16, verbose_name='رقم الهاتف الموحد'),
+        ),
+    ]
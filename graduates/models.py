@@ -3,6 +3,8 @@ from django.contrib.auth.models import User
 from django.urls import reverse
 from django.utils import timezone
 
+from .phones import normalize_phone
+
 
 class Graduate(models.Model):
     GENDER_CHOICES = [
@@ -29,6 +31,8 @@ class Graduate(models.Model):
     last_name = models.CharField(max_length=100, verbose_name='اسم العائلة')
     email = models.EmailField(unique=True, verbose_name='البريد الإلكتروني', blank=True, null=True)
     phone = models.CharField(max_length=20, verbose_name='رقم الهاتف', blank=True, null=True)
+    # رقم الهاتف بصيغة E.164، فارغ إذا كان الرقم غير صالح
+    phone_normalized = models.CharField(max_length=16, blank=True, default='', db_index=True, editable=False, verbose_name='رقم الهاتف الموحد')
     national_id = models.CharField(max_length=20, unique=True, verbose_name='رقم الهوية', blank=True, null=True)
     gender = models.CharField(max_length=10, choices=GENDER_CHOICES, verbose_name='الجنس', blank=True, null=True)
     birth_date = models.DateField(verbose_name='تاريخ الميلاد', blank=True, null=True)
@@ -77,6 +81,13 @@ class Graduate(models.Model):
     def __str__(self):
         return f"{self.first_name} {self.last_name} - {self.graduation_year}"
     
+    def save(self, *args, **kwargs):
+        self.phone_normalized = normalize_phone(self.phone)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'phone' in update_fields:
+            kwargs['update_fields'] = set(update_fields) | {'phone_normalized'}
+        super().save(*args, **kwargs)
+    
     def get_absolute_url(self):
         return reverse('graduates:detail', kwargs={'pk': self.pk})
     
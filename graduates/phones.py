@@ -0,0 +1,44 @@
+"""
+Phone Number Normalisation
+توحيد أرقام الهواتف بصيغة E.164 لتخزينها والبحث عنها وإرسال الواتساب إليها
+"""
+
+import re
+
+from django.conf import settings
+
+
+def normalize_phone(value, country_code=None):
+    """
+    تحويل رقم الهاتف إلى صيغة E.164 (مثل +966501234567).
+    يعيد نصاً فارغاً إذا كان الرقم غير صالح.
+
+    - الأرقام المحلية التي تبدأ بـ 0 تُضاف إليها رمز الدولة الافتراضي.
+    - الأرقام التي تبدأ بـ + أو 00 تُعامل كأرقام دولية.
+    - أرقام الدولة الافتراضية يجب أن تكون أرقام جوال (9 أرقام تبدأ بـ 5 للسعودية).
+    """
+    if not value:
+        return ''
+    country_code = country_code or getattr(settings, 'PHONE_DEFAULT_COUNTRY_CODE', '966')
+
+    value = str(value).strip()
+    international = value.startswith('+') or value.startswith('00')
+    digits = re.sub(r'\D', '', value)
+    if value.startswith('00'):
+        digits = digits[2:]
+
+    if not international:
+        if digits.startswith(country_code):
+            pass
+        elif digits.startswith('0'):
+            digits = country_code + digits.lstrip('0')
+        else:
+            digits = country_code + digits
+
+    if not 8 <= len(digits) <= 15 or digits.startswith('0'):
+        return ''
+    if country_code == '966' and digits.startswith('966'):
+        national = digits[3:]
+        if len(national) != 9 or not national.startswith('5'):
+            return ''
+    return '+' + digits
@@ -9,6 +9,7 @@ import json
 import csv
 from .models import Graduate
 from .forms import GraduateForm
+from .phones import normalize_phone
 
 @login_required
 def graduates_home(request):
@@ -39,12 +40,17 @@ def graduate_list(request):
     # البحث
     search_query = request.GET.get('search')
     if search_query:
-        graduates = graduates.filter(
+        search_filter = (
             Q(first_name__icontains=search_query) |
             Q(last_name__icontains=search_query) |
             Q(email__icontains=search_query) |
             Q(phone__icontains=search_query)
         )
+        # البحث برقم هاتف كامل يستخدم الرقم الموحد المفهرس
+        phone = normalize_phone(search_query) if any(c.isdigit() for c in search_query) else ''
+        if phone:
+            search_filter |= Q(phone_normalized=phone)
+        graduates = graduates.filter(search_filter)
     
     # الفلترة حسب التخصص
     major_filter = request.GET.get('major')
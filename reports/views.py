@@ -4,6 +4,7 @@ from django.contrib import messages
 from django.http import JsonResponse, HttpResponse
 from django.views.decorators.http import require_http_methods
 from django.db.models import Count, Q, Avg
+from django.db.models.functions import ExtractMonth, ExtractYear
 from django.utils import timezone
 from datetime import timedelta, datetime
 import json
@@ -15,7 +16,9 @@ from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph,
 from reportlab.lib.styles import getSampleStyleSheet
 from io import BytesIO
 from graduates.models import Graduate
-from surveys.models import Survey, SurveyResponse
+from surveys.counters import counter_totals
+from surveys.models import AnswerTerm, Survey, SurveyResponse
+from surveys.text_analytics import top_terms
 from accounts.models import ActivityLog
 from .models import Report, ScheduledReport
 
@@ -120,24 +123,25 @@ def employment_report(request):
 @login_required
 def survey_report(request):
     """تقرير الاستبيانات"""
-    surveys = Survey.objects.annotate(
-        response_count=Count('responses')
-    ).order_by('-created_at')
+    surveys = Survey.objects.order_by('-created_at')
     
-    # إحصائيات الاستبيانات
+    # إحصائيات الاستبيانات من عدادات كل استبيان في استعلام تجميع واحد
+    totals = counter_totals(active=Count('id', filter=Q(status='active')))
     survey_stats = {
-        'total': surveys.count(),
-        'active': surveys.filter(status='active').count(),
-        'total_responses': SurveyResponse.objects.count(),
-        'avg_responses': round(SurveyResponse.objects.count() / surveys.count() if surveys.count() > 0 else 0, 1),
+        'total': totals['surveys'],
+        'active': totals['active'],
+        'total_responses': totals['responses_received'],
+        'avg_responses': round(totals['responses_received'] / totals['surveys'] if totals['surveys'] else 0, 1),
+        'response_rate': totals['response_rate'],
+        'open_rate': totals['open_rate'],
     }
     
     # أكثر الاستبيانات استجابة
-    top_surveys = surveys.order_by('-response_count')[:5]
+    top_surveys = surveys.order_by('-responses_received')[:5]
     
     # إحصائيات شهرية للاستجابات
-    monthly_responses = SurveyResponse.objects.extra(
-        select={'month': 'MONTH(submitted_at)', 'year': 'YEAR(submitted_at)'}
+    monthly_responses = SurveyResponse.objects.annotate(
+        month=ExtractMonth('submitted_at'), year=ExtractYear('submitted_at')
     ).values('month', 'year').annotate(
         count=Count('id')
     ).order_by('-year', '-month')[:12]
@@ -487,10 +491,14 @@ def graduates_summary(request):
     satisfied_education = SurveyResponse.objects.filter(graduate__in=graduates, answers__answer_text__icontains='راض', answers__question__question_text__icontains='جودة التعليم').count()
     unsatisfied_programs = SurveyResponse.objects.filter(graduate__in=graduates, answers__answer_text__icontains='غير راض', answers__question__question_text__icontains='البرامج').count()
 
-    # أهم 3 اقتراحات (مثال: سؤال نصي في الاستبيان)
-    from django.db.models import Count as DCount
-    suggestions = SurveyResponse.objects.filter(graduate__in=graduates, answers__question__question_text__icontains='اقتراح').values('answers__answer_text').annotate(count=DCount('answers__answer_text')).order_by('-count')[:3]
-    top_suggestions = [{'suggestion': s['answers__answer_text'], 'count': s['count']} for s in suggestions if s['answers__answer_text']]
+    # أهم 3 اقتراحات: أكثر العبارات (أو الكلمات) تكراراً في إجابات أسئلة الاقتراحات من فهرس الكلمات
+    suggestion_terms = AnswerTerm.objects.filter(
+        question__question_text__icontains='اقتراح',
+        answer__response__is_complete=True,
+        answer__response__graduate__in=graduates,
+    )
+    suggestions = top_terms(suggestion_terms, 3, phrases=True) or top_terms(suggestion_terms, 3)
+    top_suggestions = [{'suggestion': s['term'], 'count': s['answers']} for s in suggestions]
 
     context = {
         'graduates': graduates,
@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import Survey, Question, QuestionChoice, SurveyResponse, Answer, SurveyInvitation
+from .models import Survey, Question, QuestionChoice, SurveyResponse, Answer, SurveyInvitation, SuppressedContact, SurveySeries, SeriesQuestion
+from .submissions import delete_responses
 
 
 class QuestionChoiceInline(admin.TabularInline):
@@ -21,6 +22,12 @@ class SurveyAdmin(admin.ModelAdmin):
         ('التوقيت', {
             'fields': ('start_date', 'end_date')
         }),
+        ('التذكيرات', {
+            'fields': ('reminders_enabled', 'reminder_max_count', 'reminder_interval_days')
+        }),
+        ('السلسلة', {
+            'fields': ('series', 'wave_label')
+        }),
         ('معلومات النظام', {
             'fields': ('created_by', 'created_at', 'updated_at'),
             'classes': ('collapse',)
@@ -54,6 +61,13 @@ class SurveyResponseAdmin(admin.ModelAdmin):
     search_fields = ['graduate__first_name', 'graduate__last_name', 'survey__title']
     readonly_fields = ['submitted_at']
 
+    # الحذف عبر delete_responses حتى تُنقص العدادات ويُحدّث إصدار البيانات
+    def delete_model(self, request, obj):
+        delete_responses([obj.pk])
+
+    def delete_queryset(self, request, queryset):
+        delete_responses(list(queryset.values_list('pk', flat=True)))
+
 
 @admin.register(Answer)
 class AnswerAdmin(admin.ModelAdmin):
@@ -76,8 +90,27 @@ class AnswerAdmin(admin.ModelAdmin):
 
 @admin.register(SurveyInvitation)
 class SurveyInvitationAdmin(admin.ModelAdmin):
-    list_display = ['graduate', 'survey', 'status', 'sent_at', 'completed_at']
+    list_display = ['graduate', 'survey', 'status', 'sent_at', 'reminder_count', 'completed_at']
     list_filter = ['status', 'survey', 'sent_at']
     search_fields = ['graduate__first_name', 'graduate__last_name', 'survey__title']
-    readonly_fields = ['invitation_token', 'sent_at', 'opened_at', 'completed_at', 'created_at']
+    readonly_fields = ['invitation_token', 'sent_at', 'opened_at', 'completed_at', 'created_at', 'reminder_count', 'last_reminded_at']
+
 
+@admin.register(SuppressedContact)
+class SuppressedContactAdmin(admin.ModelAdmin):
+    list_display = ['address', 'channel', 'reason', 'created_at']
+    list_filter = ['channel', 'reason', 'created_at']
+    search_fields = ['address', 'detail']
+    readonly_fields = ['created_at']
+
+
+class SeriesQuestionInline(admin.TabularInline):
+    model = SeriesQuestion
+    extra = 0
+
+
+@admin.register(SurveySeries)
+class SurveySeriesAdmin(admin.ModelAdmin):
+    list_display = ['title', 'template_name', 'created_by', 'created_at']
+    search_fields = ['title', 'description']
+    inlines = [SeriesQuestionInline]
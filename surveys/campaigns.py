@@ -0,0 +1,329 @@
+"""
+Survey Send Campaigns
+تشغيل حملات إرسال الاستبيانات على دفعات مع تتبع التقدم لكل قناة
+"""
+
+import logging
+import secrets
+import threading
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.sites.models import Site
+from django.db import close_old_connections, transaction
+from django.db.models import F, Q
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .counters import increment_counters
+from .dispatch import ChannelDispatcher
+from .models import SendCampaign, SurveyInvitation
+from .quotas import QuotaScheduler
+from .segments import RecipientSegment
+from .send_log import SendLogBuffer
+from .suppression import annotate_suppressed
+from .tracking import email_links
+from .whatsapp_service import EmailService
+
+logger = logging.getLogger(__name__)
+
+
+def _chunks(items, size):
+    """تقسيم قائمة إلى أجزاء بحجم ثابت"""
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def create_campaign(survey, graduates=None, user=None, segment=None):
+    """
+    إنشاء حملة إرسال. عند تمرير شريحة تُحفظ مرشحاتها فقط ويتم حلها
+    على دفعات عند التشغيل، أما القوائم الصغيرة المحددة يدوياً فتُجهز مباشرة.
+    """
+    campaign = SendCampaign.objects.create(
+        survey=survey,
+        created_by=user,
+        send_method=survey.send_method,
+        segment_filters=segment.filters if segment is not None else None,
+    )
+
+    if graduates is not None:
+        if hasattr(graduates, 'values_list'):
+            graduate_ids = list(graduates.values_list('pk', flat=True))
+        else:
+            graduate_ids = [graduate.pk for graduate in graduates]
+        queue_recipients(campaign, _chunks(graduate_ids, 1000))
+        SendCampaign.objects.filter(pk=campaign.pk).update(recipients_resolved=True)
+        campaign.refresh_from_db()
+    return campaign
+
+
+def queue_recipients(campaign, id_chunks):
+    """
+    إضافة دفعات من معرفات الخريجين إلى قائمة انتظار الحملة كدعوات معلقة.
+    الدعوات المفتوحة أو المكتملة مسبقاً والدعوات التي تملكها حملة أخرى لم تنته
+    بعد تُحسب كمتخطاة ولا يُعاد إرسالها، والدعوات المضافة للحملة نفسها سابقاً
+    لا تُعد مرتين عند الاستئناف.
+    """
+    survey = campaign.survey
+    owned_elsewhere = Q(campaign__status__in=SendCampaign.ACTIVE_STATUSES)
+    for ids in id_chunks:
+        existing = SurveyInvitation.objects.filter(survey=survey, graduate_id__in=ids)
+        existing_ids = set(existing.values_list('graduate_id', flat=True))
+        already_queued = existing.filter(campaign=campaign).count()
+        others = existing.exclude(campaign=campaign)
+        busy = others.filter(owned_elsewhere).count()
+        others = others.exclude(owned_elsewhere)
+        # الدعوات المفتوحة أو المكتملة تُنقل إلى الحملة دون تغيير حالتها حتى
+        # لا يضيع الفتح من مسار الدعوات، ولا يُعاد إرسالها
+        responded = others.filter(status__in=('opened', 'completed'))
+        completed = responded.update(campaign=campaign) + busy
+        others.exclude(status__in=('opened', 'completed')).update(
+            campaign=campaign, status='pending', pending_channels='',
+        )
+        SurveyInvitation.objects.bulk_create([
+            SurveyInvitation(
+                survey=survey,
+                graduate_id=graduate_id,
+                invitation_token=secrets.token_urlsafe(16),
+                campaign=campaign,
+            )
+            for graduate_id in ids if graduate_id not in existing_ids
+        ], batch_size=1000)
+
+        added = len(ids) - already_queued
+        counters = {}
+        for channel in campaign.channels:
+            counters[f'{channel}_queued'] = F(f'{channel}_queued') + added
+            counters[f'{channel}_skipped'] = F(f'{channel}_skipped') + completed
+        SendCampaign.objects.filter(pk=campaign.pk).update(**counters)
+
+
+class CampaignRunner:
+    """
+    منفذ الحملة: يمر على الدعوات المعلقة بترتيب المعرّف على دفعات،
+    ويرسل عبر القنوات المحددة، ثم يحدّث العدادات بتحديث واحد لكل دفعة.
+    عند انتهاء حصص المزودين أو دخول ساعات الهدوء تتوقف الحملة وتُؤجل
+    إلى النافذة التالية، وتبقى الدعوات المتبقية معلقة بترتيبها.
+    """
+
+    def __init__(self, campaign, chunk_size=None, scheduler=None):
+        self.campaign = campaign
+        self.survey = campaign.survey
+        self.chunk_size = chunk_size or getattr(settings, 'SURVEY_CAMPAIGN_CHUNK_SIZE', 200)
+        self.email_service = EmailService()
+        self.scheduler = scheduler or QuotaScheduler(campaign.channels)
+        self.dispatcher = ChannelDispatcher(self.scheduler)
+        self.domain = Site.objects.get_current().domain
+
+    def run(self, claim_from=('queued',), stale_before=None):
+        """
+        تشغيل الحملة إن لم يكن قد بدأها منفذ آخر. عند تمرير stale_before
+        تُستأنف أيضاً الحملة الجارية التي لم يُسجل لها نشاط منذ ذلك الوقت.
+        """
+        claimable = Q(status__in=claim_from)
+        if stale_before is not None:
+            claimable |= Q(status='running') & (Q(heartbeat_at__lt=stale_before) | Q(heartbeat_at__isnull=True))
+        now = timezone.now()
+        claimed = SendCampaign.objects.filter(claimable, pk=self.campaign.pk).update(
+            status='running',
+            started_at=self.campaign.started_at or now,
+            resume_at=None,
+            heartbeat_at=now,
+        )
+        if not claimed:
+            return False
+
+        try:
+            if not self.campaign.recipients_resolved:
+                segment = RecipientSegment(self.campaign.segment_filters)
+                queue_recipients(self.campaign, segment.iter_id_chunks())
+                SendCampaign.objects.filter(pk=self.campaign.pk).update(recipients_resolved=True)
+
+            with SendLogBuffer() as send_log:
+                last_id = 0
+                while True:
+                    invitations = list(annotate_suppressed(
+                        SurveyInvitation.objects.filter(
+                            campaign=self.campaign, status='pending', id__gt=last_id
+                        ).select_related('graduate').order_by('id'),
+                        'graduate__',
+                    )[:self.chunk_size])
+                    if not invitations:
+                        break
+                    if not self._send_chunk(invitations, send_log):
+                        SendCampaign.objects.filter(pk=self.campaign.pk).update(
+                            status='deferred', resume_at=self.scheduler.resume_at
+                        )
+                        return True
+                    last_id = invitations[-1].id
+        except Exception as e:
+            SendCampaign.objects.filter(pk=self.campaign.pk).update(
+                status='failed', error_message=str(e), finished_at=timezone.now()
+            )
+            raise
+
+        # الدعوات التي خرجت من الانتظار قبل إرسالها (مثل إكمال الخريج للاستبيان
+        # من رابط سابق) تُحسب كمتخطاة حتى يصل تقدم الحملة المكتملة إلى 100%
+        SendCampaign.objects.filter(pk=self.campaign.pk).update(
+            status='completed', finished_at=timezone.now(),
+            **{
+                f'{channel}_skipped': Greatest(F(f'{channel}_queued') - F(f'{channel}_sent') - F(f'{channel}_failed'), 0)
+                for channel in self.campaign.channels
+            },
+        )
+        return True
+
+    def _send_chunk(self, invitations, send_log):
+        """
+        إرسال دفعة من الدعوات عبر مسارات القنوات المتوازية ثم تحديث حالتها
+        وعداداتها دفعة واحدة. يعيد False إذا توقفت الدفعة لعدم توفر حصة إرسال.
+        """
+        channels = self.campaign.channels
+        targets = {
+            invitation.id: [
+                channel for channel in invitation.remaining_channels(channels) if self._contact(channel, invitation)
+            ]
+            for invitation in invitations
+        }
+
+        # الاكتفاء بالدعوات التي تتسع لها الحصة اليومية لكل قناة حتى لا تُرسل
+        # دعوة عبر قناة وتتأجل عبر الأخرى
+        available = self.scheduler.check_window(Counter(
+            channel for invitation in invitations for channel in targets[invitation.id]
+        ))
+        if available is None:
+            return False
+        batch = []
+        used = Counter()
+        for invitation in invitations:
+            if any(used[channel] >= available[channel] for channel in targets[invitation.id]):
+                self.scheduler.resume_at = self.scheduler.next_day(timezone.now())
+                break
+            used.update(targets[invitation.id])
+            batch.append(invitation)
+        completed = len(batch) == len(invitations)
+
+        outcomes = self.dispatcher.dispatch(
+            {
+                channel: [(invitation.id, invitation) for invitation in batch if channel in targets[invitation.id]]
+                for channel in channels
+            },
+            {
+                channel: (lambda invitation, account, channel=channel: self._send(channel, invitation, account))
+                for channel in channels
+            },
+        )
+
+        counts = Counter()
+        reached = 0
+        now = timezone.now()
+        processed = []
+        for invitation in batch:
+            results = outcomes.get(invitation.id, {})
+            if results and all(result[0] == 'deferred' for result in results.values()):
+                # سبقت عملية أخرى إلى الحصة: تبقى الدعوة معلقة للنافذة التالية
+                completed = False
+                continue
+
+            sent = False
+            deferred = []
+            for channel in invitation.remaining_channels(channels):
+                outcome, error, message_id = results.get(channel, ('skipped', '', ''))
+                if outcome == 'deferred':
+                    deferred.append(channel)
+                    continue
+                counts[f'{channel}_{outcome}'] += 1
+                if outcome != 'skipped':
+                    send_log.add(
+                        self.survey, invitation.graduate, channel,
+                        status=outcome, error_message=error, message_id=message_id,
+                    )
+                sent = sent or outcome == 'sent'
+
+            # الخريج يُحسب في total_sent عند أول إرسال فقط ويبقى تاريخ الإرسال الأول
+            if sent and invitation.sent_at is None:
+                invitation.sent_at = now
+                reached += 1
+            invitation.pending_channels = ','.join(deferred)
+            if deferred:
+                # قناة انتهت حصتها بعد الإرسال عبر الأخرى: تبقى الدعوة معلقة لها
+                invitation.status = 'pending'
+                completed = False
+            else:
+                invitation.status = 'sent' if invitation.sent_at else 'failed'
+            processed.append(invitation)
+
+        SurveyInvitation.objects.bulk_update(processed, ['status', 'sent_at', 'pending_channels'])
+        send_log.flush()
+        self._apply_counts(counts, reached)
+        if not completed and self.scheduler.resume_at is None:
+            self.scheduler.resume_at = now
+        return completed
+
+    def _contact(self, channel, invitation):
+        """بيانات التواصل الخاصة بالقناة لدى الخريج ما لم تكن موقوفة"""
+        graduate = invitation.graduate
+        if channel == 'email':
+            return graduate.email if not invitation.email_suppressed else None
+        return graduate.phone_normalized if not invitation.phone_suppressed else None
+
+    def _send(self, channel, invitation, account):
+        """إرسال دعوة واحدة عبر قناة واحدة بالحساب المحدد وإرجاع (النتيجة، رسالة الخطأ، معرّف الرسالة)"""
+        graduate = invitation.graduate
+        if channel == 'email':
+            links = email_links(self.domain, invitation.survey_id, invitation.graduate_id)
+            result = self.email_service.send_invitation_email(
+                self.survey, graduate, links['link'],
+                connection=account.get_connection(), from_email=account.from_email,
+                tracking_pixel_url=links['pixel'],
+            )
+        else:
+            result = account.get_whatsapp_service().send_survey_message(graduate.phone_normalized, self.survey, graduate)
+
+        if result['success']:
+            return 'sent', '', result.get('message_id') or ''
+        return 'failed', result.get('error') or '', ''
+
+    def _apply_counts(self, counts, reached):
+        """تطبيق عدادات الدفعة على الحملة والاستبيان بتحديث F() واحد لكل منهما"""
+        SendCampaign.objects.filter(pk=self.campaign.pk).update(
+            heartbeat_at=timezone.now(), **{key: F(key) + value for key, value in counts.items()}
+        )
+        increment_counters(
+            self.survey.pk, total_sent=reached,
+            email_sent=counts['email_sent'], whatsapp_sent=counts['whatsapp_sent'],
+        )
+
+
+def stale_before():
+    """الحملات الجارية التي لم تُحدّث نشاطها منذ هذا الوقت تُعد متوقفة"""
+    minutes = getattr(settings, 'SURVEY_CAMPAIGN_STALE_MINUTES', 15)
+    return timezone.now() - timedelta(minutes=minutes)
+
+
+def _run_in_thread(campaign_id):
+    try:
+        campaign = SendCampaign.objects.select_related('survey').get(pk=campaign_id)
+        CampaignRunner(campaign).run()
+    except Exception as e:
+        # الخيط في الخلفية لا يعرض الخطأ لأحد: يُسجل في السجلات وعلى الحملة
+        # (إن لم يكن المنفذ قد سجله) بدلاً من بقائها معلقة
+        logger.exception('Send campaign %s failed', campaign_id)
+        SendCampaign.objects.filter(pk=campaign_id, status__in=SendCampaign.ACTIVE_STATUSES).update(
+            status='failed', error_message=str(e), finished_at=timezone.now()
+        )
+    finally:
+        close_old_connections()
+
+
+def start_campaign(campaign):
+    """
+    بدء الحملة في الخلفية حتى يعود المستخدم مباشرة إلى صفحة الاستبيان
+    ويتابع التقدم. عند تعطيل الإرسال في الخلفية تُترك الحملة في قائمة
+    الانتظار لأمر run_send_campaigns.
+    """
+    if not getattr(settings, 'SURVEY_CAMPAIGNS_IN_BACKGROUND', True):
+        return
+    thread = threading.Thread(target=_run_in_thread, args=(campaign.pk,), daemon=True)
+    transaction.on_commit(thread.start)
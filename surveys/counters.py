@@ -0,0 +1,115 @@
+"""
+Survey Counters
+عدادات الاستبيان المخزنة في صفه (المرسل، البريد، الواتساب، الفتح، الاستجابات):
+تُزاد بتحديث F() ذري في مسارات الإرسال والفتح والحفظ، وتُصحح دورياً
+بإعادة حسابها من الجداول في استعلام واحد
+"""
+
+from datetime import datetime, time, timedelta
+
+from django.db.models import Count, F, IntegerField, Max, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Survey, SurveyInvitation, SurveyResponse, SurveySendLog, SurveySendLogDaily
+
+COUNTER_FIELDS = ('total_sent', 'email_sent', 'whatsapp_sent', 'opened_count', 'responses_received')
+
+
+def increment_counters(survey_id, **counts):
+    """زيادة عدادات استبيان واحد بتحديث F() واحد، وتُتجاهل العدادات الصفرية"""
+    counts = {key: value for key, value in counts.items() if value}
+    if counts:
+        Survey.objects.filter(pk=survey_id).update(
+            **{key: F(key) + value for key, value in counts.items()}
+        )
+
+
+def increment_many(counts_by_survey):
+    """زيادة عدادات عدة استبيانات: {معرّف الاستبيان: {العداد: الزيادة}}"""
+    for survey_id, counts in counts_by_survey.items():
+        increment_counters(survey_id, **counts)
+
+
+def _count(queryset, field='id'):
+    """عدد صفوف الجدول المرتبطة بالاستبيان كاستعلام فرعي"""
+    return Coalesce(Subquery(
+        queryset.filter(survey=OuterRef('pk')).order_by().values('survey')
+        .annotate(total=Count(field)).values('total'),
+        output_field=IntegerField(),
+    ), Value(0))
+
+
+def _rollup(send_method):
+    """مجموع الرسائل الناجحة في الملخصات اليومية للسجلات المضغوطة"""
+    return Coalesce(Subquery(
+        SurveySendLogDaily.objects.filter(survey=OuterRef('pk'), send_method=send_method)
+        .exclude(status='failed').order_by().values('survey')
+        .annotate(total=Sum('count')).values('total'),
+        output_field=IntegerField(),
+    ), Value(0))
+
+
+def actual_counters(queryset=None):
+    """
+    الاستبيانات مع قيمها الفعلية محسوبة من الجداول في استعلام واحد:
+    الدعوات المرسلة والمفتوحة، الرسائل الناجحة لكل قناة (السجلات
+    والملخصات اليومية)، والاستجابات المكتملة.
+    """
+    queryset = Survey.objects.all() if queryset is None else queryset
+    successful = SurveySendLog.objects.exclude(status='failed')
+    # الأيام الملخصة تبقى سجلاتها التفصيلية حتى انتهاء فترة الاحتفاظ، فتُعد
+    # من الملخص فقط وتُعد السجلات التفصيلية للأيام التي بعده
+    last_day = SurveySendLogDaily.objects.aggregate(last_day=Max('day'))['last_day']
+    if last_day:
+        successful = successful.filter(sent_at__gte=timezone.make_aware(
+            datetime.combine(last_day + timedelta(days=1), time.min)
+        ))
+    return queryset.annotate(
+        actual_total_sent=_count(SurveyInvitation.objects.filter(sent_at__isnull=False)),
+        actual_opened_count=_count(SurveyInvitation.objects.filter(opened_at__isnull=False)),
+        actual_email_sent=_count(successful.filter(send_method='email')) + _rollup('email'),
+        actual_whatsapp_sent=_count(successful.filter(send_method='whatsapp')) + _rollup('whatsapp'),
+        actual_responses_received=_count(SurveyResponse.objects.filter(is_complete=True)),
+    ).only('id', *COUNTER_FIELDS)
+
+
+def reconcile_counters(queryset=None, dry_run=False):
+    """
+    مقارنة العدادات المخزنة بالقيم الفعلية وتصحيح المختلف منها بـ bulk_update.
+    يعيد قائمة من (الاستبيان، {العداد: (المخزن، الفعلي)}) للاستبيانات المختلفة.
+    """
+    drifted = []
+    for survey in actual_counters(queryset):
+        changes = {}
+        for field in COUNTER_FIELDS:
+            stored, actual = getattr(survey, field), getattr(survey, f'actual_{field}')
+            if stored != actual:
+                changes[field] = (stored, actual)
+                setattr(survey, field, actual)
+        if changes:
+            drifted.append((survey, changes))
+    if drifted and not dry_run:
+        Survey.objects.bulk_update([survey for survey, changes in drifted], list(COUNTER_FIELDS), batch_size=500)
+    return drifted
+
+
+def counter_totals(queryset=None, **extra):
+    """
+    مجاميع العدادات عبر الاستبيانات بعملية aggregate واحدة لصفحات الملخص.
+    extra: تجميعات إضافية تُحسب في نفس الاستعلام.
+    """
+    queryset = Survey.objects.all() if queryset is None else queryset
+    totals = queryset.aggregate(
+        surveys=Count('id'),
+        **{field: Coalesce(Sum(field), 0) for field in COUNTER_FIELDS},
+        **extra,
+    )
+    totals['response_rate'] = rate(totals['responses_received'], totals['total_sent'])
+    totals['open_rate'] = rate(totals['opened_count'], totals['total_sent'])
+    return totals
+
+
+def rate(part, whole):
+    """نسبة مئوية بمنزلة عشرية واحدة"""
+    return round(part / whole * 100, 1) if whole else 0
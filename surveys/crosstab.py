@@ -0,0 +1,251 @@
+"""
+Survey Cross-Tabulation
+توزيع إجابات سؤال حسب صفات الخريجين (الكلية، سنة التخرج، حالة التوظيف...)
+باستعلام مجمع واحد، مع النسب واختبار مربع كاي محسوبة بـ NumPy على مصفوفة
+التوزيع
+"""
+
+import hashlib
+import json
+import math
+
+import numpy as np
+from django.core.cache import cache
+from django.db.models import Avg, Count, StdDev
+
+from graduates.models import Graduate
+from .definitions import get_data_version, get_survey_definition
+from .models import Answer
+
+CROSSTAB_TIMEOUT = 60 * 60
+
+# صفات الخريج المسموح التقسيم والتصفية بها: الاسم ← (الحقل، العنوان)
+DIMENSIONS = {
+    'college': ('college', 'الكلية'),
+    'major': ('major', 'التخصص'),
+    'graduation_year': ('graduation_year', 'سنة التخرج'),
+    'employment_status': ('employment_status', 'حالة التوظيف'),
+    'gender': ('gender', 'الجنس'),
+    'degree': ('degree', 'الدرجة العلمية'),
+    'city': ('city', 'المدينة'),
+}
+MAX_DIMENSIONS = 2
+CHOICE_TYPES = ('radio', 'select', 'checkbox')
+NUMERIC_TYPES = ('number', 'rating')
+
+
+def _upper_gamma_regularized(a, x):
+    """دالة غاما غير المكتملة العليا المنتظمة Q(a, x) لحساب قيمة p لمربع كاي"""
+    if x <= 0:
+        return 1.0
+    if x < a + 1:
+        # متسلسلة P(a, x) ثم Q = 1 - P
+        term = total = 1.0 / a
+        n = a
+        for _ in range(500):
+            n += 1
+            term *= x / n
+            total += term
+            if abs(term) < abs(total) * 1e-12:
+                break
+        return max(0.0, 1.0 - total * math.exp(-x + a * math.log(x) - math.lgamma(a)))
+    # كسر مستمر (Lentz) لـ Q(a, x)
+    tiny = 1e-300
+    b = x + 1 - a
+    c = 1 / tiny
+    d = 1 / b
+    h = d
+    for i in range(1, 500):
+        an = -i * (i - a)
+        b += 2
+        d = an * d + b
+        d = tiny if abs(d) < tiny else d
+        c = b + an / c
+        c = tiny if abs(c) < tiny else c
+        d = 1 / d
+        delta = d * c
+        h *= delta
+        if abs(delta - 1) < 1e-12:
+            break
+    return math.exp(-x + a * math.log(x) - math.lgamma(a)) * h
+
+
+def chi_square(observed):
+    """
+    اختبار الاستقلال لمصفوفة التوزيع: يعيد الإحصائية ودرجات الحرية وقيمة p
+    ومعامل كرامر، بعد حذف الصفوف والأعمدة الفارغة.
+    """
+    observed = observed[observed.sum(axis=1) > 0][:, observed.sum(axis=0) > 0]
+    rows, cols = observed.shape
+    total = observed.sum()
+    if rows < 2 or cols < 2 or total == 0:
+        return None
+    expected = np.outer(observed.sum(axis=1), observed.sum(axis=0)) / total
+    statistic = float(((observed - expected) ** 2 / expected).sum())
+    dof = (rows - 1) * (cols - 1)
+    return {
+        'statistic': round(statistic, 4),
+        'dof': dof,
+        'p_value': round(_upper_gamma_regularized(dof / 2, statistic / 2), 6),
+        'cramers_v': round(math.sqrt(statistic / (total * (min(rows, cols) - 1))), 4),
+        # التقريب غير موثوق إذا قلّ العدد المتوقع عن 5 في أكثر من خمس الخلايا
+        'low_expected': bool((expected < 5).mean() > 0.2),
+    }
+
+
+def _label(dimension, value):
+    field = Graduate._meta.get_field(DIMENSIONS[dimension][0])
+    if value is None or value == '':
+        return 'غير محدد'
+    return dict(field.choices).get(value, value) if field.choices else value
+
+
+class CrossTab:
+    """
+    جدول تقاطعي لسؤال واحد حسب صفة أو صفتين من صفات الخريج:
+    - أسئلة الاختيار: عدد مرات اختيار كل خيار لكل فئة من جدول الخيارات المحددة.
+    - الأسئلة الرقمية والتقييم: العدد والمتوسط والانحراف المعياري لكل فئة.
+    الاستعلام يربط الإجابات بالاستجابات والخريجين مرة واحدة، وتُحفظ النتيجة
+    في الكاش بمفتاح يتضمن إصدار بيانات الاستبيان.
+
+    الاستخدام:
+        CrossTab(survey_id, question_id, ['college'], {'graduation_year': '2023'}).build()
+    """
+
+    def __init__(self, survey_id, question_id, dimensions, filters=None):
+        self.definition = get_survey_definition(survey_id)
+        if self.definition is None:
+            raise ValueError('الاستبيان غير موجود')
+        self.survey_id = self.definition['id']
+        self.question = next(
+            (question for question in self.definition['questions'] if question['id'] == question_id), None
+        )
+        if self.question is None:
+            raise ValueError('السؤال غير موجود في هذا الاستبيان')
+        if self.question['question_type'] not in CHOICE_TYPES + NUMERIC_TYPES:
+            raise ValueError('التقسيم متاح لأسئلة الاختيار والأسئلة الرقمية فقط')
+        if not dimensions or len(dimensions) > MAX_DIMENSIONS:
+            raise ValueError(f'يجب تحديد صفة واحدة إلى {MAX_DIMENSIONS} صفات للتقسيم')
+        unknown = [name for name in list(dimensions) + list(filters or {}) if name not in DIMENSIONS]
+        if unknown:
+            raise ValueError(f'صفات غير معروفة: {", ".join(unknown)}')
+        self.dimensions = list(dimensions)
+        self.filters = {name: value for name, value in (filters or {}).items() if value not in (None, '')}
+
+    def cache_key(self):
+        params = json.dumps([self.question['id'], self.dimensions, sorted(self.filters.items())], default=str)
+        digest = hashlib.md5(params.encode()).hexdigest()
+        return f'survey_crosstab:{self.survey_id}:{get_data_version(self.survey_id)}:{digest}'
+
+    def build(self):
+        key = self.cache_key()
+        result = cache.get(key)
+        if result is None:
+            result = self._compute()
+            cache.set(key, result, CROSSTAB_TIMEOUT)
+        return result
+
+    def _answers(self):
+        lookups = {
+            f'response__graduate__{DIMENSIONS[name][0]}': value for name, value in self.filters.items()
+        }
+        return Answer.objects.filter(
+            question_id=self.question['id'], response__is_complete=True,
+            response__graduate__isnull=False, **lookups,
+        ).order_by()
+
+    def _paths(self, prefix):
+        return [f'{prefix}response__graduate__{DIMENSIONS[name][0]}' for name in self.dimensions]
+
+    def _groups(self, keys):
+        """فئات الصفوف مرتبة مع عناوينها"""
+        groups = sorted(set(keys), key=lambda key: tuple((value is None, str(value)) for value in key))
+        return groups, [
+            ' / '.join(str(_label(name, value)) for name, value in zip(self.dimensions, group))
+            for group in groups
+        ]
+
+    def _compute(self):
+        result = {
+            'survey_id': self.survey_id,
+            'question_id': self.question['id'],
+            'question_text': self.question['question_text'],
+            'question_type': self.question['question_type'],
+            'dimensions': [{'name': name, 'label': DIMENSIONS[name][1]} for name in self.dimensions],
+            'filters': self.filters,
+        }
+        if self.question['question_type'] in CHOICE_TYPES:
+            result.update(self._choice_table())
+        else:
+            result.update(self._numeric_table())
+        return result
+
+    def _choice_table(self):
+        paths = self._paths('answer__')
+        rows = list(
+            Answer.selected_choices.through.objects.filter(answer__in=self._answers())
+            .order_by().values_list(*paths, 'questionchoice_id').annotate(count=Count('id'))
+        )
+        choices = self.question['choices']
+        column = {choice['id']: index for index, choice in enumerate(choices)}
+        groups, labels = self._groups(row[:-2] for row in rows)
+        index = {group: position for position, group in enumerate(groups)}
+
+        observed = np.zeros((len(groups), len(choices)), dtype=np.int64)
+        for *group, choice_id, count in rows:
+            if choice_id in column:
+                observed[index[tuple(group)], column[choice_id]] += count
+
+        row_totals = observed.sum(axis=1)
+        column_totals = observed.sum(axis=0)
+        total = int(observed.sum())
+        with np.errstate(divide='ignore', invalid='ignore'):
+            row_percent = np.nan_to_num(observed / row_totals[:, None] * 100)
+            column_percent = np.nan_to_num(observed / column_totals[None, :] * 100)
+
+        return {
+            'columns': [choice['choice_text'] for choice in choices],
+            'rows': [
+                {
+                    'label': label,
+                    'values': list(group),
+                    'counts': observed[position].tolist(),
+                    'row_percent': np.round(row_percent[position], 1).tolist(),
+                    'column_percent': np.round(column_percent[position], 1).tolist(),
+                    'total': int(row_totals[position]),
+                }
+                for position, (group, label) in enumerate(zip(groups, labels))
+            ],
+            'column_totals': column_totals.tolist(),
+            'column_share': np.round(column_totals / total * 100, 1).tolist() if total else [0] * len(choices),
+            'total': total,
+            'chi_square': chi_square(observed) if total else None,
+        }
+
+    def _numeric_table(self):
+        paths = self._paths('')
+        rows = list(
+            self._answers().filter(answer_number__isnull=False).values_list(*paths)
+            .annotate(count=Count('id'), mean=Avg('answer_number'), stddev=StdDev('answer_number'))
+        )
+        groups, labels = self._groups(row[:-3] for row in rows)
+        by_group = {tuple(row[:-3]): row[-3:] for row in rows}
+        counts = np.array([by_group[group][0] for group in groups], dtype=np.int64)
+        means = np.array([float(by_group[group][1]) for group in groups], dtype=float)
+        total = int(counts.sum())
+        overall = float((counts * means).sum() / total) if total else None
+        return {
+            'rows': [
+                {
+                    'label': label,
+                    'values': list(group),
+                    'count': int(counts[position]),
+                    'mean': round(float(means[position]), 3),
+                    'stddev': round(float(by_group[group][2]), 3) if by_group[group][2] is not None else None,
+                    'difference': round(float(means[position]) - overall, 3) if overall is not None else None,
+                }
+                for position, (group, label) in enumerate(zip(groups, labels))
+            ],
+            'total': total,
+            'overall_mean': round(overall, 3) if overall is not None else None,
+        }
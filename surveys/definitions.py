@@ -0,0 +1,122 @@
+"""
+Cached Survey Definitions
+تعريف الاستبيان (بياناته وأسئلته وخياراتها) مجمعاً في بنية مختصرة محفوظة في الكاش
+لصفحات تعبئة الاستبيان وعرضه. إصدارات التعريف والبيانات في قاعدة البيانات،
+فالنسخة المحفوظة في كاش أي عامل تُهمل بمجرد تعديل الاستبيان من عامل آخر.
+"""
+
+from django.core.cache import cache
+from django.db.models import F, Prefetch
+
+from .models import QuestionChoice, Survey, SurveyCacheVersion
+
+DEFINITION_TIMEOUT = 60 * 60 * 24
+
+
+def _definition_key(survey_id):
+    return f'survey_def:{survey_id}'
+
+
+def get_versions(survey_id):
+    """
+    (إصدار التعريف، إصدار البيانات) من قاعدة البيانات باستعلام واحد بالمفتاح
+    الأساسي، فيتفق جميع العمال عليهما حتى مع كاش محلي لكل عامل.
+    """
+    versions = SurveyCacheVersion.objects.filter(survey_id=survey_id).values_list('definition', 'data').first()
+    return versions or (0, 0)
+
+
+def get_definition_version(survey_id):
+    return get_versions(survey_id)[0]
+
+
+def _bump(survey_id, field):
+    versions = SurveyCacheVersion.objects.filter(survey_id=survey_id)
+    if not versions.update(**{field: F(field) + 1}):
+        SurveyCacheVersion.objects.bulk_create([SurveyCacheVersion(survey_id=survey_id)], ignore_conflicts=True)
+        versions.update(**{field: F(field) + 1})
+
+
+def bump_definition_version(survey_id):
+    """زيادة رقم إصدار التعريف وحذف النسخة المحفوظة بعد أي تعديل على الاستبيان أو أسئلته"""
+    _bump(survey_id, 'definition')
+    cache.delete(_definition_key(survey_id))
+
+
+def forget_versions(survey_id):
+    """حذف إصدارات الاستبيان المحذوف ونسخة تعريفه"""
+    SurveyCacheVersion.objects.filter(survey_id=survey_id).delete()
+    cache.delete(_definition_key(survey_id))
+
+
+def get_data_version(survey_id):
+    """
+    إصدار بيانات الاستبيان لمفاتيح التحليلات المحفوظة في الكاش: يتغير مع
+    كل استجابة محفوظة ومع كل تعديل على الأسئلة.
+    """
+    definition, data = get_versions(survey_id)
+    return f'{definition}.{data}'
+
+
+def bump_data_version(survey_id):
+    """زيادة إصدار البيانات بعد حفظ استجابات جديدة أو حذفها"""
+    _bump(survey_id, 'data')
+
+
+def build_survey_definition(survey_id):
+    """بناء التعريف من قاعدة البيانات باستعلام للاستبيان وآخر للأسئلة مع خياراتها"""
+    survey = (
+        Survey.objects.filter(pk=survey_id)
+        .prefetch_related(Prefetch('questions__choices', queryset=QuestionChoice.objects.order_by('order', 'id')))
+        .first()
+    )
+    if survey is None:
+        return None
+    questions = sorted(survey.questions.all(), key=lambda question: (question.order, question.id))
+    return {
+        'id': survey.id,
+        'pk': survey.id,
+        'title': survey.title,
+        'description': survey.description,
+        'status': survey.status,
+        'start_date': survey.start_date,
+        'end_date': survey.end_date,
+        'org_title': survey.org_title,
+        'google_form_url': survey.google_form_url,
+        'logo_url': survey.logo.url if survey.logo else '',
+        'questions': [
+            {
+                'id': question.id,
+                'pk': question.id,
+                'question_text': question.question_text,
+                'question_type': question.question_type,
+                'is_required': question.is_required,
+                'help_text': question.help_text,
+                'order': question.order,
+                'choices': [
+                    {'id': choice.id, 'pk': choice.id, 'choice_text': choice.choice_text}
+                    for choice in question.choices.all()
+                ],
+            }
+            for question in questions
+        ],
+    }
+
+
+def get_survey_definition(survey_id):
+    """
+    تعريف الاستبيان من الكاش ما دام إصداره مطابقاً لإصدار قاعدة البيانات،
+    أو بناؤه وحفظه. يُقرأ رقم الإصدار قبل البناء وبعده حتى لا تُحفظ نسخة
+    قديمة إذا عُدّل الاستبيان أثناء البناء. يعيد None إذا لم يوجد الاستبيان.
+    """
+    version = get_definition_version(survey_id)
+    definition = cache.get(_definition_key(survey_id))
+    if definition is not None and definition['version'] == version:
+        return definition
+
+    definition = build_survey_definition(survey_id)
+    if definition is not None:
+        definition['version'] = version
+        if get_definition_version(survey_id) == version:
+            cache.set(_definition_key(survey_id), definition, DEFINITION_TIMEOUT)
+    return definition
@@ -0,0 +1,224 @@
+"""
+Survey Digest Sending
+إرسال رسالة واحدة لكل خريج تجمع روابط جميع الاستبيانات المعلقة له
+"""
+
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.contrib.sites.models import Site
+from django.urls import reverse
+from django.utils import timezone
+
+from .counters import increment_many
+from .dispatch import ChannelDispatcher
+from .models import SurveyInvitation
+from .quotas import QuotaScheduler
+from .send_log import SendLogBuffer
+from .suppression import annotate_suppressed
+from .tokens import make_invitation_token
+from .tracking import email_links
+from .whatsapp_service import EmailService
+
+
+class DigestSender:
+    """
+    الإرسال المجمّع: يجمع الدعوات المعلقة لكل خريج عبر الاستبيانات المحددة
+    ويرسل رسالة واحدة بكل الروابط لكل قناة، ثم يحدّث حالة الدعوات وسجلات
+    الإرسال وعدادات كل استبيان دفعة واحدة.
+
+    الدعوات التابعة لحملة لم تنتهِ بعد تُترك للحملة حتى لا تختل عداداتها.
+    """
+
+    ACTIVE_CAMPAIGN_STATUSES = ('queued', 'running', 'deferred')
+
+    def __init__(self, surveys, send_method='email', chunk_size=None):
+        self.surveys = list(surveys)
+        self.channels = ['email', 'whatsapp'] if send_method == 'both' else [send_method]
+        self.chunk_size = chunk_size or getattr(settings, 'SURVEY_CAMPAIGN_CHUNK_SIZE', 200)
+        self.email_service = EmailService()
+        self.scheduler = QuotaScheduler(self.channels)
+        self.dispatcher = ChannelDispatcher(self.scheduler)
+        self.domain = Site.objects.get_current().domain
+        self.resume_at = None
+
+    def pending_invitations(self):
+        """الدعوات المعلقة في الاستبيانات المحددة مع حالة إيقاف عناوين الخريج"""
+        return annotate_suppressed(
+            SurveyInvitation.objects.filter(survey__in=self.surveys, status='pending')
+            .exclude(campaign__status__in=self.ACTIVE_CAMPAIGN_STATUSES),
+            'graduate__',
+        )
+
+    def run(self):
+        """إرسال الرسائل المجمعة على دفعات من الخريجين وإرجاع العدادات"""
+        counts = Counter()
+        pending = self.pending_invitations()
+
+        with SendLogBuffer() as send_log:
+            last_graduate_id = 0
+            while True:
+                graduate_ids = list(
+                    pending.filter(graduate_id__gt=last_graduate_id)
+                    .order_by('graduate_id').values_list('graduate_id', flat=True)
+                    .distinct()[:self.chunk_size]
+                )
+                if not graduate_ids:
+                    break
+
+                groups = defaultdict(list)
+                invitations = (
+                    pending.filter(graduate_id__in=graduate_ids)
+                    .select_related('graduate', 'survey').order_by('graduate_id', 'id')
+                )
+                for invitation in invitations:
+                    groups[invitation.graduate_id].append(invitation)
+
+                if not self._send_groups(list(groups.values()), send_log, counts):
+                    self.resume_at = self.scheduler.resume_at
+                    counts['deferred'] += 1
+                    break
+                last_graduate_id = graduate_ids[-1]
+        return counts
+
+    def _targets(self, invitation):
+        """القنوات المتاحة للخريج (له بيانات تواصل غير موقوفة)"""
+        graduate = invitation.graduate
+        targets = []
+        if 'email' in self.channels and graduate.email and not invitation.email_suppressed:
+            targets.append('email')
+        if 'whatsapp' in self.channels and graduate.phone_normalized and not invitation.phone_suppressed:
+            targets.append('whatsapp')
+        return targets
+
+    def _members(self, group, channel):
+        """دعوات الخريج التي لم تُرسل بعد عبر القناة (بعد تأجيلها سابقاً لانتهاء حصتها)"""
+        return [invitation for invitation in group if channel in invitation.remaining_channels(self.channels)]
+
+    def _send_groups(self, groups, send_log, counts):
+        """
+        إرسال رسالة مجمعة لكل خريج في الدفعة. يعيد False إذا توقفت الدفعة
+        لعدم توفر حصة إرسال، وتبقى دعوات الخريجين غير المرسل لهم معلقة، وكذلك
+        الدعوات التي تأجلت إحدى قناتيها بعد الإرسال عبر الأخرى حتى تُرسل عبرها.
+        """
+        targets = {
+            group[0].graduate_id: [channel for channel in self._targets(group[0]) if self._members(group, channel)]
+            for group in groups
+        }
+        available = self.scheduler.check_window(Counter(
+            channel for channels in targets.values() for channel in channels
+        ))
+        if available is None:
+            return False
+        batch = []
+        used = Counter()
+        for group in groups:
+            channels = targets[group[0].graduate_id]
+            if any(used[channel] >= available[channel] for channel in channels):
+                self.scheduler.resume_at = self.scheduler.next_day(timezone.now())
+                break
+            used.update(channels)
+            batch.append(group)
+        completed = len(batch) == len(groups)
+
+        outcomes = self.dispatcher.dispatch(
+            {
+                channel: [
+                    (group[0].graduate_id, self._members(group, channel))
+                    for group in batch if channel in targets[group[0].graduate_id]
+                ]
+                for channel in self.channels
+            },
+            {
+                channel: (lambda group, account, channel=channel: self._send(channel, group, account))
+                for channel in self.channels
+            },
+        )
+
+        now = timezone.now()
+        processed = []
+        survey_counts = defaultdict(Counter)
+        for group in batch:
+            results = outcomes.get(group[0].graduate_id, {})
+            if results and all(result[0] == 'deferred' for result in results.values()):
+                completed = False
+                continue
+
+            sent = set()
+            deferred = defaultdict(list)
+            for channel, (outcome, error, message_id) in results.items():
+                members = self._members(group, channel)
+                if outcome == 'deferred':
+                    for invitation in members:
+                        deferred[invitation.id].append(channel)
+                    continue
+                counts[f'{channel}_{outcome}'] += 1
+                # سجل لكل استبيان مشمول في الرسالة حتى تبقى سجلات كل استبيان كاملة
+                for invitation in members:
+                    send_log.add(
+                        invitation.survey, invitation.graduate, channel,
+                        status=outcome, error_message=error, message_id=message_id,
+                    )
+                    if outcome == 'sent':
+                        sent.add(invitation.id)
+                        survey_counts[invitation.survey_id][f'{channel}_sent'] += 1
+
+            counts['messages'] += 1 if results else 0
+            for invitation in group:
+                if invitation.id in sent and invitation.sent_at is None:
+                    invitation.sent_at = now
+                    survey_counts[invitation.survey_id]['total_sent'] += 1
+                invitation.pending_channels = ','.join(deferred[invitation.id])
+                if deferred[invitation.id]:
+                    invitation.status = 'pending'
+                    completed = False
+                else:
+                    invitation.status = 'sent' if invitation.sent_at else 'failed'
+                processed.append(invitation)
+            counts['invitations'] += len(group)
+
+        SurveyInvitation.objects.bulk_update(processed, ['status', 'sent_at', 'pending_channels'])
+        send_log.flush()
+        increment_many(survey_counts)
+        return completed
+
+    def _items(self, group, channel):
+        """عناوين وروابط الاستبيانات المشمولة في رسالة الخريج (روابط البريد عبر مسار التتبع)"""
+        items = []
+        for invitation in group:
+            item = {'title': invitation.survey.title, 'description': invitation.survey.description}
+            if channel == 'email':
+                item.update(email_links(self.domain, invitation.survey_id, invitation.graduate_id))
+            else:
+                path = reverse('surveys:take_survey_by_token', args=[
+                    make_invitation_token(invitation.survey_id, invitation.graduate_id)
+                ])
+                item['link'] = f'http://{self.domain}{path}'
+            items.append(item)
+        return items
+
+    def _send(self, channel, group, account):
+        """إرسال الرسالة المجمعة لخريج واحد عبر قناة واحدة"""
+        graduate = group[0].graduate
+        items = self._items(group, channel)
+        if channel == 'email':
+            if len(items) == 1:
+                result = self.email_service.send_invitation_email(
+                    group[0].survey, graduate, items[0]['link'],
+                    connection=account.get_connection(), from_email=account.from_email,
+                    tracking_pixel_url=items[0]['pixel'],
+                )
+            else:
+                result = self.email_service.send_digest_email(
+                    graduate, items, connection=account.get_connection(), from_email=account.from_email,
+                )
+        else:
+            lines = [f'مرحباً {graduate.full_name}،', '', 'نرجو مشاركتك في الاستبيانات التالية:', '']
+            for item in items:
+                lines.append(f'• {item["title"]}: {item["link"]}')
+            lines.extend(['', 'شكراً لك!'])
+            result = account.get_whatsapp_service().send_message(graduate.phone_normalized, '\n'.join(lines))
+
+        if result['success']:
+            return 'sent', '', result.get('message_id') or ''
+        return 'failed', result.get('error') or '', ''
@@ -0,0 +1,66 @@
+"""
+Parallel Channel Dispatch
+إرسال القنوات (البريد والواتساب) كمسارات متوازية مستقلة ودمج نتائجها لكل مستلم
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from .suppression import error_text
+
+
+class ChannelDispatcher:
+    """
+    موزع الإرسال متعدد القنوات: لكل قناة مجموعة خيوط خاصة بها وحدود
+    إرسالها من جدولة الحصص، وتعمل القنوات في الوقت نفسه فيكون زمن الإرسال
+    قريباً من زمن القناة الأبطأ بدلاً من مجموع القناتين.
+
+    الخيوط لا تلمس قاعدة البيانات إلا لحجز الحصة؛ تحديث الحالة والسجلات
+    يتم بعد الدمج في الخيط الرئيسي.
+    """
+
+    def __init__(self, scheduler, workers=None):
+        self.scheduler = scheduler
+        self.workers = workers or getattr(settings, 'SURVEY_CHANNEL_WORKERS', {'email': 4, 'whatsapp': 8})
+
+    def dispatch(self, jobs, senders):
+        """
+        jobs: {القناة: [(المفتاح، المستلم), ...]} بالترتيب المطلوب.
+        senders: {القناة: دالة(المستلم، الحساب) تعيد (النتيجة، رسالة الخطأ، معرّف الرسالة)}.
+        يعيد {المفتاح: {القناة: (النتيجة، رسالة الخطأ، معرّف الرسالة)}} حيث النتيجة
+        'sent' أو 'failed' أو 'deferred' عند انتهاء الحصة قبل الإرسال.
+        """
+        outcomes = {}
+        channels = [channel for channel, items in jobs.items() if items]
+        if not channels:
+            return outcomes
+
+        with ThreadPoolExecutor(max_workers=len(channels)) as pipelines:
+            futures = {
+                channel: pipelines.submit(self._run_channel, channel, jobs[channel], senders[channel])
+                for channel in channels
+            }
+            for channel, future in futures.items():
+                for key, outcome in future.result():
+                    outcomes.setdefault(key, {})[channel] = outcome
+        return outcomes
+
+    def _run_channel(self, channel, items, send):
+        """مسار قناة واحدة: مجموعة خيوط ترسل عناصر القناة مع الحفاظ على ترتيب النتائج"""
+        def send_one(item):
+            key, recipient = item
+            accounts = self.scheduler.acquire([channel])
+            if accounts is None:
+                return key, ('deferred', '', '')
+            try:
+                return key, send(recipient, accounts[channel])
+            except Exception as e:
+                return key, ('failed', error_text(e), '')
+            finally:
+                close_old_connections()
+
+        workers = max(1, min(self.workers.get(channel, 1), len(items)))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(send_one, items))
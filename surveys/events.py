@@ -0,0 +1,278 @@
+"""
+Buffered Survey Events
+تسجيل أحداث الاستبيانات (فتح الصفحة، فتح البريد، الضغط على الرابط، حالة رسائل
+الواتساب) في ملف إلحاق دون كتابة في قاعدة البيانات لكل طلب، ثم تطبيقها على
+دفعات بتحديثات مجمعة
+"""
+
+import glob
+import json
+import os
+import time
+from collections import Counter
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+
+from .counters import increment_many
+from .models import SurveyInvitation, SurveySendLog
+from .suppression import record_hard_failures
+
+
+class EventBuffer:
+    """
+    مخزن أحداث بملف إلحاق (append-only): كل حدث سطر JSON يُكتب بعملية
+    write واحدة على ملف مفتوح بوضع O_APPEND، فلا تتداخل أسطر العمليات
+    المختلفة ولا يحتاج الطلب إلى قفل أو اتصال بقاعدة البيانات.
+
+    عند التطبيق يُعاد تسمية الملف الحالي إلى ملف معالجة فتبدأ الطلبات
+    الجديدة ملفاً جديداً، ولا يُحذف ملف المعالجة إلا بعد تطبيق أحداثه
+    بنجاح، فيُعاد تطبيقه في التشغيل التالي إن فشل.
+    """
+
+    # مهلة بعد إعادة التسمية حتى تنتهي الكتابات التي فتحت الملف قبلها
+    SETTLE_SECONDS = 1
+
+    def __init__(self, name, directory=None):
+        self.name = name
+        self._directory = directory
+
+    @property
+    def directory(self):
+        return str(self._directory or settings.SURVEY_EVENTS_DIR)
+
+    @property
+    def path(self):
+        return os.path.join(self.directory, f'{self.name}.log')
+
+    def append(self, *event):
+        """إضافة حدث (قائمة قيم قابلة للتحويل إلى JSON) إلى الملف"""
+        line = (json.dumps(event, separators=(',', ':')) + '\n').encode()
+        try:
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        except FileNotFoundError:
+            os.makedirs(self.directory, exist_ok=True)
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, line)
+        finally:
+            os.close(fd)
+
+    def _claim(self):
+        """نقل الملف الحالي إلى ملف معالجة وإرجاع ملفات المعالجة بالترتيب"""
+        if os.path.exists(self.path):
+            claimed = os.path.join(self.directory, f'{self.name}.{time.time_ns()}.{os.getpid()}.processing')
+            try:
+                os.replace(self.path, claimed)
+            except FileNotFoundError:
+                pass
+            else:
+                time.sleep(self.SETTLE_SECONDS)
+        return sorted(glob.glob(os.path.join(self.directory, f'{self.name}.*.processing')))
+
+    def _read(self, path, batch_size):
+        batch = []
+        with open(path, 'rb') as f:
+            for line in f:
+                try:
+                    batch.append(json.loads(line))
+                except ValueError:
+                    # سطر ناقص من عملية توقفت أثناء الكتابة
+                    continue
+                if len(batch) >= batch_size:
+                    yield batch
+                    batch = []
+        if batch:
+            yield batch
+
+    def pending(self):
+        """عدد الأحداث التي لم تُطبق بعد"""
+        paths = glob.glob(os.path.join(self.directory, f'{self.name}.*.processing'))
+        if os.path.exists(self.path):
+            paths.append(self.path)
+        count = 0
+        for path in paths:
+            try:
+                with open(path, 'rb') as f:
+                    count += sum(1 for _ in f)
+            except FileNotFoundError:
+                continue
+        return count
+
+    def drain(self, apply, batch_size=5000):
+        """
+        تطبيق الأحداث المخزنة بالدالة apply على دفعات، ويعيد
+        (عدد الأحداث، مجموع ما أعادته apply).
+        """
+        total = applied = 0
+        for path in self._claim():
+            for batch in self._read(path, batch_size):
+                total += len(batch)
+                applied += apply(batch)
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                # طبقته عملية أخرى في الوقت نفسه، والتطبيق لا يتكرر أثره
+                pass
+        return total, applied
+
+
+survey_events = EventBuffer('survey')
+
+
+def _timestamp(value):
+    return datetime.fromtimestamp(value, tz=dt_timezone.utc)
+
+
+def record_open(survey_id, graduate_id):
+    """تسجيل فتح صفحة الاستبيان بدلاً من تحديث الدعوة مباشرة"""
+    survey_events.append('page', survey_id, graduate_id, time.time())
+
+
+def record_email_open(survey_id, graduate_id):
+    """تسجيل تحميل صورة التتبع في رسالة البريد"""
+    survey_events.append('email_open', survey_id, graduate_id, time.time())
+
+
+def record_click(survey_id, graduate_id):
+    """تسجيل الضغط على رابط الاستبيان في رسالة البريد"""
+    survey_events.append('click', survey_id, graduate_id, time.time())
+
+
+def record_whatsapp_status(message_id, status, timestamp, error=''):
+    """تسجيل إشعار حالة رسالة واتساب من الـ webhook"""
+    survey_events.append('wa_status', message_id, status, timestamp, error)
+
+
+def _first_events(events):
+    """أقدم وقت لكل زوج (استبيان، خريج)"""
+    first = {}
+    for survey_id, graduate_id, timestamp in events:
+        key = (survey_id, graduate_id)
+        if key not in first or timestamp < first[key]:
+            first[key] = timestamp
+    return first
+
+
+def _pair_chunks(first, chunk_size):
+    pairs = list(first)
+    for start in range(0, len(pairs), chunk_size):
+        chunk = pairs[start:start + chunk_size]
+        yield (
+            {survey_id for survey_id, graduate_id in chunk},
+            {graduate_id for survey_id, graduate_id in chunk},
+        )
+
+
+def apply_open_events(events, chunk_size=500):
+    """
+    تطبيق أحداث الفتح على الدعوات: الدعوات المرسلة فقط تصبح مفتوحة
+    بتاريخ أول فتح، بتحديث bulk_update لكل دفعة، ويُزاد عداد الفتح لكل
+    استبيان بتحديث F() واحد.
+    events: قائمة من (معرّف الاستبيان، معرّف الخريج، الطابع الزمني).
+    """
+    first_open = _first_events(events)
+    updated = 0
+    opened = Counter()
+    for survey_ids, graduate_ids in _pair_chunks(first_open, chunk_size):
+        invitations = [
+            invitation for invitation in SurveyInvitation.objects.filter(
+                survey_id__in=survey_ids, graduate_id__in=graduate_ids, status='sent',
+            ).only('id', 'survey_id', 'graduate_id', 'status', 'opened_at')
+            if (invitation.survey_id, invitation.graduate_id) in first_open
+        ]
+        for invitation in invitations:
+            invitation.status = 'opened'
+            invitation.opened_at = _timestamp(first_open[invitation.survey_id, invitation.graduate_id])
+            opened[invitation.survey_id] += 1
+        SurveyInvitation.objects.bulk_update(invitations, ['status', 'opened_at'])
+        updated += len(invitations)
+    increment_many({survey_id: {'opened_count': count} for survey_id, count in opened.items()})
+    return updated
+
+
+def apply_read_events(events, chunk_size=500):
+    """
+    تحويل سجلات إرسال البريد إلى 'تمت القراءة' عند فتح الرسالة أو الضغط
+    على رابطها. تُحدّث السجلات المرسلة قبل الحدث فقط (الدعوة وتذكيراتها).
+    """
+    first_read = _first_events(events)
+    updated = 0
+    for survey_ids, graduate_ids in _pair_chunks(first_read, chunk_size):
+        logs = [
+            log for log in SurveySendLog.objects.filter(
+                survey_id__in=survey_ids, graduate_id__in=graduate_ids,
+                send_method='email', status__in=('sent', 'delivered'),
+            ).only('id', 'survey_id', 'graduate_id', 'sent_at', 'status')
+            if (log.survey_id, log.graduate_id) in first_read
+            and log.sent_at <= _timestamp(first_read[log.survey_id, log.graduate_id])
+        ]
+        for log in logs:
+            log.status = 'read'
+        SurveySendLog.objects.bulk_update(logs, ['status'])
+        updated += len(logs)
+    return updated
+
+
+# ترتيب حالات الواتساب: لا تعود الحالة إلى الخلف إذا وصلت الإشعارات بغير ترتيبها
+WHATSAPP_STATUS_RANK = {'sent': 0, 'delivered': 1, 'read': 2}
+
+
+def apply_status_events(events, chunk_size=500):
+    """
+    تطبيق إشعارات حالة الواتساب على سجلات الإرسال بمعرّف الرسالة.
+    events: قائمة من (معرّف الرسالة، الحالة، الطابع الزمني، رسالة الخطأ).
+    الفشل يُطبق على السجلات المرسلة فقط ويوقف الأرقام الفاشلة فشلاً دائماً.
+    """
+    latest = {}
+    for message_id, status, timestamp, error in events:
+        current = latest.get(message_id)
+        if status == 'failed':
+            if current is None:
+                latest[message_id] = (status, error)
+        elif status in WHATSAPP_STATUS_RANK and (
+            current is None or current[0] == 'failed'
+            or WHATSAPP_STATUS_RANK[status] > WHATSAPP_STATUS_RANK[current[0]]
+        ):
+            latest[message_id] = (status, '')
+
+    updated = 0
+    message_ids = list(latest)
+    for start in range(0, len(message_ids), chunk_size):
+        changed, failed = [], []
+        logs = SurveySendLog.objects.filter(
+            send_method='whatsapp', message_id__in=message_ids[start:start + chunk_size],
+        ).select_related('graduate')
+        for log in logs:
+            status, error = latest[log.message_id]
+            if status == 'failed':
+                if log.status != 'sent':
+                    continue
+                log.error_message = error
+                failed.append(log)
+            elif WHATSAPP_STATUS_RANK.get(log.status, 99) >= WHATSAPP_STATUS_RANK[status]:
+                continue
+            log.status = status
+            changed.append(log)
+        SurveySendLog.objects.bulk_update(changed, ['status', 'error_message'])
+        record_hard_failures(failed)
+        updated += len(changed)
+    return updated
+
+
+def apply_events(events):
+    """تطبيق دفعة أحداث مختلطة حسب نوع كل حدث، ويعيد عدد الصفوف المحدثة"""
+    opens, reads, statuses = [], [], []
+    for kind, *values in events:
+        if kind in ('page', 'click'):
+            opens.append(values)
+        if kind in ('email_open', 'click'):
+            reads.append(values)
+        if kind == 'wa_status':
+            statuses.append(values)
+    return apply_open_events(opens) + apply_read_events(reads) + apply_status_events(statuses)
+
+
+def flush_events(batch_size=5000):
+    """تطبيق جميع الأحداث المخزنة، ويعيد (عدد الأحداث، عدد الصفوف المحدثة)"""
+    return survey_events.drain(apply_events, batch_size=batch_size)
@@ -0,0 +1,138 @@
+"""
+Survey Result Exports
+تصدير استجابات الاستبيان وملخص نتائجه بصيغ CSV وExcel وPDF، بقراءة
+الإجابات كتدفق مرتب حسب الاستجابة بدلاً من تحميل كل استجابة وإجاباتها
+"""
+
+import csv
+from itertools import groupby
+from operator import itemgetter
+from pathlib import Path
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import Answer, SurveyResponse
+
+EXPORT_FORMATS = {
+    'csv': ('text/csv; charset=utf-8', 'csv'),
+    'xlsx': ('application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', 'xlsx'),
+    'pdf': ('application/pdf', 'pdf'),
+}
+CHUNK_SIZE = 2000
+# خط TTF يغطي أشكال الحروف العربية، مرفق مع التطبيق (رخصته في المجلد نفسه)
+PDF_FONT = Path(__file__).resolve().parent / 'fonts' / 'DejaVuSans.ttf'
+
+
+def response_rows(survey_id, definition):
+    """
+    صف العناوين ثم صف لكل استجابة مكتملة بإجاباتها في عمود لكل سؤال.
+    نص إجابات الاختيار محفوظ مسبقاً بأسماء الخيارات فلا حاجة لجدول الخيارات.
+    """
+    questions = definition['questions']
+    fixed = ['رقم الاستجابة', 'الخريج', 'الرقم الجامعي', 'تاريخ الإرسال']
+    yield fixed + [question['question_text'] for question in questions]
+
+    column = {question['id']: len(fixed) + index for index, question in enumerate(questions)}
+    responses = SurveyResponse.objects.filter(survey_id=survey_id, is_complete=True).order_by('id').values_list(
+        'id', 'submitted_at', 'graduate__first_name', 'graduate__last_name', 'graduate__student_id',
+    ).iterator(chunk_size=CHUNK_SIZE)
+    answers = Answer.objects.filter(
+        response__survey_id=survey_id, response__is_complete=True,
+    ).order_by('response_id').values_list('response_id', 'question_id', 'answer_text').iterator(chunk_size=CHUNK_SIZE)
+
+    groups = groupby(answers, key=itemgetter(0))
+    current = next(groups, None)
+    for response_id, submitted_at, first_name, last_name, student_id in responses:
+        row = [
+            response_id,
+            f'{first_name or ""} {last_name or ""}'.strip(),
+            student_id or '',
+            timezone.localtime(submitted_at).strftime('%Y-%m-%d %H:%M'),
+        ] + [''] * len(questions)
+        while current is not None and current[0] < response_id:
+            current = next(groups, None)
+        if current is not None and current[0] == response_id:
+            for _, question_id, text in current[1]:
+                if question_id in column:
+                    row[column[question_id]] = text
+            current = next(groups, None)
+        yield row
+
+
+def summary_rows(results):
+    """ملخص النتائج: صف لكل سؤال ثم صف لكل خيار أو للمتوسط"""
+    yield ['السؤال', 'الخيار', 'العدد', 'النسبة']
+    for question in results['questions']:
+        yield [question['question_text'], '', question['total_responses'], f"{question['response_rate']}%"]
+        for choice in question['choices_data']:
+            yield ['', choice['label'], choice['count'], f"{choice['percentage']}%"]
+        if question.get('average') is not None:
+            yield ['', 'المتوسط', round(question['average'], 2), '']
+
+
+def write_csv(survey_id, definition, stream):
+    """كتابة الاستجابات كـ CSV (مع علامة BOM ليفتحه Excel بالترميز الصحيح)"""
+    stream.write('\ufeff')
+    csv.writer(stream).writerows(response_rows(survey_id, definition))
+
+
+def write_xlsx(survey_id, definition, results, stream):
+    """مصنف Excel بورقتين: الاستجابات وملخص النتائج (وضع الكتابة فقط لتوفير الذاكرة)"""
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet('الاستجابات')
+    sheet.sheet_view.rightToLeft = True
+    for row in response_rows(survey_id, definition):
+        sheet.append(row)
+    summary = workbook.create_sheet('الملخص')
+    summary.sheet_view.rightToLeft = True
+    for row in summary_rows(results):
+        summary.append(row)
+    workbook.save(stream)
+
+
+def write_pdf(definition, results, stream):
+    """
+    ملخص النتائج كـ PDF بالخط المحدد في SURVEY_PDF_FONT (الخط المرفق افتراضياً).
+    لا يشكّل reportlab الحروف العربية ولا يعكس اتجاهها، فيمر كل نص على
+    arabic_reshaper لوصل الحروف ثم على خوارزمية bidi لترتيبها من اليمين لليسار.
+    """
+    from arabic_reshaper import reshape
+    from bidi.algorithm import get_display
+    from reportlab.lib import colors
+    from reportlab.lib.enums import TA_RIGHT
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+    from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+    font = 'SurveyFont'
+    if font not in pdfmetrics.getRegisteredFontNames():
+        pdfmetrics.registerFont(TTFont(font, getattr(settings, 'SURVEY_PDF_FONT', '') or str(PDF_FONT)))
+
+    def text(value):
+        return get_display(reshape(str(value)))
+
+    styles = getSampleStyleSheet()
+    styles['Title'].fontName = font
+    styles['Normal'].fontName = font
+    styles['Normal'].alignment = TA_RIGHT
+    # الأعمدة معكوسة ليكون عمود السؤال في أقصى اليمين
+    table = Table([[text(cell) for cell in reversed(row)] for row in summary_rows(results)], repeatRows=1)
+    table.setStyle(TableStyle([
+        ('FONTNAME', (0, 0), (-1, -1), font),
+        ('FONTSIZE', (0, 0), (-1, -1), 8),
+        ('ALIGN', (0, 0), (-1, -1), 'RIGHT'),
+        ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
+        ('GRID', (0, 0), (-1, -1), 0.25, colors.grey),
+    ]))
+    document = SimpleDocTemplate(stream, pagesize=A4)
+    document.build([
+        Paragraph(text(definition['title']), styles['Title']),
+        Paragraph(text(f"إجمالي الاستجابات: {results['total_responses']}"), styles['Normal']),
+        Spacer(1, 12),
+        table,
+    ])
@@ -1,6 +1,7 @@
 from django import forms
 from django.core.exceptions import ValidationError
 from .models import Survey, Question, QuestionChoice, SurveyResponse, Answer, SurveyTemplate
+from .definitions import get_survey_definition
 from graduates.models import Graduate
 from datetime import datetime
 
@@ -333,89 +334,99 @@ class QuestionForm(forms.ModelForm):
 
 
 class SurveyResponseForm(forms.Form):
+    """
+    نموذج تعبئة الاستبيان. الأسئلة من تعريف الاستبيان المحفوظ في الكاش
+    (survey_id) أو قائمة أسئلة التعريف مباشرة (questions).
+    """
+
     def __init__(self, *args, **kwargs):
-        questions = kwargs.pop('questions', [])
+        questions = kwargs.pop('questions', None)
+        survey_id = kwargs.pop('survey_id', None)
         super().__init__(*args, **kwargs)
+
+        if questions is None:
+            definition = get_survey_definition(survey_id) if survey_id is not None else None
+            questions = definition['questions'] if definition else []
         
         for question in questions:
-            field_name = f'question_{question.id}'
+            field_name = f'question_{question["id"]}'
             
-            if question.question_type == 'text':
+            if question['question_type'] == 'text':
                 self.fields[field_name] = forms.CharField(
-                    label=question.question_text,
-                    required=question.is_required,
-                    help_text=question.help_text,
+                    label=question['question_text'],
+                    required=question['is_required'],
+                    help_text=question['help_text'],
                     widget=forms.TextInput(attrs={'class': 'form-control'})
                 )
             
-            elif question.question_type == 'textarea':
+            elif question['question_type'] == 'textarea':
                 self.fields[field_name] = forms.CharField(
-                    label=question.question_text,
-                    required=question.is_required,
-                    help_text=question.help_text,
+                    label=question['question_text'],
+                    required=question['is_required'],
+                    help_text=question['help_text'],
                     widget=forms.Textarea(attrs={'class': 'form-control', 'rows': 4})
                 )
             
-            elif question.question_type == 'email':
+            elif question['question_type'] == 'email':
                 self.fields[field_name] = forms.EmailField(
-                    label=question.question_text,
-                    required=question.is_required,
-                    help_text=question.help_text,
+                    label=question['question_text'],
+                    required=question['is_required'],
+                    help_text=question['help_text'],
                     widget=forms.EmailInput(attrs={'class': 'form-control'})
                 )
             
-            elif question.question_type == 'number':
+            elif question['question_type'] == 'number':
                 self.fields[field_name] = forms.DecimalField(
-                    label=question.question_text,
-                    required=question.is_required,
-                    help_text=question.help_text,
+                    label=question['question_text'],
+                    required=question['is_required'],
+                    help_text=question['help_text'],
                     widget=forms.NumberInput(attrs={'class': 'form-control'})
                 )
             
-            elif question.question_type == 'date':
+            elif question['question_type'] == 'date':
                 self.fields[field_name] = forms.DateField(
-                    label=question.question_text,
-                    required=question.is_required,
-                    help_text=question.help_text,
+                    label=question['question_text'],
+                    required=question['is_required'],
+                    help_text=question['help_text'],
                     widget=forms.DateInput(attrs={'class': 'form-control', 'type': 'date'})
                 )
             
-            elif question.question_type == 'radio':
-                choices = [(choice.id, choice.choice_text) for choice in question.choices.all()]
+            elif question['question_type'] == 'radio':
+                choices = [(choice['id'], choice['choice_text']) for choice in question['choices']]
                 self.fields[field_name] = forms.ChoiceField(
-                    label=question.question_text,
-                    required=question.is_required,
-                    help_text=question.help_text,
+                    label=question['question_text'],
+                    required=question['is_required'],
+                    help_text=question['help_text'],
                     choices=choices,
                     widget=forms.RadioSelect(attrs={'class': 'form-check-input'})
                 )
             
-            elif question.question_type == 'checkbox':
-                choices = [(choice.id, choice.choice_text) for choice in question.choices.all()]
+            elif question['question_type'] == 'checkbox':
+                choices = [(choice['id'], choice['choice_text']) for choice in question['choices']]
                 self.fields[field_name] = forms.MultipleChoiceField(
-                    label=question.question_text,
-                    required=question.is_required,
-                    help_text=question.help_text,
+                    label=question['question_text'],
+                    required=question['is_required'],
+                    help_text=question['help_text'],
                     choices=choices,
                     widget=forms.CheckboxSelectMultiple(attrs={'class': 'form-check-input'})
                 )
             
-            elif question.question_type == 'select':
-                choices = [('', 'اختر...')] + [(choice.id, choice.choice_text) for choice in question.choices.all()]
+            elif question['question_type'] == 'select':
+                choices = [('', 'اختر...')] + [(choice['id'], choice['choice_text']) for choice in question['choices']]
                 self.fields[field_name] = forms.ChoiceField(
-                    label=question.question_text,
-                    required=question.is_required,
-                    help_text=question.help_text,
+                    label=question['question_text'],
+                    required=question['is_required'],
+                    help_text=question['help_text'],
                     choices=choices,
                     widget=forms.Select(attrs={'class': 'form-control'})
                 )
             
-            elif question.question_type == 'rating':
+            elif question['question_type'] == 'rating':
                 choices = [(i, str(i)) for i in range(1, 6)]  # تقييم من 1 إلى 5
                 self.fields[field_name] = forms.ChoiceField(
-                    label=question.question_text,
-                    required=question.is_required,
-                    help_text=question.help_text,
+                    label=question['question_text'],
+                    required=question['is_required'],
+                    help_text=question['help_text'],
                     choices=choices,
                     widget=forms.RadioSelect(attrs={'class': 'form-check-input'})
                 )
@@ -450,6 +461,76 @@ class SendSurveyForm(forms.Form):
     )
 
 
+class RecipientSegmentForm(forms.Form):
+    """نموذج تعريف شريحة المستلمين بالمرشحات بدلاً من اختيار الخريجين واحداً واحداً"""
+    
+    college = forms.ChoiceField(
+        required=False,
+        label='الكلية',
+        widget=forms.Select(attrs={'class': 'form-control'})
+    )
+    
+    major = forms.ChoiceField(
+        required=False,
+        label='التخصص',
+        widget=forms.Select(attrs={'class': 'form-control'})
+    )
+    
+    year_from = forms.IntegerField(
+        required=False,
+        label='سنة التخرج من',
+        widget=forms.NumberInput(attrs={'class': 'form-control'})
+    )
+    
+    year_to = forms.IntegerField(
+        required=False,
+        label='سنة التخرج إلى',
+        widget=forms.NumberInput(attrs={'class': 'form-control'})
+    )
+    
+    employment_status = forms.ChoiceField(
+        choices=[('', 'جميع الحالات')] + Graduate.EMPLOYMENT_STATUS_CHOICES,
+        required=False,
+        label='حالة التوظيف',
+        widget=forms.Select(attrs={'class': 'form-control'})
+    )
+    
+    has_email = forms.BooleanField(
+        required=False,
+        label='لديه بريد إلكتروني',
+        widget=forms.CheckboxInput(attrs={'class': 'form-check-input'})
+    )
+    
+    has_phone = forms.BooleanField(
+        required=False,
+        label='لديه رقم هاتف',
+        widget=forms.CheckboxInput(attrs={'class': 'form-check-input'})
+    )
+    
+    not_responded_to = forms.ModelChoiceField(
+        queryset=Survey.objects.all(),
+        required=False,
+        label='لم يستجب للاستبيان',
+        empty_label='بدون تحديد',
+        widget=forms.Select(attrs={'class': 'form-control'})
+    )
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        colleges = Graduate.objects.exclude(college__isnull=True).exclude(college='').values_list('college', flat=True).distinct().order_by('college')
+        majors = Graduate.objects.exclude(major__isnull=True).exclude(major='').values_list('major', flat=True).distinct().order_by('major')
+        self.fields['college'].choices = [('', 'جميع الكليات')] + [(c, c) for c in colleges]
+        self.fields['major'].choices = [('', 'جميع التخصصات')] + [(m, m) for m in majors]
+    
+    def clean(self):
+        cleaned_data = super().clean()
+        year_from = cleaned_data.get('year_from')
+        year_to = cleaned_data.get('year_to')
+        if year_from and year_to and year_from > year_to:
+            raise ValidationError('سنة البداية يجب أن تكون قبل سنة النهاية')
+        return cleaned_data
+
+
 class QuickSurveyForm(forms.Form):
     """نموذج لإنشاء استبيان سريع"""
     title = forms.CharField(
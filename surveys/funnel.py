@@ -0,0 +1,187 @@
+"""
+Invitation Funnel Analytics
+مسار الدعوات لكل استبيان (إرسال ← فتح ← إكمال) حسب قناة الإرسال وصفة
+اختيارية من صفات الخريج، مع توزيع زمن الفتح والإكمال من تاريخ الإرسال،
+باستعلام مجمع واحد يعدّ الدعوات في فترات زمنية بدلاً من سحب صفوفها
+"""
+
+import hashlib
+import json
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db.models import Count, F, Q
+from django.db.models.functions import Coalesce
+
+from .crosstab import DIMENSIONS, _label
+from .definitions import get_data_version
+from .models import Survey, SurveyInvitation
+
+FUNNEL_TIMEOUT = 60 * 10
+PERCENTILES = (25, 50, 75, 90)
+
+# حدود فترات التوزيع الزمني: (الاسم، المدة)؛ تُقدّر المئينات بالاستيفاء داخل الفترة
+BUCKETS = [
+    ('15m', timedelta(minutes=15)),
+    ('1h', timedelta(hours=1)),
+    ('3h', timedelta(hours=3)),
+    ('6h', timedelta(hours=6)),
+    ('12h', timedelta(hours=12)),
+    ('1d', timedelta(days=1)),
+    ('2d', timedelta(days=2)),
+    ('3d', timedelta(days=3)),
+    ('7d', timedelta(days=7)),
+    ('14d', timedelta(days=14)),
+    ('30d', timedelta(days=30)),
+]
+CHANNEL_LABELS = dict(Survey.SEND_METHOD_CHOICES)
+
+
+def _rate(part, whole):
+    return round(part / whole * 100, 1) if whole else 0
+
+
+def _percentile(cumulative, total, percentile):
+    """
+    تقدير المئين بالساعات من الأعداد التراكمية لكل حد زمني بالاستيفاء
+    الخطي داخل الفترة. يعيد None إذا تجاوز آخر حد.
+    """
+    target = total * percentile / 100
+    previous_count, previous_edge = 0, 0.0
+    for (name, edge), count in zip(BUCKETS, cumulative):
+        hours = edge.total_seconds() / 3600
+        if count >= target:
+            share = (target - previous_count) / (count - previous_count) if count > previous_count else 1
+            return round(previous_edge + share * (hours - previous_edge), 2)
+        previous_count, previous_edge = count, hours
+    return None
+
+
+def _timing(cumulative, total):
+    return {
+        'count': total,
+        'percentiles_hours': {f'p{p}': _percentile(cumulative, total, p) for p in PERCENTILES} if total else {},
+        'within': {name: _rate(count, total) for (name, edge), count in zip(BUCKETS, cumulative)},
+    }
+
+
+def _funnel(row):
+    """مؤشرات المسار لمجموعة من الأعداد الخام"""
+    sent, opened, completed = row['sent'], row['opened'], row['completed']
+    return {
+        'invited': row['invited'],
+        'sent': sent,
+        'opened': opened,
+        'completed': completed,
+        'failed': row['failed'],
+        'open_rate': _rate(opened, sent),
+        'completion_rate': _rate(completed, opened),
+        'conversion_rate': _rate(completed, sent),
+        'drop_off': {
+            'not_sent': row['invited'] - sent,
+            'not_opened': sent - opened,
+            'not_completed': opened - completed,
+        },
+        'time_to_open': _timing([row[f'open_{name}'] for name, edge in BUCKETS], row['timed_open']),
+        'time_to_complete': _timing([row[f'complete_{name}'] for name, edge in BUCKETS], row['timed_complete']),
+    }
+
+
+def _sum(rows):
+    keys = [key for key in rows[0] if key not in ('channel', 'segment')] if rows else []
+    return {key: sum(row[key] for row in rows) for key in keys}
+
+
+class InvitationFunnel:
+    """
+    مسار دعوات استبيان: الأعداد ونسب التحويل والتسرب وتوزيع زمن الفتح
+    والإكمال لكل قناة (ولكل فئة من صفة الخريج إن حُددت)، مع الإجمالي.
+    القناة هي طريقة إرسال حملة الدعوة، أو طريقة إرسال الاستبيان للدعوات
+    خارج الحملات. تُحفظ النتيجة في الكاش لفترة قصيرة.
+
+    الاستخدام:
+        InvitationFunnel(survey_id, dimension='college', filters={'graduation_year': '2023'}).build()
+    """
+
+    def __init__(self, survey_id, dimension=None, filters=None):
+        if not Survey.objects.filter(pk=survey_id).exists():
+            raise ValueError('الاستبيان غير موجود')
+        unknown = [name for name in [dimension] + list(filters or {}) if name and name not in DIMENSIONS]
+        if unknown:
+            raise ValueError(f'صفات غير معروفة: {", ".join(unknown)}')
+        self.survey_id = survey_id
+        self.dimension = dimension or None
+        self.filters = {name: value for name, value in (filters or {}).items() if value not in (None, '')}
+
+    def cache_key(self):
+        params = json.dumps([self.dimension, sorted(self.filters.items())], default=str)
+        digest = hashlib.md5(params.encode()).hexdigest()
+        return f'survey_funnel:{self.survey_id}:{get_data_version(self.survey_id)}:{digest}'
+
+    def build(self):
+        key = self.cache_key()
+        result = cache.get(key)
+        if result is None:
+            result = self._compute()
+            cache.set(key, result, FUNNEL_TIMEOUT)
+        return result
+
+    def _rows(self):
+        """الأعداد الخام لكل (قناة، فئة) باستعلام مجمع واحد على الدعوات"""
+        aggregates = {
+            'invited': Count('id'),
+            'sent': Count('id', filter=Q(sent_at__isnull=False)),
+            'opened': Count('id', filter=Q(opened_at__isnull=False)),
+            'completed': Count('id', filter=Q(completed_at__isnull=False)),
+            'failed': Count('id', filter=Q(status='failed')),
+            'timed_open': Count('id', filter=Q(sent_at__isnull=False, opened_at__gte=F('sent_at'))),
+            'timed_complete': Count('id', filter=Q(sent_at__isnull=False, completed_at__gte=F('sent_at'))),
+        }
+        for name, edge in BUCKETS:
+            for stage, field in (('open', 'opened_at'), ('complete', 'completed_at')):
+                aggregates[f'{stage}_{name}'] = Count('id', filter=Q(
+                    sent_at__isnull=False,
+                    **{f'{field}__gte': F('sent_at'), f'{field}__lte': F('sent_at') + edge},
+                ))
+
+        invitations = SurveyInvitation.objects.filter(survey_id=self.survey_id, **{
+            f'graduate__{DIMENSIONS[name][0]}': value for name, value in self.filters.items()
+        }).annotate(channel=Coalesce('campaign__send_method', 'survey__send_method'))
+        groups = ['channel']
+        if self.dimension:
+            invitations = invitations.annotate(segment=F(f'graduate__{DIMENSIONS[self.dimension][0]}'))
+            groups.append('segment')
+        return list(invitations.order_by().values(*groups).annotate(**aggregates))
+
+    def _compute(self):
+        rows = self._rows()
+        channels = {}
+        for row in rows:
+            channels.setdefault(row['channel'], []).append(row)
+        segments = {}
+        for row in rows:
+            segments.setdefault(row.get('segment'), []).append(row)
+
+        return {
+            'survey_id': self.survey_id,
+            'dimension': {'name': self.dimension, 'label': DIMENSIONS[self.dimension][1]} if self.dimension else None,
+            'filters': self.filters,
+            'buckets': [name for name, edge in BUCKETS],
+            'total': _funnel(_sum(rows)) if rows else None,
+            'channels': [
+                {'channel': channel, 'label': CHANNEL_LABELS.get(channel, channel), **_funnel(_sum(channel_rows))}
+                for channel, channel_rows in sorted(channels.items(), key=lambda item: str(item[0]))
+            ],
+            'segments': [
+                {'label': str(_label(self.dimension, segment)), 'value': segment, **_funnel(_sum(segment_rows))}
+                for segment, segment_rows in sorted(segments.items(), key=lambda item: (item[0] is None, str(item[0])))
+            ] if self.dimension else [],
+            'groups': [
+                {
+                    'channel': row['channel'],
+                    'segment': str(_label(self.dimension, row['segment'])) if self.dimension else None,
+                    **_funnel(row),
+                }
+                for row in rows
+            ],
+        }
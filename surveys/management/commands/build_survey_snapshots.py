@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from surveys.models import Survey
+from surveys.snapshots import build_snapshot, pending_snapshots
+
+
+class Command(BaseCommand):
+    """
+    بناء لقطات النتائج للاستبيانات المغلقة التي تنتظر لقطتها (أُغلقت منذ
+    آخر تشغيل، أو تغير عدد استجاباتها بعد البناء، أو فشل بناؤها سابقاً)،
+    للاستخدام مع مهمة مجدولة (مثلاً كل بضع دقائق). إلى أن تُبنى اللقطة
+    تعرض صفحات الاستبيان نتائجه المباشرة.
+    """
+    help = 'بناء لقطات النتائج وملفات التصدير للاستبيانات المغلقة'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--survey', type=int, action='append', help='معرّف استبيان محدد (يمكن تكراره)')
+        parser.add_argument('--rebuild', action='store_true', help='إعادة بناء لقطات جميع الاستبيانات المغلقة وليس المنتظرة فقط')
+
+    def handle(self, *args, **options):
+        surveys = Survey.objects.filter(status='closed') if options['rebuild'] else pending_snapshots()
+        if options['survey']:
+            surveys = surveys.filter(pk__in=options['survey'])
+
+        built = 0
+        for survey_id in surveys.values_list('pk', flat=True):
+            try:
+                build_snapshot(survey_id)
+            except Exception as e:
+                self.stderr.write(f'فشل بناء لقطة الاستبيان {survey_id}: {e}')
+                continue
+            built += 1
+        self.stdout.write(self.style.SUCCESS(f'تم بناء {built} لقطة.'))
@@ -0,0 +1,94 @@
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from surveys.models import SendQuotaUsage, SurveySendLog, SurveySendLogDaily
+
+
+class Command(BaseCommand):
+    """
+    تلخيص سجلات الإرسال في جدول الملخصات اليومية ثم حذف السجلات
+    الأقدم من فترة الاحتفاظ، وحذف عدادات حصص الإرسال للأيام السابقة.
+    """
+    help = 'تلخيص سجلات إرسال الاستبيانات يومياً وحذف السجلات القديمة'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--retention-days',
+            type=int,
+            default=getattr(settings, 'SURVEY_SEND_LOG_RETENTION_DAYS', 90),
+            help='عدد الأيام التي تبقى فيها السجلات التفصيلية قبل حذفها',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=5000,
+            help='عدد السجلات المحذوفة في كل دفعة',
+        )
+
+    def handle(self, *args, **options):
+        retention_days = options['retention_days']
+        chunk_size = options['chunk_size']
+
+        # الأيام المكتملة فقط (قبل بداية اليوم الحالي) تدخل في الملخص
+        today_start = timezone.make_aware(datetime.combine(timezone.localdate(), time.min))
+        rolled = self._rollup(today_start)
+        self.stdout.write(f'تم تحديث {rolled} صف في الملخصات اليومية.')
+
+        # حد الحذف محاذٍ لبداية يوم حتى لا يُحذف جزء من يوم دون بقيته
+        cutoff = today_start - timedelta(days=retention_days)
+        deleted = self._purge(cutoff, chunk_size)
+        self.stdout.write(self.style.SUCCESS(f'تم حذف {deleted} سجل أقدم من {retention_days} يوم.'))
+
+        # عدادات الحصص لا تُقرأ إلا لليوم والدقيقة الحاليين
+        quota_rows, _ = SendQuotaUsage.objects.filter(window_start__lt=today_start).delete()
+        self.stdout.write(f'تم حذف {quota_rows} عداد حصة قديم.')
+
+    def _rollup(self, before):
+        """إعادة حساب ملخص كل يوم ما زالت سجلاته التفصيلية موجودة"""
+        raw_logs = SurveySendLog.objects.filter(sent_at__lt=before)
+        grouped = (
+            raw_logs.annotate(day=TruncDate('sent_at'))
+            .values('survey_id', 'day', 'send_method', 'status')
+            .annotate(count=Count('id'))
+            .order_by()
+        )
+        rows = [
+            SurveySendLogDaily(
+                survey_id=row['survey_id'],
+                day=row['day'],
+                send_method=row['send_method'],
+                status=row['status'],
+                count=row['count'],
+            )
+            for row in grouped
+        ]
+        if not rows:
+            return 0
+
+        days = {row.day for row in rows}
+        with transaction.atomic():
+            # الاستبدال وليس الجمع: تشغيل الأمر أكثر من مرة لا يكرر العد،
+            # ويعكس أي تحديث لاحق للحالة (تم التسليم/تمت القراءة)
+            SurveySendLogDaily.objects.filter(day__in=days).delete()
+            SurveySendLogDaily.objects.bulk_create(rows, batch_size=1000)
+        return len(rows)
+
+    def _purge(self, cutoff, chunk_size):
+        """حذف السجلات التفصيلية القديمة على دفعات لتجنب قفل الجدول طويلاً"""
+        deleted = 0
+        while True:
+            ids = list(
+                SurveySendLog.objects.filter(sent_at__lt=cutoff)
+                .order_by('id')
+                .values_list('id', flat=True)[:chunk_size]
+            )
+            if not ids:
+                return deleted
+            SurveySendLog.objects.filter(id__in=ids).delete()
+            deleted += len(ids)
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from surveys.events import flush_events
+
+
+class Command(BaseCommand):
+    """
+    تطبيق أحداث الاستبيانات المخزنة (الفتح والتتبع وحالات الواتساب) على قاعدة البيانات،
+    للاستخدام مع مهمة مجدولة (مثلاً كل دقيقة).
+    """
+    help = 'تطبيق أحداث الاستبيانات المخزنة على الدعوات وسجلات الإرسال دفعة واحدة'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000, help='عدد الأحداث في كل دفعة')
+
+    def handle(self, *args, **options):
+        total, updated = flush_events(batch_size=options['batch_size'])
+        self.stdout.write(f'تمت معالجة {total} حدث، وتحديث {updated} سجل.')
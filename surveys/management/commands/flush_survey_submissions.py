@@ -0,0 +1,45 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from surveys.submissions import flush_pending_submissions, submission_metrics
+
+
+class Command(BaseCommand):
+    """
+    تحويل الاستجابات العامة المنتظرة إلى استجابات وإجابات على دفعات.
+    يعمل مرة واحدة (لمهمة مجدولة) أو باستمرار مع --loop كعملية حفظ مستقلة.
+    """
+    help = 'حفظ الاستجابات العامة المنتظرة في جدول الانتظار على دفعات'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None, help='عدد الاستجابات في كل دفعة')
+        parser.add_argument('--loop', action='store_true', help='الاستمرار في الحفظ حتى الإيقاف')
+        parser.add_argument('--interval', type=float, default=2, help='ثواني الانتظار عند فراغ الجدول مع --loop')
+        parser.add_argument('--stats', action='store_true', help='عرض مؤشرات جدول الانتظار فقط')
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            self._write_metrics()
+            return
+
+        while True:
+            saved = flush_pending_submissions(batch_size=options['batch_size'])
+            if saved:
+                self.stdout.write(f'تم حفظ {saved} استجابة.')
+            if not options['loop']:
+                break
+            if not saved:
+                time.sleep(options['interval'])
+        self._write_metrics()
+
+    def _write_metrics(self):
+        metrics = submission_metrics()
+        self.stdout.write(
+            f'بانتظار الحفظ: {metrics["pending"]}، عمر أقدمها: {metrics["oldest_age_seconds"]} ثانية.'
+        )
+        if metrics['last_flush']:
+            last = metrics['last_flush']
+            self.stdout.write(
+                f'آخر حفظ: {last["count"]} استجابة خلال {last["seconds"]} ثانية ({last["rate"]} استجابة/ثانية).'
+            )
@@ -0,0 +1,101 @@
+import random
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+
+from surveys.definitions import get_survey_definition
+from surveys.submissions import submission_metrics
+
+
+class Command(BaseCommand):
+    """
+    اختبار تحمل لصفحة الاستبيان العامة: عدة عملاء متزامنين يرسلون استجابات
+    صحيحة عشوائية لمدة محددة، ثم يُعرض المعدل المستدام وزمن الاستجابة
+    ومؤشرات جدول الانتظار. يُشغل مقابل خادم gunicorn بعدد العمال المطلوب
+    (مثلاً: gunicorn -w 4 graduate_system.wsgi).
+    """
+    help = 'اختبار تحمل إرسال الاستجابات العامة لاستبيان'
+
+    def add_arguments(self, parser):
+        parser.add_argument('survey', type=int, help='معرّف الاستبيان')
+        parser.add_argument('--base-url', default='http://127.0.0.1:8000', help='عنوان الخادم')
+        parser.add_argument('--concurrency', type=int, default=16, help='عدد العملاء المتزامنين')
+        parser.add_argument('--duration', type=float, default=30, help='مدة الاختبار بالثواني')
+
+    def handle(self, *args, **options):
+        definition = get_survey_definition(options['survey'])
+        if definition is None:
+            raise CommandError('الاستبيان غير موجود.')
+        url = options['base_url'].rstrip('/') + reverse('surveys:take', args=[definition['id']])
+        deadline = time.monotonic() + options['duration']
+        local = threading.local()
+        lock = threading.Lock()
+        results = Counter()
+        latencies = []
+
+        def client():
+            if not hasattr(local, 'session'):
+                local.session = requests.Session()
+                local.session.get(url, timeout=30)
+            session = local.session
+            while time.monotonic() < deadline:
+                data = self._random_answers(definition)
+                data['csrfmiddlewaretoken'] = session.cookies.get('csrftoken', '')
+                started = time.monotonic()
+                try:
+                    response = session.post(url, data=data, timeout=30, allow_redirects=False)
+                    outcome = response.status_code
+                except requests.RequestException as e:
+                    outcome = type(e).__name__
+                with lock:
+                    results[outcome] += 1
+                    latencies.append(time.monotonic() - started)
+
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+            for _ in range(options['concurrency']):
+                pool.submit(client)
+        elapsed = time.monotonic() - started
+
+        total = sum(results.values())
+        accepted = results.get(302, 0)
+        latencies.sort()
+        self.stdout.write(f'الطلبات: {total} خلال {elapsed:.1f} ثانية.')
+        self.stdout.write(f'المقبولة: {accepted} ({accepted / elapsed:.1f} استجابة/ثانية).')
+        if latencies:
+            self.stdout.write(
+                f'زمن الاستجابة: الوسيط {latencies[len(latencies) // 2] * 1000:.0f} مللي ثانية، '
+                f'p95 {latencies[int(len(latencies) * 0.95)] * 1000:.0f} مللي ثانية.'
+            )
+        for outcome, count in results.most_common():
+            self.stdout.write(f'  {outcome}: {count}')
+        metrics = submission_metrics()
+        self.stdout.write(f'بانتظار الحفظ: {metrics["pending"]}، عمر أقدمها: {metrics["oldest_age_seconds"]} ثانية.')
+
+    def _random_answers(self, definition):
+        """إجابات صحيحة عشوائية لجميع الأسئلة"""
+        data = {}
+        for question in definition['questions']:
+            name = f'question_{question["id"]}'
+            question_type = question['question_type']
+            choices = [choice['id'] for choice in question['choices']]
+            if question_type in ('radio', 'select') and choices:
+                data[name] = random.choice(choices)
+            elif question_type == 'checkbox' and choices:
+                data[name] = random.sample(choices, random.randint(1, len(choices)))
+            elif question_type == 'rating':
+                data[name] = random.randint(1, 5)
+            elif question_type == 'number':
+                data[name] = random.randint(0, 100)
+            elif question_type == 'date':
+                data[name] = f'2024-{random.randint(1, 12):02d}-{random.randint(1, 28):02d}'
+            elif question_type == 'email':
+                data[name] = f'user{random.randint(1, 10 ** 6)}@example.com'
+            else:
+                data[name] = random.choice(['ممتاز', 'جيد جداً', 'يحتاج إلى تحسين'])
+        return data
@@ -0,0 +1,47 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from surveys.models import SurveySendLog
+from surveys.suppression import process_mailbox, record_hard_failures
+
+
+class Command(BaseCommand):
+    """
+    تحديث قائمة الإيقاف من رسائل الارتداد في صندوق بريد محلي
+    (Maildir أو مجلد ملفات .eml أو ملف mbox) ومن سجلات الإرسال الفاشلة.
+    """
+    help = 'إيقاف العناوين المرتدة أو الفاشلة فشلاً دائماً'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--mailbox', help='مسار صندوق البريد الذي يحتوي رسائل الارتداد')
+        parser.add_argument('--delete', action='store_true', help='حذف رسائل الارتداد بعد معالجتها')
+        parser.add_argument(
+            '--from-logs',
+            action='store_true',
+            help='فحص سجلات الإرسال الفاشلة بحثاً عن ردود فشل دائم',
+        )
+        parser.add_argument('--days', type=int, default=30, help='عدد الأيام المفحوصة من سجلات الإرسال')
+        parser.add_argument('--chunk-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        if not options['mailbox'] and not options['from_logs']:
+            raise CommandError('حدد --mailbox أو --from-logs')
+
+        if options['mailbox']:
+            scanned, bounces, suppressed = process_mailbox(options['mailbox'], delete=options['delete'])
+            self.stdout.write(f'تمت قراءة {scanned} رسالة، منها {bounces} رسالة ارتداد، وإيقاف {suppressed} عنوان.')
+
+        if options['from_logs']:
+            since = timezone.now() - timedelta(days=options['days'])
+            logs = SurveySendLog.objects.filter(status='failed', sent_at__gte=since).select_related('graduate')
+            last_id = 0
+            suppressed = 0
+            while True:
+                chunk = list(logs.filter(id__gt=last_id).order_by('id')[:options['chunk_size']])
+                if not chunk:
+                    break
+                suppressed += record_hard_failures(chunk)
+                last_id = chunk[-1].id
+            self.stdout.write(f'تم إيقاف {suppressed} عنوان من سجلات الإرسال.')
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from surveys.text_analytics import rebuild_answer_terms
+
+
+class Command(BaseCommand):
+    """
+    إعادة بناء فهرس كلمات الإجابات النصية، لفهرسة الإجابات المحفوظة قبل
+    إضافة الفهرس أو بعد تعديل قواعد التطبيع وكلمات الوصل.
+    """
+    help = 'إعادة بناء فهرس الكلمات والعبارات للإجابات النصية'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--survey', type=int, action='append', help='معرّف استبيان محدد (يمكن تكراره)')
+        parser.add_argument('--batch-size', type=int, default=2000, help='عدد الإجابات في كل دفعة')
+
+    def handle(self, *args, **options):
+        rows = rebuild_answer_terms(options['survey'], batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'تمت فهرسة {rows} كلمة وعبارة.'))
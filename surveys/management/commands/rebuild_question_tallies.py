@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from surveys.tallies import rebuild_tallies
+
+
+class Command(BaseCommand):
+    """
+    إعادة بناء عدادات إجابات الأسئلة من صفوف الإجابات المكتملة، بعد حذف
+    استجابات أو تعديل أسئلة، أو لتضييق الحدود بعد استبدال إجابات.
+    """
+    help = 'إعادة حساب عدادات إجابات الأسئلة والخيارات من جدول الإجابات'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--survey', type=int, action='append', help='معرّف استبيان محدد (يمكن تكراره)')
+
+    def handle(self, *args, **options):
+        rows = rebuild_tallies(options['survey'])
+        self.stdout.write(self.style.SUCCESS(f'تمت إعادة بناء {rows} صف من عدادات الأسئلة.'))
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from surveys.counters import reconcile_counters
+from surveys.models import Survey
+
+
+class Command(BaseCommand):
+    """
+    إعادة حساب عدادات الاستبيانات المخزنة (المرسل، البريد، الواتساب، الفتح،
+    الاستجابات) من الجداول في استعلام واحد وتصحيح ما انحرف منها.
+    """
+    help = 'مطابقة عدادات الاستبيانات مع الدعوات وسجلات الإرسال والاستجابات'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--survey', type=int, action='append', help='معرّف استبيان محدد (يمكن تكراره)')
+        parser.add_argument('--dry-run', action='store_true', help='عرض الفروقات دون تصحيحها')
+
+    def handle(self, *args, **options):
+        queryset = Survey.objects.all()
+        if options['survey']:
+            queryset = queryset.filter(pk__in=options['survey'])
+
+        drifted = reconcile_counters(queryset, dry_run=options['dry_run'])
+        for survey, changes in drifted:
+            details = '، '.join(f'{field}: {stored} ← {actual}' for field, (stored, actual) in changes.items())
+            self.stdout.write(f'الاستبيان {survey.pk}: {details}')
+
+        if options['dry_run']:
+            self.stdout.write(f'{len(drifted)} استبيان بعدادات مختلفة (لم يتم التصحيح).')
+        else:
+            self.stdout.write(self.style.SUCCESS(f'تم تصحيح عدادات {len(drifted)} استبيان.'))
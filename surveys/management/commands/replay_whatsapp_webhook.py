@@ -0,0 +1,80 @@
+import json
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+
+from surveys.models import SurveySendLog
+from surveys.webhooks import build_status_payload, sign_payload
+
+
+class Command(BaseCommand):
+    """
+    إعادة إرسال إشعارات حالة واتساب مسجلة إلى الـ webhook بتوازٍ عالٍ
+    لاختبار تحمل نقطة الاستقبال محلياً.
+    """
+    help = 'إغراق webhook الواتساب بإشعارات حالة مسجلة أو مولدة من سجلات الإرسال'
+
+    def add_arguments(self, parser):
+        parser.add_argument('file', nargs='?', help='ملف الطلبات المسجلة (مصفوفة JSON أو طلب JSON في كل سطر)')
+        parser.add_argument('--from-logs', type=int, default=0,
+                            help='توليد إشعارات delivered ثم read لآخر N سجل واتساب له معرّف رسالة')
+        parser.add_argument('--url', default=None, help='عنوان الـ webhook (الافتراضي الخادم المحلي)')
+        parser.add_argument('--secret', default=None, help='سر التطبيق للتوقيع (الافتراضي WHATSAPP_APP_SECRET)')
+        parser.add_argument('--concurrency', type=int, default=16, help='عدد الطلبات المتزامنة')
+        parser.add_argument('--repeat', type=int, default=1, help='عدد مرات إعادة إرسال كل طلب')
+
+    def handle(self, *args, **options):
+        payloads = self._load(options)
+        if not payloads:
+            raise CommandError('لا توجد طلبات لإعادة إرسالها.')
+        payloads = payloads * options['repeat']
+        url = options['url'] or f'http://127.0.0.1:8000{reverse("surveys:whatsapp_webhook")}'
+
+        bodies = [json.dumps(payload).encode() for payload in payloads]
+        session = requests.Session()
+
+        def post(body):
+            try:
+                response = session.post(url, data=body, timeout=30, headers={
+                    'Content-Type': 'application/json',
+                    'X-Hub-Signature-256': sign_payload(body, options['secret']),
+                })
+                return response.status_code
+            except requests.RequestException as e:
+                return type(e).__name__
+
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+            results = Counter(pool.map(post, bodies))
+        elapsed = time.monotonic() - started
+
+        self.stdout.write(
+            f'تم إرسال {len(bodies)} طلب خلال {elapsed:.2f} ثانية '
+            f'({len(bodies) / elapsed if elapsed else 0:.0f} طلب/ثانية).'
+        )
+        for result, count in results.most_common():
+            self.stdout.write(f'  {result}: {count}')
+
+    def _load(self, options):
+        if options['from_logs']:
+            message_ids = list(
+                SurveySendLog.objects.filter(send_method='whatsapp').exclude(message_id='')
+                .order_by('-id').values_list('message_id', flat=True)[:options['from_logs']]
+            )
+            now = int(time.time())
+            return [
+                build_status_payload([(message_id, status, now)])
+                for status in ('delivered', 'read')
+                for message_id in message_ids
+            ]
+        if not options['file']:
+            return []
+        with open(options['file'], encoding='utf-8') as f:
+            content = f.read().strip()
+        if content.startswith('['):
+            return json.loads(content)
+        return [json.loads(line) for line in content.splitlines() if line.strip()]
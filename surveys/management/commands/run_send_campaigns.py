@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+
+from surveys.campaigns import CampaignRunner, stale_before
+from surveys.models import SendCampaign
+
+
+class Command(BaseCommand):
+    """
+    تشغيل حملات الإرسال الموجودة في قائمة الانتظار والحملات المؤجلة التي
+    حان موعد استئنافها، والحملات الجارية التي توقف منفذها (مثلاً بعد إعادة
+    تشغيل الخادم أثناء الإرسال في الخلفية)، للاستخدام مع مهمة مجدولة
+    (مثلاً كل بضع دقائق).
+    """
+    help = 'تشغيل حملات إرسال الاستبيانات المعلقة'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--resume',
+            action='store_true',
+            help='استئناف جميع الحملات الجارية دون انتظار مهلة التوقف (SURVEY_CAMPAIGN_STALE_MINUTES)',
+        )
+
+    def handle(self, *args, **options):
+        statuses = ['queued', 'running'] if options['resume'] else ['queued']
+        stale = stale_before()
+        campaigns = SendCampaign.objects.filter(
+            Q(status__in=statuses)
+            | Q(status='deferred', resume_at__lte=timezone.now())
+            | Q(status='running') & (Q(heartbeat_at__lt=stale) | Q(heartbeat_at__isnull=True))
+        ).select_related('survey').order_by('created_at')
+        statuses.append('deferred')
+
+        for campaign in campaigns:
+            try:
+                ran = CampaignRunner(campaign).run(claim_from=statuses, stale_before=stale)
+            except Exception as e:
+                self.stderr.write(f'فشلت الحملة {campaign.pk}: {e}')
+                continue
+            if ran:
+                campaign.refresh_from_db()
+                progress = campaign.get_progress()
+                self.stdout.write(f'الحملة {campaign.pk}: تمت معالجة {progress["processed"]} من {progress["total"]}.')
+                if progress['resume_at']:
+                    self.stdout.write(f'الحملة {campaign.pk}: تم تأجيل الباقي حتى {progress["resume_at"]}.')
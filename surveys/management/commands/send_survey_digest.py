@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from surveys.digest import DigestSender
+from surveys.models import Survey
+
+
+class Command(BaseCommand):
+    """
+    إرسال رسالة واحدة لكل خريج تجمع جميع دعواته المعلقة في الاستبيانات
+    المحددة بدلاً من رسالة لكل استبيان.
+    """
+    help = 'إرسال الدعوات المعلقة لعدة استبيانات في رسالة مجمعة لكل خريج'
+
+    def add_arguments(self, parser):
+        parser.add_argument('surveys', nargs='*', type=int, help='معرفات الاستبيانات (الافتراضي: جميع الاستبيانات النشطة)')
+        parser.add_argument('--method', choices=[choice[0] for choice in Survey.SEND_METHOD_CHOICES], default='email')
+        parser.add_argument('--chunk-size', type=int, default=None, help='عدد الخريجين في كل دفعة')
+
+    def handle(self, *args, **options):
+        surveys = Survey.objects.filter(status='active')
+        if options['surveys']:
+            surveys = surveys.filter(pk__in=options['surveys'])
+        if not surveys.exists():
+            raise CommandError('لا توجد استبيانات نشطة مطابقة')
+
+        sender = DigestSender(surveys, send_method=options['method'], chunk_size=options['chunk_size'])
+        counts = sender.run()
+        self.stdout.write(
+            f'تم إرسال {counts["messages"]} رسالة مجمعة تغطي {counts["invitations"]} دعوة.'
+        )
+        if counts['deferred']:
+            self.stdout.write(f'تم إيقاف الإرسال لانتهاء حصة الإرسال، يُستكمل الباقي بعد {sender.resume_at}.')
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from surveys.models import Survey
+from surveys.reminders import ReminderScheduler
+
+
+class Command(BaseCommand):
+    """
+    إرسال التذكيرات المستحقة لجميع الاستبيانات المفعلة للتذكير،
+    للاستخدام مع مهمة مجدولة (مثلاً كل ساعة).
+    """
+    help = 'إرسال تذكيرات الاستبيانات للخريجين الذين لم يكملوها'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--survey', type=int, help='معرّف استبيان محدد بدلاً من جميع الاستبيانات')
+        parser.add_argument('--batch-size', type=int, default=None, help='عدد الدعوات في كل دفعة')
+        parser.add_argument('--dry-run', action='store_true', help='عرض عدد الدعوات المستحقة دون إرسال')
+
+    def handle(self, *args, **options):
+        surveys = ReminderScheduler.active_surveys()
+        if options['survey']:
+            surveys = Survey.objects.filter(pk=options['survey'])
+
+        for survey in surveys:
+            counts = ReminderScheduler(survey, batch_size=options['batch_size']).run(dry_run=options['dry_run'])
+            if options['dry_run']:
+                self.stdout.write(f'{survey.title}: {counts["due"]} دعوة مستحقة للتذكير.')
+            else:
+                self.stdout.write(
+                    f'{survey.title}: تم تذكير {counts["reminded"]}، وفشل {counts["failed"]}.'
+                )
+                if counts['deferred']:
+                    self.stdout.write(f'{survey.title}: تم إيقاف التذكيرات لانتهاء حصة الإرسال، سيُستكمل الباقي لاحقاً.')
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.3 on 2026-10-19 05:18
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('graduates', '0002_allow_null_fields'),
+        ('surveys', '0006_surveyinvitation_token_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SurveySendLogDaily',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='اليوم')),
+                ('send_method', models.CharField(choices=[('email', 'بريد إلكتروني'), ('whatsapp', 'واتساب'), ('both', 'كليهما')], max_length=10, verbose_name='طريقة الإرسال')),
+                ('status', models.CharField(choices=[('sent', 'تم الإرسال'), ('failed', 'فشل الإرسال'), ('delivered', 'تم التسليم'), ('read', 'تم القراءة')], max_length=20, verbose_name='الحالة')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='العدد')),
+            ],
+            options={
+                'verbose_name': 'ملخص يومي لسجلات الإرسال',
+                'verbose_name_plural': 'الملخصات اليومية لسجلات الإرسال',
+                'ordering': ['-day', 'send_method', 'status'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='surveysendlog',
+            index=models.Index(fields=['survey', 'id'], name='sendlog_survey_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='surveysendlog',
+            index=models.Index(fields=['sent_at'], name='sendlog_sent_at_idx'),
+        ),
+        migrations.AddField(
+            model_name='surveysendlogdaily',
+            name='survey',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='send_log_rollups', to='surveys.survey'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='surveysendlogdaily',
+            unique_together={('survey', 'day', 'send_method', 'status')},
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.3 on 2026-10-19 05:20
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('graduates', '0002_allow_null_fields'),
+        ('surveys', '0007_send_log_rollups'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SendCampaign',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('send_method', models.CharField(choices=[('email', 'بريد إلكتروني'), ('whatsapp', 'واتساب'), ('both', 'كليهما')], max_length=10, verbose_name='طريقة الإرسال')),
+                ('status', models.CharField(choices=[('queued', 'في قائمة الانتظار'), ('running', 'جارٍ الإرسال'), ('completed', 'مكتملة'), ('failed', 'فشلت')], default='queued', max_length=20, verbose_name='الحالة')),
+                ('error_message', models.TextField(blank=True, verbose_name='رسالة الخطأ')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='تاريخ الإنشاء')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='بدء الإرسال')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='انتهاء الإرسال')),
+                ('email_queued', models.PositiveIntegerField(default=0, verbose_name='بريد في الانتظار')),
+                ('email_sent', models.PositiveIntegerField(default=0, verbose_name='بريد مرسل')),
+                ('email_failed', models.PositiveIntegerField(default=0, verbose_name='بريد فاشل')),
+                ('email_skipped', models.PositiveIntegerField(default=0, verbose_name='بريد متخطى')),
+                ('whatsapp_queued', models.PositiveIntegerField(default=0, verbose_name='واتساب في الانتظار')),
+                ('whatsapp_sent', models.PositiveIntegerField(default=0, verbose_name='واتساب مرسل')),
+                ('whatsapp_failed', models.PositiveIntegerField(default=0, verbose_name='واتساب فاشل')),
+                ('whatsapp_skipped', models.PositiveIntegerField(default=0, verbose_name='واتساب متخطى')),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL, verbose_name='أنشئت بواسطة')),
+                ('survey', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='campaigns', to='surveys.survey')),
+            ],
+            options={
+                'verbose_name': 'حملة إرسال',
+                'verbose_name_plural': 'حملات الإرسال',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='surveyinvitation',
+            name='campaign',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='invitations', to='surveys.sendcampaign', verbose_name='حملة الإرسال'),
+        ),
+    ]
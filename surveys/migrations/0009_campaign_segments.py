@@ -0,0 +1,24 @@
+# Generated by Django 5.2.3 on 2026-10-19 05:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('graduates', '0002_allow_null_fields'),
+        ('surveys', '0008_send_campaigns'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sendcampaign',
+            name='recipients_resolved',
+            field=models.BooleanField(default=False, verbose_name='تم تجهيز المستلمين'),
+        ),
+        migrations.AddField(
+            model_name='sendcampaign',
+            name='segment_filters',
+            field=models.JSONField(blank=True, null=True, verbose_name='مرشحات الشريحة'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.3 on 2026-10-19 05:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('graduates', '0002_allow_null_fields'),
+        ('surveys', '0009_campaign_segments'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='survey',
+            name='reminder_interval_days',
+            field=models.PositiveSmallIntegerField(default=3, verbose_name='الفاصل بين التذكيرات (أيام)'),
+        ),
+        migrations.AddField(
+            model_name='survey',
+            name='reminder_max_count',
+            field=models.PositiveSmallIntegerField(default=2, verbose_name='الحد الأقصى للتذكيرات'),
+        ),
+        migrations.AddField(
+            model_name='survey',
+            name='reminders_enabled',
+            field=models.BooleanField(default=False, verbose_name='تفعيل التذكيرات'),
+        ),
+        migrations.AddField(
+            model_name='surveyinvitation',
+            name='last_reminded_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='تاريخ آخر تذكير'),
+        ),
+        migrations.AddField(
+            model_name='surveyinvitation',
+            name='reminder_count',
+            field=models.PositiveSmallIntegerField(default=0, verbose_name='عدد التذكيرات'),
+        ),
+        migrations.AddIndex(
+            model_name='surveyinvitation',
+            index=models.Index(fields=['survey', 'status', 'sent_at'], name='invitation_due_idx'),
+        ),
+    ]
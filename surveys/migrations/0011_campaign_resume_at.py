@@ -0,0 +1,24 @@
+# Generated by Django 5.2.3 on 2026-10-19 05:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('graduates', '0002_allow_null_fields'),
+        ('surveys', '0010_invitation_reminders'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sendcampaign',
+            name='resume_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='استئناف الإرسال في'),
+        ),
+        migrations.AlterField(
+            model_name='sendcampaign',
+            name='status',
+            field=models.CharField(choices=[('queued', 'في قائمة الانتظار'), ('running', 'جارٍ الإرسال'), ('deferred', 'مؤجلة لنافذة الإرسال التالية'), ('completed', 'مكتملة'), ('failed', 'فشلت')], default='queued', max_length=20, verbose_name='الحالة'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.3 on 2026-10-19 05:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('graduates', '0002_allow_null_fields'),
+        ('surveys', '0011_campaign_resume_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SuppressedContact',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('channel', models.CharField(choices=[('email', 'بريد إلكتروني'), ('whatsapp', 'واتساب')], max_length=10, verbose_name='القناة')),
+                ('address', models.CharField(max_length=254, verbose_name='العنوان')),
+                ('reason', models.CharField(choices=[('bounce', 'رسالة ارتداد'), ('hard_failure', 'فشل دائم عند الإرسال'), ('manual', 'إيقاف يدوي')], max_length=20, verbose_name='السبب')),
+                ('detail', models.TextField(blank=True, verbose_name='التفاصيل')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='تاريخ الإيقاف')),
+            ],
+            options={
+                'verbose_name': 'عنوان موقوف',
+                'verbose_name_plural': 'العناوين الموقوفة',
+                'ordering': ['-created_at'],
+                'unique_together': {('channel', 'address')},
+            },
+        ),
+    ]
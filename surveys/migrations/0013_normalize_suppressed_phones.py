@@ -0,0 +1,33 @@
+from django.db import migrations
+
+from graduates.phones import normalize_phone
+
+
+def normalize_suppressed_phones(apps, schema_editor):
+    """تحويل أرقام الواتساب الموقوفة إلى صيغة E.164 لتطابق الرقم الموحد للخريج"""
+    SuppressedContact = apps.get_model('surveys', 'SuppressedContact')
+    existing = set(
+        SuppressedContact.objects.filter(channel='whatsapp').values_list('address', flat=True)
+    )
+    for contact in SuppressedContact.objects.filter(channel='whatsapp'):
+        normalized = normalize_phone(contact.address)
+        if normalized == contact.address:
+            continue
+        if not normalized or normalized in existing:
+            contact.delete()
+            continue
+        contact.address = normalized
+        contact.save(update_fields=['address'])
+        existing.add(normalized)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('graduates', '0003_phone_normalized'),
+        ('surveys', '0012_suppressed_contacts'),
+    ]
+
+    operations = [
+        migrations.RunPython(normalize_suppressed_phones, migrations.RunPython.noop),
+    ]
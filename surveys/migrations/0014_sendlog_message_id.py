@@ -0,0 +1,19 @@
+# Generated by Django 5.2.3 on 2026-10-19 05:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('graduates', '0003_phone_normalized'),
+        ('surveys', '0013_normalize_suppressed_phones'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='surveysendlog',
+            name='message_id',
+            field=models.CharField(blank=True, db_index=True, max_length=128, verbose_name='معرّف الرسالة'),
+        ),
+    ]
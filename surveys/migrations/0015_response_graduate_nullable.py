@@ -0,0 +1,20 @@
+# Generated by Django 5.2.3 on 2026-10-19 05:44
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('graduates', '0003_phone_normalized'),
+        ('surveys', '0014_sendlog_message_id'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='surveyresponse',
+            name='graduate',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='survey_responses', to='graduates.graduate'),
+        ),
+    ]
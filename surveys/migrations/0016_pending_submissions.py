@@ -0,0 +1,29 @@
+# Generated by Django 5.2.3 on 2026-10-19 05:46
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('graduates', '0003_phone_normalized'),
+        ('surveys', '0015_response_graduate_nullable'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PendingSubmission',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('answers', models.JSONField(verbose_name='الإجابات')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='تاريخ الاستلام')),
+                ('survey', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pending_submissions', to='surveys.survey')),
+            ],
+            options={
+                'verbose_name': 'استجابة بانتظار الحفظ',
+                'verbose_name_plural': 'استجابات بانتظار الحفظ',
+                'ordering': ['id'],
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.3 on 2026-10-19 05:49
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_opened_count(apps, schema_editor):
+    Survey = apps.get_model('surveys', 'Survey')
+    SurveyInvitation = apps.get_model('surveys', 'SurveyInvitation')
+    opened = (
+        SurveyInvitation.objects.filter(opened_at__isnull=False)
+        .values('survey_id').annotate(total=Count('id')).order_by()
+    )
+    for row in opened:
+        Survey.objects.filter(pk=row['survey_id']).update(opened_count=row['total'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('graduates', '0003_phone_normalized'),
+        ('surveys', '0016_pending_submissions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='survey',
+            name='opened_count',
+            field=models.IntegerField(default=0, verbose_name='عدد الدعوات المفتوحة'),
+        ),
+        migrations.RunPython(backfill_opened_count, migrations.RunPython.noop),
+    ]
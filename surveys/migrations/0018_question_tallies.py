@@ -0,0 +1,33 @@
+# Generated by Django 5.2.3 on 2026-10-19 05:54
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('graduates', '0003_phone_normalized'),
+        ('surveys', '0017_survey_opened_count'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuestionTally',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('count', models.IntegerField(default=0, verbose_name='العدد')),
+                ('value_sum', models.DecimalField(decimal_places=2, default=0, max_digits=24, verbose_name='المجموع')),
+                ('value_sum_sq', models.DecimalField(decimal_places=4, default=0, max_digits=30, verbose_name='مجموع المربعات')),
+                ('value_min', models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True, verbose_name='أقل قيمة')),
+                ('value_max', models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True, verbose_name='أعلى قيمة')),
+                ('choice', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='tallies', to='surveys.questionchoice')),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tallies', to='surveys.question')),
+            ],
+            options={
+                'verbose_name': 'عداد إجابات سؤال',
+                'verbose_name_plural': 'عدادات إجابات الأسئلة',
+                'constraints': [models.UniqueConstraint(fields=('question', 'choice'), name='tally_question_choice_uniq'), models.UniqueConstraint(condition=models.Q(('choice__isnull', True)), fields=('question',), name='tally_question_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.3 on 2026-10-19 05:59
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('graduates', '0003_phone_normalized'),
+        ('surveys', '0018_question_tallies'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnswerTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=100, verbose_name='الكلمة')),
+                ('is_phrase', models.BooleanField(default=False, verbose_name='عبارة')),
+                ('frequency', models.PositiveSmallIntegerField(default=1, verbose_name='التكرار')),
+                ('answer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='terms', to='surveys.answer')),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='answer_terms', to='surveys.question')),
+            ],
+            options={
+                'verbose_name': 'كلمة إجابة',
+                'verbose_name_plural': 'فهرس كلمات الإجابات',
+                'indexes': [models.Index(fields=['question', 'is_phrase', 'term'], name='answer_term_question_idx'), models.Index(fields=['term'], name='answer_term_term_idx')],
+                'constraints': [models.UniqueConstraint(fields=('answer', 'term'), name='answer_term_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.3 on 2026-10-19 06:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('graduates', '0003_phone_normalized'),
+        ('surveys', '0019_answer_terms'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='answerterm',
+            name='answer_term_term_idx',
+        ),
+        migrations.AddIndex(
+            model_name='answerterm',
+            index=models.Index(fields=['term', 'is_phrase', 'answer', 'frequency'], name='answer_term_search_idx'),
+        ),
+    ]
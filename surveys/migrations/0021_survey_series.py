@@ -0,0 +1,67 @@
+# Generated by Django 5.2.3 on 2026-10-19 06:07
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('graduates', '0003_phone_normalized'),
+        ('surveys', '0020_answer_term_search_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SeriesQuestion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('question_text', models.TextField(verbose_name='نص السؤال')),
+                ('question_type', models.CharField(choices=[('text', 'نص'), ('textarea', 'نص طويل'), ('radio', 'اختيار من متعدد'), ('checkbox', 'اختيار متعدد'), ('select', 'قائمة منسدلة'), ('number', 'رقم'), ('email', 'بريد إلكتروني'), ('date', 'تاريخ'), ('rating', 'تقييم')], max_length=20, verbose_name='نوع السؤال')),
+                ('order', models.PositiveIntegerField(default=0, verbose_name='الترتيب')),
+            ],
+            options={
+                'verbose_name': 'سؤال سلسلة',
+                'verbose_name_plural': 'أسئلة السلاسل',
+                'ordering': ['series', 'order', 'id'],
+            },
+        ),
+        migrations.AddField(
+            model_name='survey',
+            name='wave_label',
+            field=models.CharField(blank=True, max_length=50, verbose_name='اسم الموجة'),
+        ),
+        migrations.AddField(
+            model_name='question',
+            name='series_question',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='wave_questions', to='surveys.seriesquestion', verbose_name='السؤال المقابل في السلسلة'),
+        ),
+        migrations.CreateModel(
+            name='SurveySeries',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(max_length=200, verbose_name='عنوان السلسلة')),
+                ('description', models.TextField(blank=True, verbose_name='الوصف')),
+                ('template_name', models.CharField(blank=True, max_length=100, verbose_name='اسم القالب')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='تاريخ الإنشاء')),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL, verbose_name='أنشئ بواسطة')),
+            ],
+            options={
+                'verbose_name': 'سلسلة استبيانات',
+                'verbose_name_plural': 'سلاسل الاستبيانات',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='seriesquestion',
+            name='series',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='questions', to='surveys.surveyseries'),
+        ),
+        migrations.AddField(
+            model_name='survey',
+            name='series',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='waves', to='surveys.surveyseries', verbose_name='السلسلة'),
+        ),
+    ]
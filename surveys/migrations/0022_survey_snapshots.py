@@ -0,0 +1,32 @@
+# Generated by Django 5.2.3 on 2026-10-19 06:09
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('graduates', '0003_phone_normalized'),
+        ('surveys', '0021_survey_series'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SurveySnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('payload', models.BinaryField(verbose_name='التجميعات (JSON مضغوط)')),
+                ('responses_received', models.IntegerField(default=0, verbose_name='عدد الاستجابات عند البناء')),
+                ('csv_file', models.FileField(blank=True, upload_to='survey_snapshots/', verbose_name='ملف CSV')),
+                ('xlsx_file', models.FileField(blank=True, upload_to='survey_snapshots/', verbose_name='ملف Excel')),
+                ('pdf_file', models.FileField(blank=True, upload_to='survey_snapshots/', verbose_name='ملف PDF')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='تاريخ البناء')),
+                ('survey', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='snapshot', to='surveys.survey')),
+            ],
+            options={
+                'verbose_name': 'لقطة نتائج استبيان',
+                'verbose_name_plural': 'لقطات نتائج الاستبيانات',
+            },
+        ),
+    ]
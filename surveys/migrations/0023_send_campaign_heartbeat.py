@@ -0,0 +1,18 @@
+# Generated by Django 5.2.3 on 2026-10-19 06:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('surveys', '0022_survey_snapshots'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sendcampaign',
+            name='heartbeat_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='آخر نشاط للإرسال'),
+        ),
+    ]
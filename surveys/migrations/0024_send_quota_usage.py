@@ -0,0 +1,29 @@
+# Generated by Django 5.2.3 on 2026-10-19 06:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('surveys', '0023_send_campaign_heartbeat'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SendQuotaUsage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('channel', models.CharField(max_length=10, verbose_name='القناة')),
+                ('account', models.CharField(max_length=100, verbose_name='الحساب')),
+                ('window', models.CharField(choices=[('day', 'يوم'), ('minute', 'دقيقة')], max_length=10, verbose_name='النافذة')),
+                ('window_start', models.DateTimeField(verbose_name='بداية النافذة')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='العدد')),
+            ],
+            options={
+                'verbose_name': 'استهلاك حصة الإرسال',
+                'verbose_name_plural': 'استهلاك حصص الإرسال',
+                'unique_together': {('channel', 'account', 'window', 'window_start')},
+            },
+        ),
+    ]
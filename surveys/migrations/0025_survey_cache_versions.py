@@ -0,0 +1,25 @@
+# Generated by Django 5.2.3 on 2026-10-19 06:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('surveys', '0024_send_quota_usage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SurveyCacheVersion',
+            fields=[
+                ('survey_id', models.PositiveIntegerField(primary_key=True, serialize=False, verbose_name='الاستبيان')),
+                ('definition', models.PositiveIntegerField(default=0, verbose_name='إصدار التعريف')),
+                ('data', models.PositiveIntegerField(default=0, verbose_name='إصدار البيانات')),
+            ],
+            options={
+                'verbose_name': 'إصدار كاش استبيان',
+                'verbose_name_plural': 'إصدارات كاش الاستبيانات',
+            },
+        ),
+    ]
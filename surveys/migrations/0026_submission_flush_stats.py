@@ -0,0 +1,27 @@
+# Generated by Django 5.2.3 on 2026-10-19 06:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('surveys', '0025_survey_cache_versions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SubmissionFlush',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('finished_at', models.DateTimeField(db_index=True, verbose_name='وقت الانتهاء')),
+                ('count', models.PositiveIntegerField(verbose_name='عدد الاستجابات')),
+                ('seconds', models.FloatField(verbose_name='المدة بالثواني')),
+            ],
+            options={
+                'verbose_name': 'عملية حفظ استجابات منتظرة',
+                'verbose_name_plural': 'عمليات حفظ الاستجابات المنتظرة',
+                'ordering': ['-finished_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.3 on 2026-10-19 06:36
+
+from django.db import migrations, models
+from django.db.models import Count, F, Max, Min, Sum
+
+
+def fill_choice_key(apps, schema_editor):
+    """
+    ملء مفتاح الخيار ودمج صفوف السؤال المكررة (من استجابات متزامنة دون
+    قيد تفرد في MySQL): كل صف يحمل جزءاً من التغييرات فيُجمع العدد والمجموع.
+    """
+    QuestionTally = apps.get_model('surveys', 'QuestionTally')
+    QuestionTally.objects.filter(choice__isnull=False).update(choice_key=F('choice_id'))
+
+    duplicates = (
+        QuestionTally.objects.order_by().values('question_id', 'choice_key')
+        .annotate(rows=Count('id')).filter(rows__gt=1)
+    )
+    for row in duplicates:
+        tallies = QuestionTally.objects.filter(question_id=row['question_id'], choice_key=row['choice_key'])
+        merged = tallies.aggregate(
+            first=Min('id'), count=Sum('count'), value_sum=Sum('value_sum'), value_sum_sq=Sum('value_sum_sq'),
+            value_min=Min('value_min'), value_max=Max('value_max'),
+        )
+        first = merged.pop('first')
+        tallies.exclude(pk=first).delete()
+        QuestionTally.objects.filter(pk=first).update(**merged)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('surveys', '0026_submission_flush_stats'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='questiontally',
+            name='tally_question_uniq',
+        ),
+        migrations.RemoveConstraint(
+            model_name='questiontally',
+            name='tally_question_choice_uniq',
+        ),
+        migrations.AddField(
+            model_name='questiontally',
+            name='choice_key',
+            field=models.PositiveIntegerField(default=0, verbose_name='مفتاح الخيار'),
+        ),
+        migrations.RunPython(fill_choice_key, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='questiontally',
+            constraint=models.UniqueConstraint(fields=('question', 'choice_key'), name='tally_question_choice_key_uniq'),
+        ),
+    ]
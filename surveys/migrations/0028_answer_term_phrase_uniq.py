@@ -0,0 +1,21 @@
+# Generated by Django 5.2.3 on 2026-10-19 06:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('surveys', '0027_tally_choice_key'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='answerterm',
+            name='answer_term_uniq',
+        ),
+        migrations.AddConstraint(
+            model_name='answerterm',
+            constraint=models.UniqueConstraint(fields=('answer', 'is_phrase', 'term'), name='answer_term_phrase_uniq'),
+        ),
+    ]
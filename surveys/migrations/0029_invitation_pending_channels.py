@@ -0,0 +1,18 @@
+# Generated by Django 5.2.3 on 2026-10-19 06:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('surveys', '0028_answer_term_phrase_uniq'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='surveyinvitation',
+            name='pending_channels',
+            field=models.CharField(blank=True, default='', max_length=20, verbose_name='القنوات المتبقية'),
+        ),
+    ]
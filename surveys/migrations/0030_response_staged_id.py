@@ -0,0 +1,18 @@
+# Generated by Django 5.2.3 on 2026-10-19 06:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('surveys', '0029_invitation_pending_channels'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='surveyresponse',
+            name='staged_id',
+            field=models.PositiveBigIntegerField(blank=True, null=True, unique=True, verbose_name='رقم الاستجابة المنتظرة'),
+        ),
+    ]
@@ -2,6 +2,7 @@ from django.db import models
 from django.contrib.auth.models import User
 from graduates.models import Graduate
 from django.urls import reverse
+from django.utils import timezone
 
 
 class Survey(models.Model):
@@ -59,12 +60,29 @@ class Survey(models.Model):
     email_message = models.TextField(blank=True, verbose_name='رسالة البريد الإلكتروني')
     whatsapp_message = models.TextField(blank=True, verbose_name='رسالة الواتساب')
     
+    # سياسة التذكير لمن لم يكمل الاستبيان
+    reminders_enabled = models.BooleanField(default=False, verbose_name='تفعيل التذكيرات')
+    reminder_max_count = models.PositiveSmallIntegerField(default=2, verbose_name='الحد الأقصى للتذكيرات')
+    reminder_interval_days = models.PositiveSmallIntegerField(default=3, verbose_name='الفاصل بين التذكيرات (أيام)')
+    
     # إحصائيات الإرسال
     total_sent = models.IntegerField(default=0, verbose_name='إجمالي المرسل إليهم')
     email_sent = models.IntegerField(default=0, verbose_name='عدد رسائل البريد المرسلة')
     whatsapp_sent = models.IntegerField(default=0, verbose_name='عدد رسائل الواتساب المرسلة')
+    opened_count = models.IntegerField(default=0, verbose_name='عدد الدعوات المفتوحة')
     responses_received = models.IntegerField(default=0, verbose_name='عدد الاستجابات المستلمة')
     
+    # الموجة ضمن سلسلة استبيانات متكررة (مثل استبيان التوظيف السنوي)
+    series = models.ForeignKey(
+        'SurveySeries',
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        related_name='waves',
+        verbose_name='السلسلة'
+    )
+    wave_label = models.CharField(max_length=50, blank=True, verbose_name='اسم الموجة')
+    
     class Meta:
         verbose_name = 'استبيان'
         verbose_name_plural = 'الاستبيانات'
@@ -143,6 +161,12 @@ class Survey(models.Model):
             return round((self.responses_received / self.total_sent) * 100, 1)
         return 0
 
+    def get_open_rate(self):
+        """حساب معدل فتح الدعوات"""
+        if self.total_sent > 0:
+            return round((self.opened_count / self.total_sent) * 100, 1)
+        return 0
+
 
 class Question(models.Model):
     QUESTION_TYPES = [
@@ -167,6 +191,14 @@ class Question(models.Model):
     is_required = models.BooleanField(default=False, verbose_name='مطلوب')
     order = models.PositiveIntegerField(default=0, verbose_name='الترتيب')
     help_text = models.CharField(max_length=200, blank=True, verbose_name='نص المساعدة')
+    series_question = models.ForeignKey(
+        'SeriesQuestion',
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        related_name='wave_questions',
+        verbose_name='السؤال المقابل في السلسلة'
+    )
     
     class Meta:
         verbose_name = 'سؤال'
@@ -193,9 +225,13 @@ class QuestionChoice(models.Model):
 
 class SurveyResponse(models.Model):
     survey = models.ForeignKey(Survey, on_delete=models.CASCADE, related_name='responses')
-    graduate = models.ForeignKey(Graduate, on_delete=models.CASCADE, related_name='survey_responses')
+    # فارغ للاستجابات العامة من صفحات الاستبيان بدون دعوة
+    graduate = models.ForeignKey(Graduate, on_delete=models.CASCADE, null=True, blank=True, related_name='survey_responses')
     submitted_at = models.DateTimeField(auto_now_add=True, verbose_name='تاريخ الإرسال')
     is_complete = models.BooleanField(default=False, verbose_name='مكتمل')
+    # معرّف الاستجابة المنتظرة التي حُفظت منها (الحفظ المؤجل) لقراءة مفاتيح
+    # الإدراج المجمع في قواعد البيانات التي لا تعيدها (MySQL)
+    staged_id = models.PositiveBigIntegerField(blank=True, null=True, unique=True, verbose_name='رقم الاستجابة المنتظرة')
     
     class Meta:
         verbose_name = 'استجابة الاستبيان'
@@ -204,7 +240,7 @@ class SurveyResponse(models.Model):
         ordering = ['-submitted_at']
     
     def __str__(self):
-        return f"{self.graduate.full_name} - {self.survey.title}"
+        return f"{self.graduate.full_name if self.graduate else 'مجهول'} - {self.survey.title}"
 
 
 class Answer(models.Model):
@@ -231,7 +267,89 @@ class Answer(models.Model):
         unique_together = ['response', 'question']
     
     def __str__(self):
-        return f"{self.response.graduate.full_name} - {self.question.question_text[:30]}"
+        graduate = self.response.graduate
+        return f"{graduate.full_name if graduate else 'مجهول'} - {self.question.question_text[:30]}"
+
+
+class SendCampaign(models.Model):
+    """حملة إرسال استبيان مع عدادات التقدم لكل قناة"""
+    STATUS_CHOICES = [
+        ('queued', 'في قائمة الانتظار'),
+        ('running', 'جارٍ الإرسال'),
+        ('deferred', 'مؤجلة لنافذة الإرسال التالية'),
+        ('completed', 'مكتملة'),
+        ('failed', 'فشلت'),
+    ]
+    # حالات الحملة التي لم تنته بعد وتملك دعواتها
+    ACTIVE_STATUSES = ('queued', 'running', 'deferred')
+
+    survey = models.ForeignKey(Survey, on_delete=models.CASCADE, related_name='campaigns')
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, verbose_name='أنشئت بواسطة')
+    send_method = models.CharField(max_length=10, choices=Survey.SEND_METHOD_CHOICES, verbose_name='طريقة الإرسال')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued', verbose_name='الحالة')
+    error_message = models.TextField(blank=True, verbose_name='رسالة الخطأ')
+    # مرشحات شريحة المستلمين، تُحل على الخادم على دفعات عند تشغيل الحملة
+    segment_filters = models.JSONField(blank=True, null=True, verbose_name='مرشحات الشريحة')
+    recipients_resolved = models.BooleanField(default=False, verbose_name='تم تجهيز المستلمين')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='تاريخ الإنشاء')
+    started_at = models.DateTimeField(blank=True, null=True, verbose_name='بدء الإرسال')
+    finished_at = models.DateTimeField(blank=True, null=True, verbose_name='انتهاء الإرسال')
+    resume_at = models.DateTimeField(blank=True, null=True, verbose_name='استئناف الإرسال في')
+    # يُحدّث مع كل دفعة؛ الحملة الجارية التي توقف تحديثه توقف منفذها (مثل إعادة تشغيل العامل)
+    heartbeat_at = models.DateTimeField(blank=True, null=True, verbose_name='آخر نشاط للإرسال')
+
+    # عدادات التقدم: تُزاد بتحديث F() واحد لكل دفعة دون عدّ سجلات الإرسال
+    email_queued = models.PositiveIntegerField(default=0, verbose_name='بريد في الانتظار')
+    email_sent = models.PositiveIntegerField(default=0, verbose_name='بريد مرسل')
+    email_failed = models.PositiveIntegerField(default=0, verbose_name='بريد فاشل')
+    email_skipped = models.PositiveIntegerField(default=0, verbose_name='بريد متخطى')
+    whatsapp_queued = models.PositiveIntegerField(default=0, verbose_name='واتساب في الانتظار')
+    whatsapp_sent = models.PositiveIntegerField(default=0, verbose_name='واتساب مرسل')
+    whatsapp_failed = models.PositiveIntegerField(default=0, verbose_name='واتساب فاشل')
+    whatsapp_skipped = models.PositiveIntegerField(default=0, verbose_name='واتساب متخطى')
+
+    class Meta:
+        verbose_name = 'حملة إرسال'
+        verbose_name_plural = 'حملات الإرسال'
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"حملة {self.survey.title} - {self.get_status_display()}"
+
+    @property
+    def channels(self):
+        """القنوات المستخدمة في الحملة"""
+        if self.send_method == 'both':
+            return ['email', 'whatsapp']
+        return [self.send_method]
+
+    def get_progress(self):
+        """
+        ملخص التقدم بصيغة قابلة للتحويل إلى JSON. المستلمون المتخطون (دون
+        بيانات تواصل أو أكملوا الاستبيان أو تملكهم حملة أخرى) يُحسبون ضمن
+        المعالَجين، فتصل الحملة المكتملة إلى 100%.
+        """
+        channels = {}
+        total_queued = total_done = 0
+        for channel in self.channels:
+            counts = {
+                key: getattr(self, f'{channel}_{key}')
+                for key in ('queued', 'sent', 'failed', 'skipped')
+            }
+            channels[channel] = counts
+            total_queued += counts['queued']
+            total_done += counts['sent'] + counts['failed'] + counts['skipped']
+        return {
+            'id': self.pk,
+            'status': self.status,
+            'status_display': self.get_status_display(),
+            'channels': channels,
+            'processed': total_done,
+            'total': total_queued,
+            'percent': min(round(total_done / total_queued * 100, 1), 100.0) if total_queued else 100.0,
+            'finished': self.status in ('completed', 'failed'),
+            'resume_at': timezone.localtime(self.resume_at).strftime('%Y-%m-%d %H:%M') if self.status == 'deferred' and self.resume_at else None,
+        }
 
 
 class SurveyInvitation(models.Model):
@@ -256,40 +374,183 @@ class SurveyInvitation(models.Model):
     opened_at = models.DateTimeField(blank=True, null=True, verbose_name='تاريخ الفتح')
     completed_at = models.DateTimeField(blank=True, null=True, verbose_name='تاريخ الإكمال')
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='تاريخ الإنشاء')
+    reminder_count = models.PositiveSmallIntegerField(default=0, verbose_name='عدد التذكيرات')
+    last_reminded_at = models.DateTimeField(blank=True, null=True, verbose_name='تاريخ آخر تذكير')
+    campaign = models.ForeignKey(
+        SendCampaign,
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        related_name='invitations',
+        verbose_name='حملة الإرسال'
+    )
+    # القنوات المؤجلة لانتهاء حصتها بعد الإرسال عبر قناة أخرى (مفصولة بفواصل)،
+    # تبقى الدعوة معلقة حتى تُرسل عبرها. الفارغ يعني جميع القنوات
+    pending_channels = models.CharField(max_length=20, blank=True, default='', verbose_name='القنوات المتبقية')
     
     class Meta:
         verbose_name = 'دعوة استبيان'
         verbose_name_plural = 'دعوات الاستبيانات'
         unique_together = ['survey', 'graduate']
         ordering = ['-created_at']
+        indexes = [
+            # اختيار الدعوات المستحقة للتذكير حسب الاستبيان والحالة وتاريخ الإرسال
+            models.Index(fields=['survey', 'status', 'sent_at'], name='invitation_due_idx'),
+        ]
     
     def __str__(self):
         return f"دعوة {self.graduate.full_name} لـ {self.survey.title}"
 
+    def remaining_channels(self, channels):
+        """قنوات الإرسال التي لم تُرسل عبرها الدعوة بعد من القنوات المطلوبة"""
+        if not self.pending_channels:
+            return list(channels)
+        pending = self.pending_channels.split(',')
+        return [channel for channel in channels if channel in pending]
+
 
 class SurveySendLog(models.Model):
     """سجل إرسال الاستبيانات"""
-    survey = models.ForeignKey(Survey, on_delete=models.CASCADE, related_name='send_logs')
-    graduate = models.ForeignKey('graduates.Graduate', on_delete=models.CASCADE)
-    send_method = models.CharField(max_length=10, choices=Survey.SEND_METHOD_CHOICES)
-    sent_at = models.DateTimeField(auto_now_add=True)
-    status = models.CharField(max_length=20, default='sent', choices=[
+    STATUS_CHOICES = [
         ('sent', 'تم الإرسال'),
         ('failed', 'فشل الإرسال'),
         ('delivered', 'تم التسليم'),
         ('read', 'تم القراءة'),
-    ])
+    ]
+
+    survey = models.ForeignKey(Survey, on_delete=models.CASCADE, related_name='send_logs')
+    graduate = models.ForeignKey('graduates.Graduate', on_delete=models.CASCADE)
+    send_method = models.CharField(max_length=10, choices=Survey.SEND_METHOD_CHOICES)
+    sent_at = models.DateTimeField(auto_now_add=True)
+    status = models.CharField(max_length=20, default='sent', choices=STATUS_CHOICES)
     error_message = models.TextField(blank=True)
+    # معرّف الرسالة لدى مزود الواتساب لربط إشعارات حالة التسليم بالسجل
+    message_id = models.CharField(max_length=128, blank=True, db_index=True, verbose_name='معرّف الرسالة')
     
     class Meta:
         verbose_name = 'سجل إرسال استبيان'
         verbose_name_plural = 'سجلات إرسال الاستبيانات'
         ordering = ['-sent_at']
+        indexes = [
+            # للتقسيم إلى صفحات بالمفتاح (keyset) داخل سجلات الاستبيان الواحد
+            models.Index(fields=['survey', 'id'], name='sendlog_survey_id_idx'),
+            # لحذف السجلات الأقدم من فترة الاحتفاظ
+            models.Index(fields=['sent_at'], name='sendlog_sent_at_idx'),
+        ]
     
     def __str__(self):
         return f"{self.survey.title} - {self.graduate.full_name} - {self.send_method}"
 
 
+class SurveySendLogDaily(models.Model):
+    """ملخص يومي لسجلات الإرسال لكل استبيان وقناة وحالة"""
+    survey = models.ForeignKey(Survey, on_delete=models.CASCADE, related_name='send_log_rollups')
+    day = models.DateField(verbose_name='اليوم')
+    send_method = models.CharField(max_length=10, choices=Survey.SEND_METHOD_CHOICES, verbose_name='طريقة الإرسال')
+    status = models.CharField(max_length=20, choices=SurveySendLog.STATUS_CHOICES, verbose_name='الحالة')
+    count = models.PositiveIntegerField(default=0, verbose_name='العدد')
+
+    class Meta:
+        verbose_name = 'ملخص يومي لسجلات الإرسال'
+        verbose_name_plural = 'الملخصات اليومية لسجلات الإرسال'
+        unique_together = ['survey', 'day', 'send_method', 'status']
+        ordering = ['-day', 'send_method', 'status']
+
+    def __str__(self):
+        return f"{self.survey.title} - {self.day} - {self.send_method} - {self.status}: {self.count}"
+
+
+class SendQuotaUsage(models.Model):
+    """
+    عدد الرسائل المرسلة من حساب إرسال في نافذة زمنية (يوم أو دقيقة)، في
+    قاعدة البيانات حتى تتشارك جميع العمليات (العمال والأوامر) حصة المزود نفسها
+    """
+    WINDOW_CHOICES = [
+        ('day', 'يوم'),
+        ('minute', 'دقيقة'),
+    ]
+
+    channel = models.CharField(max_length=10, verbose_name='القناة')
+    account = models.CharField(max_length=100, verbose_name='الحساب')
+    window = models.CharField(max_length=10, choices=WINDOW_CHOICES, verbose_name='النافذة')
+    window_start = models.DateTimeField(verbose_name='بداية النافذة')
+    count = models.PositiveIntegerField(default=0, verbose_name='العدد')
+
+    class Meta:
+        verbose_name = 'استهلاك حصة الإرسال'
+        verbose_name_plural = 'استهلاك حصص الإرسال'
+        unique_together = ['channel', 'account', 'window', 'window_start']
+
+    def __str__(self):
+        return f"{self.channel}:{self.account} - {self.window} {self.window_start}: {self.count}"
+
+
+class SuppressedContact(models.Model):
+    """عنوان بريد أو رقم هاتف موقوف عن الإرسال بسبب ارتداد أو فشل دائم"""
+    CHANNEL_CHOICES = [
+        ('email', 'بريد إلكتروني'),
+        ('whatsapp', 'واتساب'),
+    ]
+    REASON_CHOICES = [
+        ('bounce', 'رسالة ارتداد'),
+        ('hard_failure', 'فشل دائم عند الإرسال'),
+        ('manual', 'إيقاف يدوي'),
+    ]
+
+    channel = models.CharField(max_length=10, choices=CHANNEL_CHOICES, verbose_name='القناة')
+    # البريد يُحفظ بأحرف صغيرة، والهاتف بصيغة E.164
+    address = models.CharField(max_length=254, verbose_name='العنوان')
+    reason = models.CharField(max_length=20, choices=REASON_CHOICES, verbose_name='السبب')
+    detail = models.TextField(blank=True, verbose_name='التفاصيل')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='تاريخ الإيقاف')
+
+    class Meta:
+        verbose_name = 'عنوان موقوف'
+        verbose_name_plural = 'العناوين الموقوفة'
+        unique_together = ['channel', 'address']
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.get_channel_display()}: {self.address}"
+
+
+class PendingSubmission(models.Model):
+    """
+    استجابة عامة مستلمة ومتحقق منها بانتظار تحويلها إلى SurveyResponse وإجاباتها
+    (يكتبها الأمر flush_survey_submissions على دفعات)
+    """
+    survey = models.ForeignKey(Survey, on_delete=models.CASCADE, related_name='pending_submissions')
+    # الإجابات بالصيغة المختصرة من SubmissionWriter.validate
+    answers = models.JSONField(verbose_name='الإجابات')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='تاريخ الاستلام')
+
+    class Meta:
+        verbose_name = 'استجابة بانتظار الحفظ'
+        verbose_name_plural = 'استجابات بانتظار الحفظ'
+        ordering = ['id']
+
+    def __str__(self):
+        return f"{self.survey_id} - {self.created_at:%Y-%m-%d %H:%M}"
+
+
+class SubmissionFlush(models.Model):
+    """
+    نتيجة تشغيل لعملية حفظ الاستجابات المنتظرة، في قاعدة البيانات حتى تقرأها
+    مؤشرات الضغط في عمال الويب (العملية تعمل في أمر مستقل)
+    """
+    finished_at = models.DateTimeField(db_index=True, verbose_name='وقت الانتهاء')
+    count = models.PositiveIntegerField(verbose_name='عدد الاستجابات')
+    seconds = models.FloatField(verbose_name='المدة بالثواني')
+
+    class Meta:
+        verbose_name = 'عملية حفظ استجابات منتظرة'
+        verbose_name_plural = 'عمليات حفظ الاستجابات المنتظرة'
+        ordering = ['-finished_at']
+
+    def __str__(self):
+        return f"{self.finished_at:%Y-%m-%d %H:%M} - {self.count}"
+
+
 class SurveyTemplate(models.Model):
     """
     نموذج لقالب الاستبيان لتخزين قوالب الأسئلة الجاهزة
@@ -331,3 +592,136 @@ class Graduate(models.Model):
 
     def __str__(self):
         return self.full_name
+
+
+class SurveyCacheVersion(models.Model):
+    """
+    إصدارا تعريف الاستبيان وبياناته لمفاتيح الكاش، في قاعدة البيانات حتى
+    يرى كل عامل تعديلات العمال الآخرين. بدون مفتاح أجنبي حتى لا يعيد
+    حفظ نسخة قديمة من الاستبيان إصداراً سابقاً ولا يتعارض مع الحذف المتتالي.
+    """
+    survey_id = models.PositiveIntegerField(primary_key=True, verbose_name='الاستبيان')
+    definition = models.PositiveIntegerField(default=0, verbose_name='إصدار التعريف')
+    data = models.PositiveIntegerField(default=0, verbose_name='إصدار البيانات')
+
+    class Meta:
+        verbose_name = 'إصدار كاش استبيان'
+        verbose_name_plural = 'إصدارات كاش الاستبيانات'
+
+    def __str__(self):
+        return f"{self.survey_id}: {self.definition}.{self.data}"
+
+
+class QuestionTally(models.Model):
+    """
+    عدادات إجابات سؤال تُحدّث مع كل استجابة مكتملة: صف لكل خيار بعدد مرات
+    اختياره، وصف للسؤال نفسه (بدون خيار) بعدد الإجابات والمجموع ومجموع
+    المربعات والحدود للأسئلة الرقمية (وللتواريخ كأرقام أيام).
+    """
+    question = models.ForeignKey(Question, on_delete=models.CASCADE, related_name='tallies')
+    choice = models.ForeignKey(QuestionChoice, on_delete=models.CASCADE, blank=True, null=True, related_name='tallies')
+    # معرّف الخيار أو 0 لصف السؤال: قيمة غير فارغة حتى يمنع قيد التفرد العادي
+    # (المدعوم في MySQL) تكرار صف السؤال عند أول استجابتين متزامنتين
+    choice_key = models.PositiveIntegerField(default=0, verbose_name='مفتاح الخيار')
+    count = models.IntegerField(default=0, verbose_name='العدد')
+    value_sum = models.DecimalField(max_digits=24, decimal_places=2, default=0, verbose_name='المجموع')
+    value_sum_sq = models.DecimalField(max_digits=30, decimal_places=4, default=0, verbose_name='مجموع المربعات')
+    value_min = models.DecimalField(max_digits=12, decimal_places=2, blank=True, null=True, verbose_name='أقل قيمة')
+    value_max = models.DecimalField(max_digits=12, decimal_places=2, blank=True, null=True, verbose_name='أعلى قيمة')
+
+    class Meta:
+        verbose_name = 'عداد إجابات سؤال'
+        verbose_name_plural = 'عدادات إجابات الأسئلة'
+        constraints = [
+            models.UniqueConstraint(fields=['question', 'choice_key'], name='tally_question_choice_key_uniq'),
+        ]
+
+    def __str__(self):
+        label = self.choice.choice_text if self.choice_id else 'الإجمالي'
+        return f"{self.question.question_text[:30]} - {label}: {self.count}"
+
+
+class SurveySnapshot(models.Model):
+    """
+    نتائج استبيان مغلق مجمدة: جميع التجميعات كـ JSON مضغوط وملفات التصدير
+    الجاهزة، يبنيها الأمر build_survey_snapshots بعد إغلاق الاستبيان وتُحذف عند إعادة فتحه.
+    """
+    survey = models.OneToOneField(Survey, on_delete=models.CASCADE, related_name='snapshot')
+    payload = models.BinaryField(verbose_name='التجميعات (JSON مضغوط)')
+    responses_received = models.IntegerField(default=0, verbose_name='عدد الاستجابات عند البناء')
+    csv_file = models.FileField(upload_to='survey_snapshots/', blank=True, verbose_name='ملف CSV')
+    xlsx_file = models.FileField(upload_to='survey_snapshots/', blank=True, verbose_name='ملف Excel')
+    pdf_file = models.FileField(upload_to='survey_snapshots/', blank=True, verbose_name='ملف PDF')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='تاريخ البناء')
+
+    class Meta:
+        verbose_name = 'لقطة نتائج استبيان'
+        verbose_name_plural = 'لقطات نتائج الاستبيانات'
+
+    def __str__(self):
+        return f"{self.survey.title} - {self.created_at:%Y-%m-%d}"
+
+
+class SurveySeries(models.Model):
+    """
+    سلسلة استبيانات تُعاد دورياً (موجات): كل موجة استبيان مستقل، وأسئلتها
+    مربوطة بأسئلة السلسلة المقابلة لمقارنة النتائج بين الموجات.
+    """
+    title = models.CharField(max_length=200, verbose_name='عنوان السلسلة')
+    description = models.TextField(blank=True, verbose_name='الوصف')
+    template_name = models.CharField(max_length=100, blank=True, verbose_name='اسم القالب')
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, blank=True, null=True, verbose_name='أنشئ بواسطة')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='تاريخ الإنشاء')
+
+    class Meta:
+        verbose_name = 'سلسلة استبيانات'
+        verbose_name_plural = 'سلاسل الاستبيانات'
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return self.title
+
+
+class SeriesQuestion(models.Model):
+    """سؤال موحد في السلسلة تُربط به الأسئلة المتكافئة من كل موجة"""
+    series = models.ForeignKey(SurveySeries, on_delete=models.CASCADE, related_name='questions')
+    question_text = models.TextField(verbose_name='نص السؤال')
+    question_type = models.CharField(max_length=20, choices=Question.QUESTION_TYPES, verbose_name='نوع السؤال')
+    order = models.PositiveIntegerField(default=0, verbose_name='الترتيب')
+
+    class Meta:
+        verbose_name = 'سؤال سلسلة'
+        verbose_name_plural = 'أسئلة السلاسل'
+        ordering = ['series', 'order', 'id']
+
+    def __str__(self):
+        return f"{self.series.title} - {self.question_text[:50]}"
+
+
+class AnswerTerm(models.Model):
+    """
+    فهرس الكلمات للإجابات النصية: صف لكل كلمة (أو عبارة من كلمتين) مطبّعة
+    في الإجابة مع عدد تكرارها، يُكتب مع حفظ الإجابات لتحليل النصوص والبحث
+    دون المرور على نصوص جميع الإجابات.
+    """
+    answer = models.ForeignKey(Answer, on_delete=models.CASCADE, related_name='terms')
+    question = models.ForeignKey(Question, on_delete=models.CASCADE, related_name='answer_terms')
+    term = models.CharField(max_length=100, verbose_name='الكلمة')
+    is_phrase = models.BooleanField(default=False, verbose_name='عبارة')
+    frequency = models.PositiveSmallIntegerField(default=1, verbose_name='التكرار')
+
+    class Meta:
+        verbose_name = 'كلمة إجابة'
+        verbose_name_plural = 'فهرس كلمات الإجابات'
+        constraints = [
+            # الكلمة الطويلة المقتطعة قد تساوي عبارة مقتطعة تبدأ بها
+            models.UniqueConstraint(fields=['answer', 'is_phrase', 'term'], name='answer_term_phrase_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['question', 'is_phrase', 'term'], name='answer_term_question_idx'),
+            # يغطي البحث بالكلمات دون الرجوع إلى صفوف الجدول
+            models.Index(fields=['term', 'is_phrase', 'answer', 'frequency'], name='answer_term_search_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.term} ({self.frequency})"
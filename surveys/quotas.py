@@ -0,0 +1,297 @@
+"""
+Provider Quota Scheduler
+توزيع الإرسال على حسابات البريد وأرقام الواتساب المعرّفة مع احترام حدود كل مزود
+"""
+
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import get_connection
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import SendQuotaUsage
+from .whatsapp_service import WhatsAppService, get_whatsapp_service
+
+
+class SenderAccount:
+    """حساب إرسال واحد (حساب SMTP أو رقم واتساب) مع حدوده اليومية وبالدقيقة"""
+
+    def __init__(self, channel, name, daily_limit, per_minute, options=None):
+        self.channel = channel
+        self.name = name
+        self.daily_limit = daily_limit
+        self.per_minute = per_minute
+        self.options = options or {}
+        # اتصال SMTP لكل خيط لأن الاتصال الواحد لا يصلح للإرسال المتوازي
+        self._local = threading.local()
+        self._whatsapp_service = None
+
+    def __repr__(self):
+        return f'<SenderAccount {self.channel}:{self.name}>'
+
+    @property
+    def from_email(self):
+        """عنوان المرسل الخاص بالحساب (يشترط Gmail تطابقه مع حساب الدخول)"""
+        return self.options.get('from_email') or self.options.get('username')
+
+    def get_connection(self):
+        """اتصال SMTP خاص بالحساب لتمريره إلى send_mail (الافتراضي عند عدم تحديد خادم)"""
+        options = self.options
+        if not options.get('host'):
+            return None
+        if getattr(self._local, 'connection', None) is None:
+            self._local.connection = get_connection(
+                host=options['host'],
+                port=options.get('port', 587),
+                username=options.get('username'),
+                password=options.get('password'),
+                use_tls=options.get('use_tls', True),
+                use_ssl=options.get('use_ssl', False),
+                timeout=getattr(settings, 'EMAIL_TIMEOUT', None),
+            )
+        return self._local.connection
+
+    def get_whatsapp_service(self):
+        """خدمة واتساب مرتبطة برقم الحساب (الخدمة الافتراضية عند عدم تحديد رمز)"""
+        if self._whatsapp_service is None:
+            if self.options.get('access_token'):
+                service = WhatsAppService()
+                service.phone_number_id = self.options.get('phone_number_id', service.phone_number_id)
+                service.access_token = self.options['access_token']
+                self._whatsapp_service = service
+            else:
+                self._whatsapp_service = get_whatsapp_service()
+        return self._whatsapp_service
+
+
+def get_sender_accounts(channel):
+    """
+    حسابات الإرسال المعرفة للقناة. إن لم تُعرّف قائمة حسابات يُستخدم
+    الحساب الافتراضي من إعدادات البريد أو الواتساب الحالية.
+    """
+    if channel == 'email':
+        accounts = getattr(settings, 'SURVEY_EMAIL_ACCOUNTS', None) or [{
+            'name': getattr(settings, 'EMAIL_HOST_USER', None) or 'default',
+        }]
+        defaults = getattr(settings, 'SURVEY_EMAIL_DEFAULT_LIMITS', {'daily_limit': 500, 'per_minute': 20})
+    else:
+        accounts = getattr(settings, 'SURVEY_WHATSAPP_NUMBERS', None) or [{
+            'name': getattr(settings, 'WHATSAPP_PHONE_NUMBER_ID', '') or 'default',
+        }]
+        defaults = getattr(settings, 'SURVEY_WHATSAPP_DEFAULT_LIMITS', {'daily_limit': 1000, 'per_minute': 60})
+
+    return [
+        SenderAccount(
+            channel,
+            str(account['name']),
+            account.get('daily_limit', defaults['daily_limit']),
+            account.get('per_minute', defaults['per_minute']),
+            options=account,
+        )
+        for account in accounts
+    ]
+
+
+class QuotaScheduler:
+    """
+    جدولة الإرسال حسب الحصص: يدوّر بين الحسابات المتاحة، وينتظر بداية
+    الدقيقة التالية عند امتلاء حد الدقيقة، ويعيد None مع موعد النافذة
+    التالية عند انتهاء الحصة اليومية لكل الحسابات أو خلال ساعات الهدوء.
+    مع تفعيل التوزيع يُترك بين رسالتين من الحساب نفسه فاصل 60/حد الدقيقة
+    ثانية بدلاً من إرسال حصة الدقيقة كاملة دفعة واحدة.
+
+    العدادات محفوظة في قاعدة البيانات (SendQuotaUsage) وتُحجز بتحديث F()
+    مشروط بالحد حتى تتشارك العمليات المختلفة (عمال الويب وأوامر الإرسال
+    والتذكير) الحصة نفسها دون تجاوزها، والحجز محمي بقفل حتى يمكن مشاركة الجدولة بين خيوط
+    الإرسال المتوازية.
+    """
+
+    def __init__(self, channels, pace=True):
+        self.accounts = {channel: get_sender_accounts(channel) for channel in channels}
+        self.pace = pace
+        self._rotation = {channel: 0 for channel in channels}
+        self._next_slot = {}
+        self._lock = threading.Lock()
+        self.resume_at = None
+
+    # ساعات الهدوء
+
+    def quiet_until(self, now=None):
+        """نهاية ساعات الهدوء إن كان الوقت الحالي ضمنها، وإلا None"""
+        quiet_hours = getattr(settings, 'SURVEY_QUIET_HOURS', None)
+        if not quiet_hours:
+            return None
+        start, end = quiet_hours
+        local = timezone.localtime(now or timezone.now())
+        hour = local.hour
+        in_quiet = (start <= hour < end) if start < end else (hour >= start or hour < end)
+        if not in_quiet:
+            return None
+        resume = local.replace(hour=end % 24, minute=0, second=0, microsecond=0)
+        if resume <= local:
+            resume += timedelta(days=1)
+        return resume
+
+    # العدادات
+
+    def _windows(self, now):
+        """بداية نافذتي اليوم (بالتوقيت المحلي) والدقيقة الحاليتين"""
+        local = timezone.localtime(now)
+        return {
+            'day': local.replace(hour=0, minute=0, second=0, microsecond=0),
+            'minute': local.replace(second=0, microsecond=0),
+        }
+
+    def _windows_filter(self, account, windows):
+        return Q(channel=account.channel, account=account.name) & (
+            Q(window='day', window_start=windows['day']) | Q(window='minute', window_start=windows['minute'])
+        )
+
+    def _usage(self, account, now):
+        usage = dict(
+            SendQuotaUsage.objects.filter(self._windows_filter(account, self._windows(now)))
+            .values_list('window', 'count')
+        )
+        return usage.get('day', 0), usage.get('minute', 0)
+
+    def _reserve(self, account, now):
+        """
+        حجز رسالة من حصتي اليوم والدقيقة ذرياً: تحديث مشروط (العدد أقل من الحد)
+        لكل نافذة بعد إنشاء الصفوف الناقصة، فلا تتجاوز عمليتان متزامنتان الحد
+        بقراءة العدد نفسه. يعيد None عند الحجز، أو 'day' أو 'minute' للنافذة الممتلئة.
+        """
+        windows = self._windows(now)
+        SendQuotaUsage.objects.bulk_create([
+            SendQuotaUsage(channel=account.channel, account=account.name, window=window, window_start=start)
+            for window, start in windows.items()
+        ], ignore_conflicts=True)
+        usage = SendQuotaUsage.objects.filter(channel=account.channel, account=account.name)
+        with transaction.atomic():
+            if not usage.filter(
+                window='day', window_start=windows['day'], count__lt=account.daily_limit,
+            ).update(count=F('count') + 1):
+                return 'day'
+            if not usage.filter(
+                window='minute', window_start=windows['minute'], count__lt=account.per_minute,
+            ).update(count=F('count') + 1):
+                transaction.set_rollback(True)
+                return 'minute'
+        return None
+
+    def _release(self, account, now):
+        """إرجاع رسالة محجوزة لم تُرسل إلى حصتي اليوم والدقيقة"""
+        SendQuotaUsage.objects.filter(self._windows_filter(account, self._windows(now))).update(count=F('count') - 1)
+
+    def _reserve_slot(self, accounts):
+        """
+        حجز موعد الإرسال التالي لكل حساب مع ترك الفاصل الأدنى بين رسائله،
+        ويعيد مدة الانتظار حتى الموعد. يُستدعى داخل القفل والانتظار خارجه.
+        """
+        now = time.monotonic()
+        delay = 0
+        for account in accounts:
+            key = (account.channel, account.name)
+            slot = max(now, self._next_slot.get(key, now))
+            if account.per_minute:
+                self._next_slot[key] = slot + 60 / account.per_minute
+            delay = max(delay, slot - now)
+        return delay
+
+    def remaining_today(self, channel, now=None):
+        """مجموع الحصة اليومية المتبقية لحسابات القناة"""
+        now = now or timezone.now()
+        return sum(
+            max(0, account.daily_limit - self._usage(account, now)[0])
+            for account in self.accounts[channel]
+        )
+
+    def check_window(self, needed, now=None):
+        """
+        عدد الرسائل المتاح إرسالها الآن لكل قناة حسب الحصة اليومية.
+        needed: {القناة: العدد المطلوب}. يعيد None مع ضبط resume_at إن لم
+        يكن الإرسال ممكناً الآن (ساعات الهدوء أو انتهاء حصة قناة مطلوبة).
+        """
+        now = now or timezone.now()
+        quiet_end = self.quiet_until(now)
+        if quiet_end:
+            self.resume_at = quiet_end
+            return None
+        available = {channel: min(count, self.remaining_today(channel, now)) for channel, count in needed.items()}
+        if any(count and not available[channel] for channel, count in needed.items()):
+            self.resume_at = self.next_day(now)
+            return None
+        return available
+
+    # اختيار الحساب
+
+    def next_day(self, now):
+        """بداية اليوم التالي بالتوقيت المحلي حيث تتجدد الحصص اليومية"""
+        local = timezone.localtime(now)
+        return local.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
+
+    def _find(self, channel, now):
+        """
+        أول حساب متاح بالتدوير بعد حجز خانته. يعيد (الحساب، None) أو (None، سبب الانتظار)
+        حيث السبب 'minute' عند امتلاء حد الدقيقة فقط و'day' عند انتهاء الحصة اليومية.
+        """
+        accounts = self.accounts[channel]
+        minute_full = False
+        start = self._rotation[channel]
+        for offset in range(len(accounts)):
+            account = accounts[(start + offset) % len(accounts)]
+            reason = self._reserve(account, now)
+            if reason == 'minute':
+                minute_full = True
+            if reason:
+                continue
+            self._rotation[channel] = (start + offset + 1) % len(accounts)
+            return account, None
+        return None, 'minute' if minute_full else 'day'
+
+    def acquire(self, channels):
+        """
+        حجز خانة إرسال لكل قناة مطلوبة لمستلم واحد. يعيد قاموساً
+        {القناة: الحساب} أو None مع ضبط resume_at لموعد النافذة التالية.
+        لا يُحجز أي شيء ما لم تتوفر خانة في جميع القنوات حتى لا يُرسل
+        المستلم عبر قناة ويتأجل عبر الأخرى.
+        """
+        while True:
+            with self._lock:
+                now = timezone.now()
+                quiet_end = self.quiet_until(now)
+                if quiet_end:
+                    self.resume_at = quiet_end
+                    return None
+
+                selected = {}
+                wait = None
+                for channel in channels:
+                    account, reason = self._find(channel, now)
+                    if account is None:
+                        wait = reason if wait != 'day' else wait
+                        continue
+                    selected[channel] = account
+
+                if wait is not None:
+                    for account in selected.values():
+                        self._release(account, now)
+                if wait is None:
+                    delay = self._reserve_slot(selected.values()) if self.pace else 0
+                elif wait == 'minute' and self.pace:
+                    delay = 60 - timezone.localtime(now).second + 0.1
+                elif wait == 'minute':
+                    self.resume_at = now.replace(second=0, microsecond=0) + timedelta(minutes=1)
+                    return None
+                else:
+                    self.resume_at = self.next_day(now)
+                    return None
+
+            if delay > 0:
+                time.sleep(delay)
+            if wait is None:
+                return selected
+            # توزيع الإرسال على النافذة: إعادة المحاولة بعد بداية الدقيقة التالية
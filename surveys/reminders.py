@@ -0,0 +1,166 @@
+"""
+Survey Reminder Scheduler
+إرسال تذكيرات للخريجين الذين لم يكملوا الاستبيان حسب سياسة كل استبيان
+"""
+
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.sites.models import Site
+from django.db.models import Q
+from django.utils import timezone
+
+from .counters import increment_counters
+from .models import Survey, SurveyInvitation
+from .quotas import QuotaScheduler
+from .send_log import SendLogBuffer
+from .suppression import annotate_suppressed
+from .tracking import email_links
+from .whatsapp_service import EmailService
+
+
+class ReminderScheduler:
+    """
+    جدولة التذكيرات لاستبيان واحد: تختار الدعوات المرسلة أو المفتوحة التي
+    لم تتجاوز الحد الأقصى للتذكيرات ومرّ على آخر تواصل معها الفاصل المحدد،
+    وترسلها على دفعات مع حفظ عدد التذكيرات في صف الدعوة نفسه.
+    تتوقف عند انتهاء حصص الإرسال وتبقى الدعوات المتبقية مستحقة للتشغيل التالي.
+    """
+
+    DUE_STATUSES = ('sent', 'opened')
+
+    def __init__(self, survey, batch_size=None, now=None):
+        self.survey = survey
+        self.batch_size = batch_size or getattr(settings, 'SURVEY_REMINDER_BATCH_SIZE', 200)
+        self.now = now or timezone.now()
+        self.email_service = EmailService()
+        self.scheduler = QuotaScheduler(self.channels)
+        self.domain = Site.objects.get_current().domain
+
+    @classmethod
+    def active_surveys(cls, now=None):
+        """الاستبيانات النشطة المفعلة للتذكير والتي لم ينتهِ موعدها"""
+        now = now or timezone.now()
+        return Survey.objects.filter(
+            status='active',
+            reminders_enabled=True,
+            reminder_max_count__gt=0,
+            end_date__gt=now,
+        )
+
+    @property
+    def channels(self):
+        if self.survey.send_method == 'both':
+            return ['email', 'whatsapp']
+        return [self.survey.send_method]
+
+    def due_invitations(self):
+        """
+        الدعوات المستحقة للتذكير. شرط sent_at يستخدم الفهرس
+        (survey, status, sent_at)، وآخر تذكير دائماً بعد الإرسال الأول
+        فيكفي شرط إضافي عليه لضبط الفاصل بين التذكيرات.
+        """
+        cutoff = self.now - timedelta(days=self.survey.reminder_interval_days)
+        return SurveyInvitation.objects.filter(
+            survey=self.survey,
+            status__in=self.DUE_STATUSES,
+            sent_at__lte=cutoff,
+            reminder_count__lt=self.survey.reminder_max_count,
+        ).filter(
+            Q(last_reminded_at__isnull=True) | Q(last_reminded_at__lte=cutoff)
+        )
+
+    def run(self, dry_run=False):
+        """إرسال التذكيرات المستحقة وإرجاع عدادات النتائج"""
+        counts = Counter()
+        if not self._is_open():
+            return counts
+
+        due = annotate_suppressed(self.due_invitations().select_related('graduate').order_by('id'), 'graduate__')
+        if dry_run:
+            counts['due'] = due.count()
+            return counts
+
+        with SendLogBuffer() as send_log:
+            last_id = 0
+            while True:
+                invitations = list(due.filter(id__gt=last_id)[:self.batch_size])
+                if not invitations:
+                    break
+                if not self._send_batch(invitations, send_log, counts):
+                    counts['deferred'] += 1
+                    break
+                last_id = invitations[-1].id
+        return counts
+
+    def _is_open(self):
+        """التوقف عن التذكير بعد نهاية الاستبيان أو إغلاقه"""
+        return (
+            self.survey.status == 'active'
+            and self.survey.reminders_enabled
+            and (self.survey.end_date is None or self.survey.end_date > self.now)
+        )
+
+    def _send_batch(self, invitations, send_log, counts):
+        """
+        إرسال دفعة من التذكيرات وتحديث صفوف الدعوات دفعة واحدة.
+        يعيد False إذا توقفت الدفعة لعدم توفر حصة إرسال.
+        """
+        processed = []
+        completed = True
+        sent = Counter()
+        for invitation in invitations:
+            graduate = invitation.graduate
+            channels = [
+                channel for channel in self.channels
+                if (
+                    graduate.email and not invitation.email_suppressed if channel == 'email'
+                    else graduate.phone_normalized and not invitation.phone_suppressed
+                )
+            ]
+            accounts = self.scheduler.acquire(channels) if channels else {}
+            if accounts is None:
+                completed = False
+                break
+
+            reminded = False
+            for channel, account in accounts.items():
+                outcome, error, message_id = self._send(channel, invitation, account)
+                counts[f'{channel}_{outcome}'] += 1
+                send_log.add(
+                    self.survey, graduate, channel, status=outcome, error_message=error, message_id=message_id,
+                )
+                if outcome == 'sent':
+                    sent[f'{channel}_sent'] += 1
+                    reminded = True
+
+            # تُحسب المحاولة حتى عند الفشل حتى لا يُعاد إرسالها قبل انقضاء الفاصل
+            invitation.reminder_count += 1
+            invitation.last_reminded_at = self.now
+            counts['reminded' if reminded else 'failed'] += 1
+            processed.append(invitation)
+
+        SurveyInvitation.objects.bulk_update(processed, ['reminder_count', 'last_reminded_at'])
+        send_log.flush()
+        increment_counters(self.survey.pk, **sent)
+        return completed
+
+    def _send(self, channel, invitation, account):
+        """إرسال تذكير واحد عبر قناة واحدة بالحساب المحدد وإرجاع (النتيجة، رسالة الخطأ، معرّف الرسالة)"""
+        graduate = invitation.graduate
+        if channel == 'email':
+            links = email_links(self.domain, invitation.survey_id, invitation.graduate_id)
+            result = self.email_service.send_invitation_email(
+                self.survey, graduate, links['link'],
+                subject=f'تذكير: {self.survey.get_email_subject()}',
+                connection=account.get_connection(), from_email=account.from_email,
+                tracking_pixel_url=links['pixel'],
+            )
+        else:
+            message = f'تذكير: {self.survey.get_whatsapp_message(graduate)}'
+            result = account.get_whatsapp_service().send_message(graduate.phone_normalized, message)
+
+        if result['success']:
+            return 'sent', '', result.get('message_id') or ''
+        return 'failed', result.get('error') or '', ''
@@ -0,0 +1,159 @@
+"""
+Survey Results Aggregator
+حساب نتائج الاستبيان لجميع الأسئلة بعدد ثابت من الاستعلامات من عدادات
+الأسئلة بدلاً من استعلام لكل سؤال ولكل خيار
+"""
+
+from datetime import date, timedelta
+
+from django.db.models import Count, F, IntegerField, Q, Subquery, Window
+from django.db.models.functions import RowNumber, TruncDate
+from django.utils import timezone
+
+from .definitions import get_survey_definition
+from .models import Answer, QuestionTally, Survey, SurveyResponse
+
+CHOICE_TYPES = ('radio', 'select', 'checkbox')
+NUMERIC_TYPES = ('number', 'rating')
+TEXT_TYPES = ('text', 'textarea', 'email')
+
+
+class SurveyResults:
+    """
+    نتائج استبيان واحد مبنية على تعريفه المحفوظ في الكاش:
+    - استعلام على عدادات الأسئلة والخيارات (QuestionTally) مع عدد
+      الاستجابات من عداد الاستبيان.
+    - استعلام اختياري لعينة من الإجابات النصية لكل سؤال.
+
+    الاستخدام:
+        results = SurveyResults(survey_id).build()
+        results['questions'][0]['choices_data']
+    """
+
+    def __init__(self, survey_id, definition=None, text_samples=5):
+        self.definition = definition or get_survey_definition(survey_id)
+        if self.definition is None:
+            raise Survey.DoesNotExist(f'Survey {survey_id} does not exist')
+        self.survey_id = self.definition['id']
+        self.text_samples = text_samples
+
+    def _answers(self):
+        return Answer.objects.filter(response__survey_id=self.survey_id, response__is_complete=True)
+
+    def tallies(self):
+        """
+        عدادات الأسئلة والخيارات في استعلام واحد مع عدد الاستجابات من عداد
+        الاستبيان، فلا تعتمد التكلفة على عدد الاستجابات.
+        يعيد (إحصائيات كل سؤال، عدد اختيار كل خيار، إجمالي الاستجابات).
+        """
+        rows = QuestionTally.objects.filter(question__survey_id=self.survey_id).annotate(
+            total_responses=Subquery(
+                Survey.objects.filter(pk=self.survey_id).values('responses_received'),
+                output_field=IntegerField(),
+            )
+        )
+        stats, counts, total = {}, {}, 0
+        for tally in rows:
+            total = tally.total_responses or 0
+            if tally.choice_id:
+                counts[tally.choice_id] = tally.count
+            else:
+                stats[tally.question_id] = tally
+        return stats, counts, total
+
+    def samples(self, question_ids):
+        """آخر الإجابات النصية لكل سؤال (بحد text_samples) في استعلام واحد"""
+        if not question_ids or not self.text_samples:
+            return {}
+        rows = (
+            self._answers().filter(question_id__in=question_ids).exclude(answer_text='')
+            .annotate(rank=Window(RowNumber(), partition_by=F('question_id'), order_by=F('id').desc()))
+            .filter(rank__lte=self.text_samples)
+            .order_by('question_id', 'rank').values_list('question_id', 'answer_text')
+        )
+        samples = {}
+        for question_id, text in rows:
+            samples.setdefault(question_id, []).append(text)
+        return samples
+
+    def build(self):
+        """بنية النتائج التي تعرضها صفحتا النتائج والتحليلات"""
+        stats, counts, total = self.tallies()
+        samples = self.samples([
+            question['id'] for question in self.definition['questions']
+            if question['question_type'] in TEXT_TYPES
+        ])
+
+        questions = []
+        for question in self.definition['questions']:
+            tally = stats.get(question['id'])
+            answered = tally.count if tally else 0
+            item = {
+                'question_id': question['id'],
+                'question_text': question['question_text'],
+                'question_type': question['question_type'],
+                'total_responses': answered,
+                'response_rate': round(answered / total * 100, 1) if total else 0,
+                'choices_data': [],
+                'most_common_answer': None,
+            }
+            if question['question_type'] in CHOICE_TYPES:
+                for choice in question['choices']:
+                    count = counts.get(choice['id'], 0)
+                    item['choices_data'].append({
+                        'id': choice['id'],
+                        'label': choice['choice_text'],
+                        'count': count,
+                        'percentage': round(count / answered * 100, 1) if answered else 0,
+                    })
+                top = max(item['choices_data'], key=lambda choice: choice['count'], default=None)
+                if top and top['count']:
+                    item['most_common_answer'] = top['label']
+            elif question['question_type'] in NUMERIC_TYPES:
+                average = stddev = None
+                if answered:
+                    average = float(tally.value_sum) / answered
+                    stddev = max(float(tally.value_sum_sq) / answered - average ** 2, 0) ** 0.5
+                item.update({
+                    'average': average,
+                    'stddev': stddev,
+                    'minimum': tally.value_min if tally else None,
+                    'maximum': tally.value_max if tally else None,
+                })
+                if question['question_type'] == 'rating':
+                    item['average_rating'] = average or 0
+            elif question['question_type'] == 'date':
+                has_range = tally is not None and tally.value_min is not None
+                item.update({
+                    'first_date': date.fromordinal(int(tally.value_min)) if has_range else None,
+                    'last_date': date.fromordinal(int(tally.value_max)) if has_range else None,
+                })
+            else:
+                item['text_responses_count'] = answered
+                item['text_samples'] = samples.get(question['id'], [])
+            questions.append(item)
+
+        return {'survey': self.definition, 'total_responses': total, 'questions': questions}
+
+
+def response_summary(survey_id, days=30):
+    """أعداد الاستجابات المكتملة والجزئية والردود اليومية لآخر days يوماً"""
+    responses = SurveyResponse.objects.filter(survey_id=survey_id)
+    counts = responses.aggregate(
+        total=Count('id'),
+        completed=Count('id', filter=Q(is_complete=True)),
+    )
+    timeline = dict(
+        responses.filter(submitted_at__gte=timezone.now() - timedelta(days=days))
+        .annotate(day=TruncDate('submitted_at')).order_by()
+        .values('day').annotate(count=Count('id')).values_list('day', 'count')
+    )
+    total, completed = counts['total'], counts['completed']
+    return {
+        'total_responses': total,
+        'completed_responses': completed,
+        'partial_responses': total - completed,
+        'completion_percentage': round(completed / total * 100, 1) if total else 0,
+        'timeline_labels': [day.strftime('%Y-%m-%d') for day in sorted(timeline)],
+        'timeline_data': [timeline[day] for day in sorted(timeline)],
+    }
@@ -0,0 +1,159 @@
+"""
+Response Search
+البحث في إجابات الاستبيانات من فهرس الكلمات (AnswerTerm) بنفس تطبيع
+الإجابات، مع ترتيب النتائج حسب ندرة الكلمات وتكرارها، وتصفيتها بالاستبيان
+والسؤال وصفات الخريج وإجابات الاختيار والأرقام في نفس الاستجابة
+"""
+
+import math
+import re
+
+from django.core.paginator import Paginator
+from django.db.models import Case, Count, Exists, F, FloatField, OuterRef, Q, Sum, Value, When
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .crosstab import DIMENSIONS
+from .models import Answer, AnswerTerm
+from .text_analytics import MAX_TERM_LENGTH, tokenize
+
+SEARCH_PAGE_SIZE = 20
+SNIPPET_WORDS = 30
+_QUOTED = re.compile(r'"([^"]+)"')
+_WORD = re.compile(r'\S+')
+
+
+def parse_query(query):
+    """
+    كلمات البحث المطبّعة والعبارات بين علامتي تنصيص: ({الكلمات}، {العبارات}).
+    العبارة تُبحث بأزواج كلماتها المتجاورة كما فُهرست.
+    """
+    words, phrases = set(), set()
+    for quoted in _QUOTED.findall(query or ''):
+        tokens = tokenize(quoted)
+        phrases.update(
+            f'{first} {second}'[:MAX_TERM_LENGTH]
+            for first, second in zip(tokens, tokens[1:]) if first and second
+        )
+        words.update(token for token in tokens if token)
+    words.update(token for token in tokenize(_QUOTED.sub(' ', query or '')) if token)
+    return words, phrases
+
+
+def snippet(text, words, size=SNIPPET_WORDS):
+    """مقتطف من الإجابة حول أول كلمة مطابقة مع تمييز الكلمات المطابقة"""
+    parts = _WORD.findall(text or '')
+    matches = [index for index, part in enumerate(parts) if set(tokenize(part)) & words]
+    start = max(matches[0] - size // 3, 0) if matches else 0
+    shown = [
+        f'<mark>{escape(part)}</mark>' if index in matches else escape(part)
+        for index, part in enumerate(parts[start:start + size], start)
+    ]
+    prefix = '… ' if start else ''
+    suffix = ' …' if start + size < len(parts) else ''
+    return mark_safe(prefix + ' '.join(shown) + suffix)
+
+
+class ResponseSearch:
+    """
+    بحث في الإجابات النصية: تُطابق الإجابة إذا احتوت جميع كلمات البحث
+    وعباراته، وترتيبها بمجموع تكرار كل كلمة مضروباً في وزن ندرتها، باستعلام
+    مجمع واحد على الفهرس ثم استعلام لبيانات إجابات الصفحة المعروضة فقط.
+
+    الاستخدام:
+        search = ResponseSearch('تدريب "سوق العمل"', survey_id=3, filters={'college': 'علوم'})
+        page = search.page(request.GET.get('page'))
+    """
+
+    def __init__(self, query, survey_id=None, question_id=None, filters=None,
+                 choice_ids=None, number_question_id=None, number_min=None, number_max=None):
+        self.words, self.phrases = parse_query(query)
+        if not self.words:
+            raise ValueError('أدخل كلمة بحث واحدة على الأقل (غير كلمات الوصل)')
+        unknown = [name for name in filters or {} if name not in DIMENSIONS]
+        if unknown:
+            raise ValueError(f'صفات غير معروفة: {", ".join(unknown)}')
+        if (number_min is not None or number_max is not None) and number_question_id is None:
+            raise ValueError('حدد السؤال الرقمي لتصفية القيم')
+        self.survey_id = survey_id
+        self.question_id = question_id
+        self.filters = {name: value for name, value in (filters or {}).items() if value not in (None, '')}
+        self.choice_ids = list(choice_ids or [])
+        self.number_question_id = number_question_id
+        self.number_min = number_min
+        self.number_max = number_max
+
+    def _terms(self):
+        terms = AnswerTerm.objects.filter(
+            Q(term__in=self.words, is_phrase=False) | Q(term__in=self.phrases, is_phrase=True)
+        )
+        if self.survey_id:
+            terms = terms.filter(question__survey_id=self.survey_id)
+        if self.question_id:
+            terms = terms.filter(question_id=self.question_id)
+        if self.filters:
+            terms = terms.filter(**{
+                f'answer__response__graduate__{DIMENSIONS[name][0]}': value for name, value in self.filters.items()
+            })
+        if self.choice_ids:
+            terms = terms.filter(Exists(Answer.selected_choices.through.objects.filter(
+                answer__response_id=OuterRef('answer__response_id'), questionchoice_id__in=self.choice_ids,
+            )))
+        if self.number_question_id:
+            numbers = Answer.objects.filter(
+                response_id=OuterRef('answer__response_id'), question_id=self.number_question_id,
+            )
+            if self.number_min is not None:
+                numbers = numbers.filter(answer_number__gte=self.number_min)
+            if self.number_max is not None:
+                numbers = numbers.filter(answer_number__lte=self.number_max)
+            terms = terms.filter(Exists(numbers))
+        return terms
+
+    def _weights(self, terms):
+        """وزن الندرة لكل كلمة: log(1 + أعلى عدد إجابات لكلمات البحث / عدد إجابات الكلمة)"""
+        frequencies = dict(terms.order_by().values_list('term').annotate(count=Count('id')))
+        highest = max(frequencies.values(), default=1)
+        return {term: math.log(1 + highest / count) for term, count in frequencies.items()}
+
+    def matches(self):
+        """معرّفات الإجابات المطابقة مرتبة بالدرجة: [{'answer_id': ..., 'score': ...}]"""
+        terms = self._terms()
+        weights = self._weights(terms)
+        if len(weights) < len(self.words) + len(self.phrases):
+            # كلمة غير موجودة في أي إجابة، فلا توجد إجابة تحتوي جميع الكلمات
+            return AnswerTerm.objects.none().values('answer_id')
+        if len(weights) == 1:
+            # كلمة واحدة: صف واحد لكل إجابة فلا حاجة للتجميع
+            return (
+                terms.order_by().values('answer_id')
+                .annotate(score=F('frequency') * Value(next(iter(weights.values()))))
+                .order_by('-score', '-answer_id')
+            )
+        weight = Case(
+            *[When(term=term, then=Value(value)) for term, value in weights.items()],
+            default=Value(0.0), output_field=FloatField(),
+        )
+        return (
+            terms.order_by().values('answer_id')
+            .annotate(matched=Count('id'), score=Sum(F('frequency') * weight, output_field=FloatField()))
+            .filter(matched=len(weights))
+            .order_by('-score', '-answer_id')
+        )
+
+    def page(self, number, per_page=SEARCH_PAGE_SIZE):
+        """صفحة من النتائج مع الإجابة والسؤال والاستبيان والخريج لكل نتيجة"""
+        page = Paginator(self.matches(), per_page).get_page(number)
+        scores = {row['answer_id']: row['score'] for row in page.object_list}
+        answers = Answer.objects.filter(id__in=scores).select_related(
+            'question__survey', 'response__graduate',
+        ).in_bulk()
+        page.object_list = [
+            {
+                'answer': answers[answer_id],
+                'score': round(score, 3),
+                'snippet': snippet(answers[answer_id].answer_text, self.words),
+            }
+            for answer_id, score in scores.items() if answer_id in answers
+        ]
+        return page
@@ -0,0 +1,88 @@
+"""
+Recipient Segments
+تعريف شرائح المستلمين بالمرشحات وحلّها على الخادم بدلاً من إرسال قوائم المعرفات
+"""
+
+from django.db.models import Exists, OuterRef, Q
+
+from graduates.models import Graduate
+from .models import SurveyResponse
+
+
+class RecipientSegment:
+    """
+    شريحة مستلمين معرفة بمرشحات قابلة للحفظ في JSON:
+    الكلية، التخصص، نطاق سنة التخرج، حالة التوظيف، وجود بريد/هاتف،
+    وعدم الاستجابة لاستبيان محدد.
+    """
+
+    FILTER_KEYS = (
+        'college',
+        'major',
+        'year_from',
+        'year_to',
+        'employment_status',
+        'has_email',
+        'has_phone',
+        'not_responded_to',
+    )
+
+    def __init__(self, filters=None):
+        filters = filters or {}
+        self.filters = {
+            key: filters[key]
+            for key in self.FILTER_KEYS
+            if filters.get(key) not in (None, '', False)
+        }
+        # يُحفظ الاستبيان كمعرّف حتى تبقى المرشحات قابلة للتحويل إلى JSON
+        survey = self.filters.get('not_responded_to')
+        if survey is not None and hasattr(survey, 'pk'):
+            self.filters['not_responded_to'] = survey.pk
+
+    def queryset(self):
+        """استعلام الخريجين المطابقين للشريحة"""
+        graduates = Graduate.objects.filter(is_active=True)
+        f = self.filters
+
+        if 'college' in f:
+            graduates = graduates.filter(college=f['college'])
+        if 'major' in f:
+            graduates = graduates.filter(major=f['major'])
+        if 'year_from' in f:
+            graduates = graduates.filter(graduation_year__gte=f['year_from'])
+        if 'year_to' in f:
+            graduates = graduates.filter(graduation_year__lte=f['year_to'])
+        if 'employment_status' in f:
+            graduates = graduates.filter(employment_status=f['employment_status'])
+        if f.get('has_email'):
+            graduates = graduates.exclude(Q(email__isnull=True) | Q(email=''))
+        if f.get('has_phone'):
+            # الأرقام الصالحة فقط (المحفوظة بصيغة E.164)
+            graduates = graduates.exclude(phone_normalized='')
+        if 'not_responded_to' in f:
+            graduates = graduates.filter(~Exists(
+                SurveyResponse.objects.filter(survey_id=f['not_responded_to'], graduate=OuterRef('pk'))
+            ))
+        return graduates
+
+    def count(self):
+        """عدد المستلمين باستعلام COUNT واحد"""
+        return self.queryset().count()
+
+    def page(self, after=0, size=50):
+        """صفحة من الخريجين بعد معرّف محدد (تقسيم بالمفتاح)"""
+        return list(
+            self.queryset().filter(pk__gt=after).order_by('pk')
+            .values('pk', 'first_name', 'last_name', 'email', 'college', 'graduation_year')[:size]
+        )
+
+    def iter_id_chunks(self, size=1000):
+        """المرور على معرفات الشريحة على دفعات مرتبة دون تحميلها كلها في الذاكرة"""
+        graduates = self.queryset().order_by('pk')
+        last_id = 0
+        while True:
+            ids = list(graduates.filter(pk__gt=last_id).values_list('pk', flat=True)[:size])
+            if not ids:
+                return
+            yield ids
+            last_id = ids[-1]
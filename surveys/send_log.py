@@ -0,0 +1,56 @@
+"""
+Buffered Survey Send Log Writer
+كتابة سجلات إرسال الاستبيانات على دفعات بدلاً من سجل لكل رسالة
+"""
+
+from django.conf import settings
+
+from .models import SurveySendLog
+from .suppression import record_hard_failures
+
+
+class SendLogBuffer:
+    """
+    مخزن مؤقت لسجلات الإرسال: يجمع السجلات في الذاكرة ويكتبها
+    بعملية bulk_create واحدة لكل دفعة، ويوقف عناوين حالات الفشل الدائم.
+
+    الاستخدام:
+        with SendLogBuffer() as send_log:
+            send_log.add(survey, graduate, 'email')
+    """
+
+    def __init__(self, batch_size=None):
+        self.batch_size = batch_size or getattr(settings, 'SURVEY_SEND_LOG_BATCH_SIZE', 500)
+        self._pending = []
+        self.written = 0
+
+    def add(self, survey, graduate, send_method, status='sent', error_message='', message_id=''):
+        """إضافة سجل إرسال إلى الدفعة الحالية"""
+        self._pending.append(SurveySendLog(
+            survey=survey,
+            graduate=graduate,
+            send_method=send_method,
+            status=status,
+            error_message=error_message or '',
+            message_id=message_id or '',
+        ))
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """كتابة السجلات المعلقة دفعة واحدة"""
+        if not self._pending:
+            return 0
+        pending, self._pending = self._pending, []
+        SurveySendLog.objects.bulk_create(pending, batch_size=self.batch_size)
+        record_hard_failures(pending)
+        self.written += len(pending)
+        return len(pending)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # نكتب ما تم إرساله فعلاً حتى عند حدوث خطأ في منتصف الإرسال
+        self.flush()
+        return False
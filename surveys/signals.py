@@ -0,0 +1,54 @@
+"""
+Survey Signals
+إبطال تعريفات الاستبيانات المحفوظة في الكاش عند تعديل الاستبيان أو أسئلته أو خياراتها،
+وحذف لقطة النتائج عند تغير حالة الإغلاق (يبني الأمر build_survey_snapshots لقطة الاستبيان المغلق)
+"""
+
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .definitions import bump_definition_version, forget_versions
+from .models import Question, QuestionChoice, Survey
+from .snapshots import invalidate_snapshot
+
+
+@receiver(pre_save, sender=Survey)
+def survey_status_before_save(sender, instance, update_fields=None, **kwargs):
+    """حفظ الحالة السابقة لاكتشاف الإغلاق وإعادة الفتح بعد الحفظ"""
+    if instance.pk and (update_fields is None or 'status' in update_fields):
+        instance._previous_status = Survey.objects.filter(pk=instance.pk).values_list('status', flat=True).first()
+
+
+@receiver(post_save, sender=Survey)
+def survey_changed(sender, instance, **kwargs):
+    bump_definition_version(instance.pk)
+
+
+@receiver(post_delete, sender=Survey)
+def survey_deleted(sender, instance, **kwargs):
+    forget_versions(instance.pk)
+
+
+@receiver(post_save, sender=Survey)
+def survey_status_changed(sender, instance, created, **kwargs):
+    if not hasattr(instance, '_previous_status'):
+        return
+    previous = instance.__dict__.pop('_previous_status')
+    # بناء اللقطة (التجميعات وملفات التصدير) ثقيل فلا يجري داخل طلب الإغلاق:
+    # يصبح الاستبيان المغلق دون لقطة في قائمة انتظار الأمر build_survey_snapshots
+    if (instance.status == 'closed') != (previous == 'closed'):
+        invalidate_snapshot(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=Question)
+def question_changed(sender, instance, **kwargs):
+    bump_definition_version(instance.survey_id)
+    invalidate_snapshot(instance.survey_id)
+
+
+@receiver([post_save, post_delete], sender=QuestionChoice)
+def choice_changed(sender, instance, **kwargs):
+    survey_id = Question.objects.filter(pk=instance.question_id).values_list('survey_id', flat=True).first()
+    if survey_id:
+        bump_definition_version(survey_id)
+        invalidate_snapshot(survey_id)
@@ -0,0 +1,107 @@
+"""
+Closed Survey Snapshots
+تجميد نتائج الاستبيان عند إغلاقه: جميع التجميعات (النتائج، الإحصائيات،
+مسار الدعوات، أعداد الاستجابات) كـ JSON مضغوط مع ملفات تصدير جاهزة
+تحت media/، فتُعرض صفحات الاستبيان المغلق وتصديراته منها دون إعادة الحساب.
+يبني الأمر المجدول build_survey_snapshots اللقطات خارج الطلبات، وتُعرض
+النتائج المباشرة إلى أن تُبنى
+"""
+
+import io
+import json
+import zlib
+from datetime import date
+
+from django.core.files.base import ContentFile
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F, Q
+
+from .definitions import get_survey_definition
+from .exports import write_csv, write_pdf, write_xlsx
+from .funnel import InvitationFunnel
+from .models import Survey, SurveySnapshot
+from .results import SurveyResults, response_summary
+from .statistics import get_numeric_statistics
+
+FILE_FIELDS = ('csv_file', 'xlsx_file', 'pdf_file')
+
+
+def build_payload(survey_id):
+    """جميع التجميعات التي تعرضها صفحات النتائج والتحليلات"""
+    results = SurveyResults(survey_id).build()
+    return {
+        'results': {'total_responses': results['total_responses'], 'questions': results['questions']},
+        'statistics': get_numeric_statistics(survey_id),
+        'funnel': InvitationFunnel(survey_id).build(),
+        'summary': response_summary(survey_id),
+    }
+
+
+def _delete_files(snapshot):
+    for field in FILE_FIELDS:
+        file = getattr(snapshot, field)
+        if file:
+            file.delete(save=False)
+
+
+def build_snapshot(survey_id):
+    """بناء لقطة الاستبيان (أو استبدالها) مع ملفات التصدير. يعيد اللقطة."""
+    survey = Survey.objects.get(pk=survey_id)
+    definition = get_survey_definition(survey_id)
+    payload = build_payload(survey_id)
+
+    snapshot = SurveySnapshot.objects.filter(survey=survey).first() or SurveySnapshot(survey=survey)
+    _delete_files(snapshot)
+    snapshot.payload = zlib.compress(json.dumps(payload, cls=DjangoJSONEncoder, ensure_ascii=False).encode())
+    snapshot.responses_received = survey.responses_received
+
+    name = f'survey_{survey_id}_results'
+    stream = io.StringIO()
+    write_csv(survey_id, definition, stream)
+    snapshot.csv_file.save(f'{name}.csv', ContentFile(stream.getvalue().encode('utf-8')), save=False)
+    stream = io.BytesIO()
+    write_xlsx(survey_id, definition, payload['results'], stream)
+    snapshot.xlsx_file.save(f'{name}.xlsx', ContentFile(stream.getvalue()), save=False)
+    stream = io.BytesIO()
+    write_pdf(definition, payload['results'], stream)
+    snapshot.pdf_file.save(f'{name}.pdf', ContentFile(stream.getvalue()), save=False)
+    snapshot.save()
+    return snapshot
+
+
+def invalidate_snapshot(survey_id):
+    """حذف لقطة الاستبيان وملفاتها (عند إعادة فتحه أو تعديل أسئلته)"""
+    for snapshot in SurveySnapshot.objects.filter(survey_id=survey_id):
+        _delete_files(snapshot)
+        snapshot.delete()
+
+
+def get_snapshot(survey_id):
+    """
+    اللقطة الصالحة لاستبيان مغلق باستعلام واحد، أو None. اللقطة التي تغير
+    بعدها عدد الاستجابات (مثل حفظ مؤجل بعد الإغلاق) لا تُستخدم.
+    """
+    return SurveySnapshot.objects.filter(
+        survey_id=survey_id, survey__status='closed', responses_received=F('survey__responses_received'),
+    ).first()
+
+
+def pending_snapshots():
+    """
+    الاستبيانات المغلقة التي تنتظر بناء لقطتها (لا لقطة لها أو تغير عدد
+    استجاباتها بعد البناء)، يبنيها الأمر build_survey_snapshots دورياً.
+    """
+    return Survey.objects.filter(status='closed').filter(
+        Q(snapshot__isnull=True) | ~Q(snapshot__responses_received=F('responses_received'))
+    )
+
+
+def load_payload(snapshot):
+    """فك ضغط تجميعات اللقطة وإعادة الأنواع التي لا يحفظها JSON"""
+    payload = json.loads(zlib.decompress(bytes(snapshot.payload)))
+    payload['statistics'] = {int(key): value for key, value in payload['statistics'].items()}
+    for question in payload['results']['questions']:
+        for field in ('first_date', 'last_date'):
+            if question.get(field):
+                question[field] = date.fromisoformat(question[field])
+    return payload
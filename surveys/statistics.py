@@ -0,0 +1,124 @@
+"""
+Numeric Question Statistics
+إحصائيات أسئلة التقييم والأسئلة الرقمية (الوسيط، المئينات، الانحراف المعياري،
+التوزيع، نسب الطرفين ومؤشر صافي الترويج، والاتجاه الأسبوعي) محسوبة بـ NumPy
+من سحب واحد للإجابات، ومحفوظة في الكاش حسب إصدار بيانات الاستبيان
+"""
+
+import numpy as np
+from django.core.cache import cache
+from django.utils import timezone
+
+from .definitions import get_data_version, get_survey_definition
+from .models import Answer
+
+STATISTICS_TIMEOUT = 60 * 60 * 6
+NUMERIC_TYPES = ('number', 'rating')
+PERCENTILES = (10, 25, 50, 75, 90)
+RATING_SCALE = (1, 5)
+NUMBER_BINS = 10
+
+
+def _box_scores(values, question_type):
+    """
+    نسب الطرفين: للتقييم (1-5) الأعلى 4-5 والأدنى 1-2، ومؤشر صافي الترويج
+    (5 مروج، 1-3 منتقد). للأرقام على مقياس 0-10: مروج 9-10 ومنتقد 0-6.
+    """
+    if question_type == 'rating':
+        top, bottom = values >= 4, values <= 2
+        promoters, detractors = values == 5, values <= 3
+    elif values.min() >= 0 and values.max() <= 10:
+        top, bottom = values >= 9, values <= 6
+        promoters, detractors = top, bottom
+    else:
+        return None
+    return {
+        'top_box': round(float(top.mean() * 100), 1),
+        'bottom_box': round(float(bottom.mean() * 100), 1),
+        'nps': round(float((promoters.mean() - detractors.mean()) * 100), 1),
+    }
+
+
+def _histogram(values, question_type):
+    """عدد القيم في كل فئة: فئة لكل درجة تقييم، أو فئات متساوية للأرقام"""
+    if question_type == 'rating':
+        low, high = RATING_SCALE
+        counts, _ = np.histogram(values, bins=np.arange(low, high + 2) - 0.5)
+        labels = [str(value) for value in range(low, high + 1)]
+    else:
+        counts, edges = np.histogram(values, bins=min(NUMBER_BINS, len(np.unique(values))))
+        labels = [f'{edges[i]:g} - {edges[i + 1]:g}' for i in range(len(counts))]
+    return [{'label': label, 'count': int(count)} for label, count in zip(labels, counts)]
+
+
+def _weekly_trend(values, weeks):
+    """متوسط القيم وعددها لكل أسبوع تقديم (بداية الأسبوع يوم الإثنين)"""
+    labels, inverse = np.unique(weeks, return_inverse=True)
+    counts = np.bincount(inverse)
+    sums = np.bincount(inverse, weights=values)
+    return [
+        {'week': str(label), 'count': int(count), 'mean': round(float(total / count), 3)}
+        for label, count, total in zip(labels, counts, sums)
+    ]
+
+
+def describe(values, weeks, question_type):
+    """إحصائيات مصفوفة قيم سؤال واحد"""
+    if not len(values):
+        return {'count': 0}
+    percentiles = np.percentile(values, PERCENTILES)
+    return {
+        'count': int(values.size),
+        'mean': round(float(values.mean()), 3),
+        'median': round(float(percentiles[PERCENTILES.index(50)]), 3),
+        'stddev': round(float(values.std(ddof=1)), 3) if values.size > 1 else 0.0,
+        'minimum': float(values.min()),
+        'maximum': float(values.max()),
+        'percentiles': {f'p{p}': round(float(value), 3) for p, value in zip(PERCENTILES, percentiles)},
+        'histogram': _histogram(values, question_type),
+        'box_scores': _box_scores(values, question_type),
+        'weekly_trend': _weekly_trend(values, weeks),
+    }
+
+
+def compute_numeric_statistics(definition):
+    """سحب قيم جميع الأسئلة الرقمية للاستبيان في استعلام واحد وحساب إحصائياتها"""
+    questions = [q for q in definition['questions'] if q['question_type'] in NUMERIC_TYPES]
+    if not questions:
+        return {}
+    rows = list(
+        Answer.objects.filter(
+            question_id__in=[question['id'] for question in questions],
+            response__is_complete=True, answer_number__isnull=False,
+        ).order_by().values_list('question_id', 'answer_number', 'response__submitted_at')
+    )
+    if rows:
+        question_ids = np.array([row[0] for row in rows], dtype=np.int64)
+        values = np.array([row[1] for row in rows], dtype=float)
+        # بداية أسبوع التقديم بالتوقيت المحلي
+        days = np.array([timezone.localtime(row[2]).date() for row in rows], dtype='datetime64[D]')
+        # يوم 1970-01-01 كان خميساً، فترتيب اليوم في الأسبوع من الإثنين هو (الأيام + 3) % 7
+        weeks = days - ((days.view('int64') + 3) % 7).astype('timedelta64[D]')
+    else:
+        question_ids = np.array([], dtype=np.int64)
+        values = np.array([], dtype=float)
+        weeks = np.array([], dtype='datetime64[D]')
+
+    statistics = {}
+    for question in questions:
+        mask = question_ids == question['id']
+        statistics[question['id']] = describe(values[mask], weeks[mask], question['question_type'])
+    return statistics
+
+
+def get_numeric_statistics(survey_id):
+    """إحصائيات الأسئلة الرقمية من الكاش أو حسابها وحفظها: {معرّف السؤال: الإحصائيات}"""
+    definition = get_survey_definition(survey_id)
+    if definition is None:
+        return None
+    key = f'survey_numeric_stats:{survey_id}:{get_data_version(survey_id)}'
+    statistics = cache.get(key)
+    if statistics is None:
+        statistics = compute_numeric_statistics(definition)
+        cache.set(key, statistics, STATISTICS_TIMEOUT)
+    return statistics
@@ -0,0 +1,343 @@
+"""
+Survey Submission Writer
+التحقق من إجابات الاستبيان وحفظ الاستجابة وإجاباتها دفعة واحدة داخل معاملة
+"""
+
+from collections import Counter
+from datetime import date, timedelta
+from decimal import Decimal
+
+import time
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Min
+from django.utils import timezone
+
+from .counters import increment_counters, increment_many
+from .definitions import bump_data_version, get_survey_definition
+from .forms import SurveyResponseForm
+from .models import Answer, PendingSubmission, Question, QuestionChoice, SubmissionFlush, Survey, SurveyResponse
+from .tallies import TallyDelta, stored_answers
+from .text_analytics import index_answers
+
+CHOICE_TYPES = ('radio', 'select', 'checkbox')
+FLUSH_HISTORY_DAYS = 7
+
+
+class SubmissionWriter:
+    """
+    كاتب الاستجابات: يتحقق من الإجابات مقابل أسئلة الاستبيان وخياراتها
+    من التعريف المحفوظ في الكاش (دون استعلامات)، ثم يكتب الاستجابة
+    وجميع الإجابات بعملية bulk_create واحدة، وصفوف الخيارات المحددة
+    بعملية ثانية، مع تحديث عدادات الأسئلة، داخل معاملة واحدة فلا تبقى
+    استجابة ناقصة.
+
+    الاستخدام:
+        writer = SubmissionWriter(survey_id)
+        answers = writer.validate(request.POST)
+        writer.write(answers, graduate_id=graduate_id)
+    """
+
+    def __init__(self, survey_id, definition=None):
+        self.definition = definition or get_survey_definition(survey_id)
+        if self.definition is None:
+            raise Survey.DoesNotExist(f'Survey {survey_id} does not exist')
+        self.survey_id = self.definition['id']
+        self.questions = {question['id']: question for question in self.definition['questions']}
+
+    def validate(self, data):
+        """
+        التحقق من بيانات النموذج وإرجاع الإجابات بصيغة مختصرة قابلة للتحويل
+        إلى JSON: قائمة من [معرّف السؤال، النص، الرقم، التاريخ، معرّفات الخيارات].
+        يرفع ValidationError بأخطاء الحقول عند عدم صحتها.
+        """
+        form = SurveyResponseForm(data, questions=self.definition['questions'])
+        if not form.is_valid():
+            raise ValidationError(form.errors)
+
+        answers = []
+        for question_id, question in self.questions.items():
+            value = form.cleaned_data.get(f'question_{question_id}')
+            if value in (None, '', []):
+                continue
+            answers.append(self._compact(question, value))
+        return answers
+
+    def _compact(self, question, value):
+        question_type = question['question_type']
+        text, number, day, choice_ids = '', None, None, []
+        if question_type in CHOICE_TYPES:
+            choice_ids = [int(choice_id) for choice_id in (value if isinstance(value, list) else [value])]
+            labels = {choice['id']: choice['choice_text'] for choice in question['choices']}
+            text = '، '.join(labels[choice_id] for choice_id in choice_ids)
+        elif question_type in ('number', 'rating'):
+            number = str(value)
+            text = str(value)
+        elif question_type == 'date':
+            day = value.isoformat()
+            text = day
+        else:
+            text = value
+        return [question['id'], text, number, day, choice_ids]
+
+    @staticmethod
+    def build_answers(response, answers):
+        """بناء كائنات Answer غير المحفوظة لاستجابة من الإجابات المختصرة"""
+        return [
+            Answer(
+                response=response,
+                question_id=question_id,
+                answer_text=text,
+                answer_number=Decimal(number) if number is not None else None,
+                answer_date=date.fromisoformat(day) if day else None,
+            )
+            for question_id, text, number, day, choice_ids in answers
+        ]
+
+    @staticmethod
+    def write_answers(answer_objects, answers_by_response):
+        """
+        كتابة الإجابات بعملية bulk_create واحدة ثم صفوف الخيارات المحددة بعملية
+        ثانية وفهرس كلمات الإجابات النصية بعملية ثالثة.
+        answers_by_response: {معرّف الاستجابة: الإجابات المختصرة} لربط الخيارات بالإجابات.
+        """
+        Answer.objects.bulk_create(answer_objects)
+
+        choices = {
+            (response_id, question_id): choice_ids
+            for response_id, answers in answers_by_response.items()
+            for question_id, text, number, day, choice_ids in answers
+            if choice_ids
+        }
+        texts = [
+            (response_id, question_id, text)
+            for response_id, answers in answers_by_response.items()
+            for question_id, text, number, day, choice_ids in answers
+            if text and number is None and day is None and not choice_ids
+        ]
+        if not choices and not texts:
+            return
+        # بعض قواعد البيانات (MySQL) لا تعيد المفاتيح من bulk_create
+        answer_ids = {
+            (answer.response_id, answer.question_id): answer.pk for answer in answer_objects if answer.pk
+        }
+        if len(answer_ids) != len(answer_objects):
+            answer_ids = {
+                (response_id, question_id): answer_id
+                for answer_id, response_id, question_id in Answer.objects.filter(
+                    response_id__in=answers_by_response
+                ).values_list('id', 'response_id', 'question_id')
+            }
+        if choices:
+            through = Answer.selected_choices.through
+            through.objects.bulk_create([
+                through(answer_id=answer_ids[key], questionchoice_id=choice_id)
+                for key, choice_ids in choices.items()
+                for choice_id in choice_ids
+            ])
+        index_answers(
+            (answer_ids[(response_id, question_id)], question_id, text)
+            for response_id, question_id, text in texts
+        )
+
+    def _lock_response(self, graduate_id):
+        """
+        استجابة الخريج للاستبيان مقفلة حتى نهاية المعاملة، أو إنشاؤها. قيد
+        التفرد على (الاستبيان، الخريج) يمنع إنشاء استجابتين لطلبين متزامنين:
+        الطلب المتأخر يقرأ استجابة السابق بعد انتظار قفلها. يعيد (الاستجابة، أُنشئت؟).
+        """
+        existing = SurveyResponse.objects.select_for_update().filter(
+            survey_id=self.survey_id, graduate_id=graduate_id,
+        ).order_by('pk')
+        response = existing.first()
+        if response is not None:
+            return response, False
+        try:
+            with transaction.atomic():
+                return SurveyResponse.objects.create(
+                    survey_id=self.survey_id, graduate_id=graduate_id, is_complete=True,
+                ), True
+        except IntegrityError:
+            return existing.first(), False
+
+    def write(self, answers, graduate_id=None):
+        """
+        حفظ الاستجابة وإجاباتها في معاملة واحدة. إجابات الخريج السابقة غير
+        المكتملة لنفس الاستبيان تُستبدل، أما الاستجابات العامة فتُنشأ دائماً.
+        عداد الاستجابات يُزاد في نفس المعاملة فقط عند اكتمال استجابة جديدة.
+        """
+        with transaction.atomic():
+            if graduate_id is None:
+                response = SurveyResponse.objects.create(survey_id=self.survey_id, is_complete=True)
+                completed = True
+                tallies = TallyDelta()
+            else:
+                response, created = self._lock_response(graduate_id)
+                completed = created or not response.is_complete
+                tallies = TallyDelta()
+                if not created:
+                    if response.is_complete:
+                        tallies.add(stored_answers([response.pk]), sign=-1)
+                    Answer.objects.filter(response=response).delete()
+                    response.is_complete = True
+                    response.submitted_at = timezone.now()
+                    response.save(update_fields=['is_complete', 'submitted_at'])
+
+            self.write_answers(self.build_answers(response, answers), {response.pk: answers})
+            tallies.add(answers).apply()
+            if completed:
+                increment_counters(self.survey_id, responses_received=1)
+            transaction.on_commit(lambda: bump_data_version(self.survey_id))
+        return response
+
+
+def is_completed(survey_id, graduate_id):
+    """
+    هل أكمل الخريج الاستبيان: استعلام واحد على فهرس التفرد (الاستبيان، الخريج)
+    في قاعدة البيانات المشتركة حتى يراه كل عمال الخادم فور الإكمال
+    """
+    return SurveyResponse.objects.filter(survey_id=survey_id, graduate_id=graduate_id, is_complete=True).exists()
+
+
+def delete_responses(response_ids):
+    """
+    حذف استجابات مع إنقاص إجاباتها المكتملة من عدادات الأسئلة وعداد
+    الاستجابات في نفس المعاملة، ثم تحديث إصدار البيانات وإبطال لقطة النتائج
+    لكل استبيان متأثر. يعيد عدد الاستجابات المحذوفة.
+    """
+    from .snapshots import invalidate_snapshot
+
+    with transaction.atomic():
+        rows = list(
+            SurveyResponse.objects.select_for_update().filter(id__in=response_ids)
+            .values_list('id', 'survey_id', 'is_complete')
+        )
+        if not rows:
+            return 0
+        complete = [response_id for response_id, survey_id, is_complete in rows if is_complete]
+        TallyDelta().add(stored_answers(complete), sign=-1).apply()
+        received = Counter(survey_id for response_id, survey_id, is_complete in rows if is_complete)
+        increment_many({survey_id: {'responses_received': -count} for survey_id, count in received.items()})
+        SurveyResponse.objects.filter(id__in=[row[0] for row in rows]).delete()
+        for survey_id in {row[1] for row in rows}:
+            invalidate_snapshot(survey_id)
+            transaction.on_commit(lambda survey_id=survey_id: bump_data_version(survey_id))
+    return len(rows)
+
+
+# الحفظ المؤجل للاستجابات العامة
+
+def buffered_submissions_enabled():
+    return getattr(settings, 'SURVEY_BUFFERED_SUBMISSIONS', False)
+
+
+def stage_submission(survey_id, answers):
+    """حفظ استجابة متحقق منها في جدول الانتظار بعملية INSERT واحدة"""
+    return PendingSubmission.objects.create(survey_id=survey_id, answers=answers)
+
+
+def _valid_ids(pending):
+    """الأسئلة والخيارات الموجودة حالياً حتى لا تفشل الدفعة بسؤال حُذف بعد الاستلام"""
+    survey_ids = {submission.survey_id for submission in pending}
+    question_ids = set(Question.objects.filter(survey_id__in=survey_ids).values_list('id', flat=True))
+    choice_ids = set(QuestionChoice.objects.filter(question_id__in=question_ids).values_list('id', flat=True))
+    return question_ids, choice_ids
+
+
+def materialize_submissions(pending):
+    """
+    تحويل دفعة من الاستجابات المنتظرة إلى SurveyResponse وإجاباتها:
+    إدراج مجمع للاستجابات ثم للإجابات ثم لصفوف الخيارات في كل قواعد البيانات.
+    """
+    question_ids, choice_ids = _valid_ids(pending)
+    responses = [
+        SurveyResponse(survey_id=submission.survey_id, is_complete=True, staged_id=submission.id)
+        for submission in pending
+    ]
+    SurveyResponse.objects.bulk_create(responses)
+    if not connection.features.can_return_rows_from_bulk_insert:
+        # MySQL لا يعيد المفاتيح من الإدراج المجمع: قراءتها باستعلام واحد بمعرّف الاستجابة المنتظرة
+        keys = dict(
+            SurveyResponse.objects.filter(staged_id__in=[submission.id for submission in pending])
+            .values_list('staged_id', 'id')
+        )
+        for response, submission in zip(responses, pending):
+            response.pk = keys[submission.id]
+
+    # وقت الاستلام الفعلي بدلاً من وقت الحفظ (auto_now_add يطغى عليه عند الإدراج)
+    for response, submission in zip(responses, pending):
+        response.submitted_at = submission.created_at
+    SurveyResponse.objects.bulk_update(responses, ['submitted_at'])
+
+    answer_objects = []
+    answers_by_response = {}
+    tallies = TallyDelta()
+    for response, submission in zip(responses, pending):
+        answers = [
+            [question_id, text, number, day, [choice_id for choice_id in choices if choice_id in choice_ids]]
+            for question_id, text, number, day, choices in submission.answers
+            if question_id in question_ids
+        ]
+        answers_by_response[response.pk] = answers
+        answer_objects.extend(SubmissionWriter.build_answers(response, answers))
+        tallies.add(answers)
+    SubmissionWriter.write_answers(answer_objects, answers_by_response)
+    tallies.apply()
+
+    received = Counter(submission.survey_id for submission in pending)
+    increment_many({survey_id: {'responses_received': count} for survey_id, count in received.items()})
+    for survey_id in received:
+        transaction.on_commit(lambda survey_id=survey_id: bump_data_version(survey_id))
+    return responses
+
+
+def flush_pending_submissions(batch_size=None, limit=None):
+    """
+    حفظ الاستجابات المنتظرة على دفعات، كل دفعة في معاملة واحدة تحذف صفوفها
+    من جدول الانتظار. الصفوف المقفلة لدى عملية حفظ أخرى تُتخطى عند دعم
+    قاعدة البيانات لذلك فيمكن تشغيل أكثر من عملية حفظ. يعيد عدد الاستجابات.
+    """
+    batch_size = batch_size or getattr(settings, 'SURVEY_SUBMISSION_FLUSH_BATCH_SIZE', 1000)
+    skip_locked = connection.features.has_select_for_update_skip_locked
+    total = 0
+    started = time.monotonic()
+    while limit is None or total < limit:
+        with transaction.atomic():
+            pending = list(
+                PendingSubmission.objects.select_for_update(skip_locked=skip_locked)
+                .order_by('id')[:batch_size]
+            )
+            if not pending:
+                break
+            materialize_submissions(pending)
+            PendingSubmission.objects.filter(id__in=[submission.id for submission in pending]).delete()
+        total += len(pending)
+
+    if total:
+        now = timezone.now()
+        SubmissionFlush.objects.create(finished_at=now, count=total, seconds=round(time.monotonic() - started, 3))
+        SubmissionFlush.objects.filter(finished_at__lt=now - timedelta(days=FLUSH_HISTORY_DAYS)).delete()
+    return total
+
+
+def submission_metrics():
+    """
+    مؤشرات الضغط على الحفظ المؤجل: عدد الاستجابات المنتظرة وعمر أقدمها
+    ونتيجة آخر عملية حفظ. ازدياد العمر يعني أن الحفظ أبطأ من الاستلام.
+    """
+    stats = PendingSubmission.objects.aggregate(oldest=Min('created_at'))
+    pending = PendingSubmission.objects.count()
+    oldest = stats['oldest']
+    last = SubmissionFlush.objects.first()
+    return {
+        'pending': pending,
+        'oldest_age_seconds': round((timezone.now() - oldest).total_seconds(), 1) if oldest else 0,
+        'last_flush': {
+            'at': last.finished_at,
+            'count': last.count,
+            'seconds': last.seconds,
+            'rate': round(last.count / last.seconds, 1) if last.seconds else None,
+        } if last else None,
+    }
@@ -0,0 +1,187 @@
+"""
+Suppression List
+إيقاف الإرسال إلى العناوين المرتدة أو التي فشل الإرسال إليها فشلاً دائماً
+"""
+
+import email
+import mailbox
+import os
+import re
+from email import policy
+
+from django.db.models import Exists, OuterRef
+from django.db.models.functions import Lower
+
+from graduates.phones import normalize_phone
+from .models import SuppressedContact
+
+
+# فشل دائم خاص بالمستلم فقط: أخطاء المرسل أو المصادقة أو الإعداد (عنوان
+# المرسل المرفوض، معرّف رقم واتساب خاطئ) تخص الحساب لا المستلم فلا توقف أحداً
+EMAIL_SENDER_ERRORS = (
+    'SMTPSenderRefused', 'SMTPAuthenticationError', 'SMTPConnectError', 'SMTPHeloError',
+    'SMTPNotSupportedError', 'SMTPServerDisconnected',
+)
+# رفض المستلم برد دائم 5xx
+EMAIL_RECIPIENT_REFUSED = re.compile(r'SMTPRecipientsRefused\b.*\(5\d\d,', re.S)
+# رموز الحالة الموسعة لعنوان المستلم (5.1.7 و5.1.8 تخص عنوان المرسل)
+EMAIL_RECIPIENT_STATUS = re.compile(r'\b5\.1\.(?:[0-36]|10)\b')
+# واتساب: الرقم غير مسجل أو لا يمكن التسليم إليه
+WHATSAPP_UNDELIVERABLE = re.compile(r'\b131026\b')
+
+
+def error_text(exception):
+    """نص الخطأ المحفوظ في السجل مع نوع الاستثناء ليُصنف الفشل حسب مصدره"""
+    return f'{type(exception).__name__}: {exception}'
+
+
+def is_hard_failure(channel, error_message):
+    """هل رسالة خطأ القناة فشل دائم خاص بالمستلم يستوجب إيقاف عنوانه"""
+    if not error_message:
+        return False
+    if channel == 'whatsapp':
+        return bool(WHATSAPP_UNDELIVERABLE.search(error_message))
+    if any(name in error_message for name in EMAIL_SENDER_ERRORS):
+        return False
+    return bool(EMAIL_RECIPIENT_REFUSED.search(error_message) or EMAIL_RECIPIENT_STATUS.search(error_message))
+
+
+def normalize_address(channel, address):
+    """صيغة العنوان المحفوظة في جدول الإيقاف"""
+    if channel == 'email':
+        return (address or '').strip().lower()
+    return normalize_phone(address)
+
+
+def suppress(entries):
+    """
+    إضافة عناوين إلى قائمة الإيقاف دفعة واحدة.
+    entries: قائمة من (القناة، العنوان، السبب، التفاصيل). العناوين الموقوفة مسبقاً
+    تُتجاهل، ويُعاد عدد العناوين الجديدة.
+    """
+    contacts = {}
+    for channel, address, reason, detail in entries:
+        address = normalize_address(channel, address)
+        if address:
+            contacts.setdefault((channel, address), SuppressedContact(
+                channel=channel, address=address, reason=reason, detail=(detail or '')[:1000]
+            ))
+    if not contacts:
+        return 0
+    existing = set(SuppressedContact.objects.filter(
+        address__in={address for channel, address in contacts}
+    ).values_list('channel', 'address'))
+    new_contacts = [contact for key, contact in contacts.items() if key not in existing]
+    SuppressedContact.objects.bulk_create(new_contacts, ignore_conflicts=True)
+    return len(new_contacts)
+
+
+def record_hard_failures(send_logs):
+    """إيقاف عناوين سجلات الإرسال الفاشلة فشلاً دائماً"""
+    entries = []
+    for log in send_logs:
+        if log.status != 'failed' or not is_hard_failure(log.send_method, log.error_message):
+            continue
+        graduate = log.graduate
+        address = graduate.email if log.send_method == 'email' else graduate.phone_normalized
+        entries.append((log.send_method, address, 'hard_failure', log.error_message))
+    return suppress(entries) if entries else 0
+
+
+def annotate_suppressed(queryset, graduate_path=''):
+    """
+    إضافة email_suppressed و phone_suppressed إلى استعلام الخريجين أو الدعوات
+    حتى يُستبعد العنوان الموقوف في نفس استعلام اختيار المستلمين.
+    graduate_path: المسار إلى الخريج، مثل 'graduate__' لاستعلام الدعوات.
+    """
+    return queryset.annotate(
+        email_suppressed=Exists(SuppressedContact.objects.filter(
+            channel='email', address=Lower(OuterRef(f'{graduate_path}email'))
+        )),
+        phone_suppressed=Exists(SuppressedContact.objects.filter(
+            channel='whatsapp', address=OuterRef(f'{graduate_path}phone_normalized')
+        )),
+    )
+
+
+# رسائل الارتداد (DSN)
+
+def parse_dsn(message):
+    """
+    استخراج المستلمين الفاشلين فشلاً دائماً من رسالة ارتداد بصيغة DSN
+    (multipart/report). يعيد قائمة من (العنوان، الحالة، التشخيص).
+    """
+    failures = []
+    for part in message.walk():
+        if part.get_content_type() != 'message/delivery-status':
+            continue
+        for block in part.get_payload():
+            if not hasattr(block, 'get'):
+                continue
+            action = (block.get('Action') or '').strip().lower()
+            status = (block.get('Status') or '').strip()
+            recipient = block.get('Final-Recipient') or block.get('Original-Recipient') or ''
+            if action != 'failed' or not status.startswith('5'):
+                continue
+            address = recipient.split(';', 1)[-1].strip()
+            if address:
+                failures.append((address, status, (block.get('Diagnostic-Code') or '').strip()))
+
+    # بعض الخوادم لا ترسل DSN قياسياً وتكتفي بهذا الترويسة
+    if not failures and message.get('X-Failed-Recipients'):
+        for address in message['X-Failed-Recipients'].split(','):
+            failures.append((address.strip(), '5.0.0', message.get('Subject', '')))
+    return failures
+
+
+def iter_mailbox(path):
+    """
+    المرور على الرسائل في مجلد Maildir، أو مجلد ملفات .eml، أو ملف mbox.
+    يعيد أزواج (المفتاح، الرسالة) حيث المفتاح يُستخدم للحذف بعد المعالجة.
+    """
+    if os.path.isdir(os.path.join(path, 'cur')) or os.path.isdir(os.path.join(path, 'new')):
+        box = mailbox.Maildir(path, factory=None, create=False)
+        for key in box.keys():
+            yield ('maildir', box, key), box.get_message(key)
+    elif os.path.isdir(path):
+        for name in sorted(os.listdir(path)):
+            file_path = os.path.join(path, name)
+            if os.path.isfile(file_path):
+                with open(file_path, 'rb') as f:
+                    yield ('file', None, file_path), email.message_from_binary_file(f, policy=policy.compat32)
+    else:
+        box = mailbox.mbox(path, create=False)
+        for key in box.keys():
+            yield ('mbox', box, key), box.get_message(key)
+
+
+def process_mailbox(path, delete=False):
+    """
+    قراءة رسائل الارتداد من صندوق بريد محلي وإيقاف العناوين الفاشلة.
+    يعيد (عدد الرسائل المقروءة، عدد رسائل الارتداد، عدد العناوين الموقوفة).
+    """
+    scanned = bounces = 0
+    entries = []
+    processed = []
+    for handle, message in iter_mailbox(path):
+        scanned += 1
+        failures = parse_dsn(message)
+        if not failures:
+            continue
+        bounces += 1
+        for address, status, diagnostic in failures:
+            entries.append(('email', address, 'bounce', f'{status} {diagnostic}'.strip()))
+        processed.append(handle)
+
+    suppressed = suppress(entries) if entries else 0
+
+    if delete:
+        for kind, box, key in processed:
+            if kind == 'file':
+                os.remove(key)
+            else:
+                box.remove(key)
+        for box in {box for kind, box, key in processed if box is not None}:
+            if hasattr(box, 'flush'):
+                box.flush()
+    return scanned, bounces, suppressed
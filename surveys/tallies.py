@@ -0,0 +1,158 @@
+"""
+Question Tallies
+عدادات الإجابات لكل سؤال وخيار تُحدّث داخل معاملة حفظ الاستجابة، فتُقرأ
+النتائج بعدد صفوف يساوي عدد الأسئلة والخيارات مهما زاد عدد الاستجابات
+"""
+
+from datetime import date
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, Count, DecimalField, F, IntegerField, Max, Min, Sum, Value, When
+from django.db.models.functions import Coalesce, Greatest, Least
+
+from .models import Answer, Question, QuestionTally
+
+SUM_FIELD = DecimalField(max_digits=30, decimal_places=4)
+
+
+class TallyDelta:
+    """
+    تغييرات العدادات لدفعة من الإجابات: {(السؤال، الخيار أو None): [العدد،
+    المجموع، مجموع المربعات، الأقل، الأعلى]}. الحذف ينقص العدد والمجموع فقط،
+    أما الحدود فلا تضيق إلا بإعادة البناء.
+    """
+
+    def __init__(self):
+        self.rows = {}
+
+    def _row(self, key):
+        return self.rows.setdefault(key, [0, Decimal(0), Decimal(0), None, None])
+
+    def add(self, answers, sign=1):
+        """إضافة إجابات بالصيغة المختصرة [السؤال، النص، الرقم، التاريخ، الخيارات]"""
+        for question_id, text, number, day, choice_ids in answers:
+            row = self._row((question_id, None))
+            row[0] += sign
+            value = None
+            if number is not None:
+                value = Decimal(number)
+                row[1] += sign * value
+                row[2] += sign * value * value
+            elif day:
+                value = Decimal(date.fromisoformat(day).toordinal())
+            if value is not None and sign > 0:
+                row[3] = value if row[3] is None else min(row[3], value)
+                row[4] = value if row[4] is None else max(row[4], value)
+            for choice_id in choice_ids:
+                self._row((question_id, choice_id))[0] += sign
+        return self
+
+    def apply(self):
+        """
+        تطبيق التغييرات بتحديث UPDATE واحد بتعابير CASE على صفوف العدادات،
+        بعد إنشاء الصفوف الناقصة. يُستدعى داخل معاملة حفظ الإجابات.
+        """
+        if not self.rows:
+            return
+        ids = self._row_ids()
+        missing = [key for key in self.rows if key not in ids]
+        if missing:
+            QuestionTally.objects.bulk_create(
+                [
+                    QuestionTally(question_id=question_id, choice_id=choice_id, choice_key=choice_id or 0)
+                    for question_id, choice_id in missing
+                ],
+                ignore_conflicts=True,
+            )
+            ids = self._row_ids()
+
+        def case(index, output_field):
+            whens = [
+                When(pk=ids[key], then=Value(row[index]))
+                for key, row in self.rows.items() if row[index]
+            ]
+            return Case(*whens, default=Value(0), output_field=output_field) if whens else None
+
+        updates = {}
+        for field, index, output_field in (
+            ('count', 0, IntegerField()), ('value_sum', 1, SUM_FIELD), ('value_sum_sq', 2, SUM_FIELD),
+        ):
+            expression = case(index, output_field)
+            if expression is not None:
+                updates[field] = F(field) + expression
+        for field, index, function in (('value_min', 3, Least), ('value_max', 4, Greatest)):
+            whens = [
+                When(pk=ids[key], then=function(Coalesce(F(field), Value(row[index])), Value(row[index])))
+                for key, row in self.rows.items() if row[index] is not None
+            ]
+            if whens:
+                updates[field] = Case(*whens, default=F(field), output_field=SUM_FIELD)
+        QuestionTally.objects.filter(pk__in=[ids[key] for key in self.rows]).update(**updates)
+
+    def _row_ids(self):
+        rows = QuestionTally.objects.filter(
+            question_id__in={question_id for question_id, choice_id in self.rows}
+        ).values_list('id', 'question_id', 'choice_id')
+        return {(question_id, choice_id): pk for pk, question_id, choice_id in rows}
+
+
+def stored_answers(response_ids):
+    """إجابات استجابات محفوظة بالصيغة المختصرة لإنقاصها من العدادات قبل حذفها"""
+    choices = {}
+    for answer_id, choice_id in Answer.selected_choices.through.objects.filter(
+        answer__response_id__in=response_ids
+    ).values_list('answer_id', 'questionchoice_id'):
+        choices.setdefault(answer_id, []).append(choice_id)
+    return [
+        [question_id, '', str(number) if number is not None else None, None, choices.get(answer_id, [])]
+        for answer_id, question_id, number in Answer.objects.filter(
+            response_id__in=response_ids
+        ).values_list('id', 'question_id', 'answer_number')
+    ]
+
+
+def rebuild_tallies(survey_ids=None):
+    """
+    إعادة حساب عدادات الأسئلة من الإجابات المكتملة في استعلامين مجمعين
+    (الأسئلة والخيارات) واستبدال صفوفها في معاملة واحدة. يعيد عدد الصفوف.
+    """
+    questions = Question.objects.all()
+    if survey_ids is not None:
+        questions = questions.filter(survey_id__in=survey_ids)
+    answers = Answer.objects.filter(question__in=questions, response__is_complete=True).order_by()
+    date_questions = set(questions.filter(question_type='date').values_list('id', flat=True))
+
+    tallies = []
+    for row in answers.values('question_id').annotate(
+        total=Count('id'),
+        value_sum=Coalesce(Sum('answer_number'), Value(0), output_field=SUM_FIELD),
+        value_sum_sq=Coalesce(Sum(F('answer_number') * F('answer_number'), output_field=SUM_FIELD), Value(0), output_field=SUM_FIELD),
+        value_min=Min('answer_number'),
+        value_max=Max('answer_number'),
+        first_date=Min('answer_date'),
+        last_date=Max('answer_date'),
+    ):
+        tally = QuestionTally(
+            question_id=row['question_id'], count=row['total'],
+            value_sum=row['value_sum'], value_sum_sq=row['value_sum_sq'],
+            value_min=row['value_min'], value_max=row['value_max'],
+        )
+        if row['question_id'] in date_questions and row['first_date']:
+            tally.value_min = row['first_date'].toordinal()
+            tally.value_max = row['last_date'].toordinal()
+        tallies.append(tally)
+
+    through = Answer.selected_choices.through
+    for row in through.objects.filter(answer__in=answers).order_by().values(
+        'answer__question_id', 'questionchoice_id'
+    ).annotate(total=Count('id')):
+        tallies.append(QuestionTally(
+            question_id=row['answer__question_id'], choice_id=row['questionchoice_id'],
+            choice_key=row['questionchoice_id'], count=row['total'],
+        ))
+
+    with transaction.atomic():
+        QuestionTally.objects.filter(question__in=questions).delete()
+        QuestionTally.objects.bulk_create(tallies, batch_size=1000)
+    return len(tallies)
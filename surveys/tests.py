@@ -1,3 +1,316 @@
-from django.test import TestCase
+import secrets
+import smtplib
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.db import DatabaseError
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from graduates.models import Graduate
+
+from .campaigns import CampaignRunner, create_campaign
+from .definitions import get_data_version
+from .models import (
+    AnswerTerm, Question, QuestionChoice, QuestionTally, SendQuotaUsage, Survey, SurveyInvitation, SurveyResponse,
+)
+from .quotas import QuotaScheduler
+from .submissions import SubmissionWriter, delete_responses
+from .suppression import error_text, is_hard_failure
+from .tallies import TallyDelta, rebuild_tallies
+from .text_analytics import MAX_TERM_LENGTH, extract_terms, index_answers
+from .tokens import make_invitation_token, read_invitation_token
+
+SENT = {'success': True, 'message_id': 'wamid.1'}
+
+
+class SurveyMixin:
+    """استبيان بسؤال اختيار وسؤال تقييم وسؤال نصي، وخريجون للاختبار"""
+
+    def setUp(self):
+        self.user = User.objects.create_user('staff', password='x')
+        now = timezone.now()
+        self.survey = Survey.objects.create(
+            title='استبيان', description='وصف', created_by=self.user, status='active',
+            start_date=now, end_date=now + timedelta(days=5),
+        )
+        self.radio = Question.objects.create(survey=self.survey, question_text='الخيار', question_type='radio', order=1)
+        self.choices = [
+            QuestionChoice.objects.create(question=self.radio, choice_text=f'خيار {i}', order=i) for i in range(3)
+        ]
+        self.rating = Question.objects.create(survey=self.survey, question_text='التقييم', question_type='rating', order=2)
+        self.text = Question.objects.create(survey=self.survey, question_text='اقتراح', question_type='textarea', order=3)
+
+    def make_graduate(self, number, **fields):
+        return Graduate.objects.create(
+            first_name=f'خريج{number}', last_name='اختبار', email=f'g{number}@example.com',
+            phone=f'05{number:08d}', student_id=f's{number}', **fields,
+        )
+
+    def data(self, choice=0, rating=3, text='تدريب عملي'):
+        return {
+            f'question_{self.radio.pk}': self.choices[choice].pk,
+            f'question_{self.rating.pk}': rating,
+            f'question_{self.text.pk}': text,
+        }
+
+    def tallies(self):
+        return sorted(
+            (question_id, choice_key, count, value_sum)
+            for question_id, choice_key, count, value_sum in QuestionTally.objects.values_list(
+                'question_id', 'choice_key', 'count', 'value_sum',
+            )
+            if count
+        )
+
+
+class SurveyTestCase(SurveyMixin, TestCase):
+    pass
+
+
+class SubmissionWriterTests(SurveyTestCase):
+    def write(self, graduate_id=None, **data):
+        writer = SubmissionWriter(self.survey.pk)
+        return writer.write(writer.validate(self.data(**data)), graduate_id=graduate_id)
+
+    def test_graduate_resubmission_replaces_answers_and_counts_once(self):
+        graduate = self.make_graduate(1)
+        first = self.write(graduate.pk, choice=0, rating=2)
+        second = self.write(graduate.pk, choice=1, rating=5)
+
+        self.assertEqual(first.pk, second.pk)
+        self.assertEqual(SurveyResponse.objects.count(), 1)
+        self.assertEqual(second.answers.count(), 3)
+        self.assertEqual(Survey.objects.get(pk=self.survey.pk).responses_received, 1)
+        radio = QuestionTally.objects.filter(question=self.radio)
+        self.assertEqual(radio.get(choice_key=self.choices[0].pk).count, 0)
+        self.assertEqual(radio.get(choice_key=self.choices[1].pk).count, 1)
+        self.assertEqual(QuestionTally.objects.get(question=self.rating, choice_key=0).value_sum, 5)
+
+    def test_incomplete_response_counts_when_completed(self):
+        graduate = self.make_graduate(1)
+        SurveyResponse.objects.create(survey=self.survey, graduate=graduate, is_complete=False)
+        self.write(graduate.pk)
+        self.assertEqual(Survey.objects.get(pk=self.survey.pk).responses_received, 1)
+
+    def test_public_submissions_are_always_new(self):
+        self.write()
+        self.write()
+        self.assertEqual(SurveyResponse.objects.filter(graduate__isnull=True).count(), 2)
+        self.assertEqual(Survey.objects.get(pk=self.survey.pk).responses_received, 2)
+
+    def test_tallies_match_rebuild(self):
+        for number in range(4):
+            self.write(self.make_graduate(number).pk, choice=number % 3, rating=number + 1)
+        self.write(choice=2, rating=1)
+        written = self.tallies()
+        rebuild_tallies([self.survey.pk])
+        self.assertEqual(written, self.tallies())
+
+
+class TallyDeltaTests(SurveyTestCase):
+    def test_add_and_subtract(self):
+        answers = [[self.rating.pk, '4', '4', None, []], [self.radio.pk, 'خيار 0', None, None, [self.choices[0].pk]]]
+        TallyDelta().add(answers).add(answers).apply()
+        TallyDelta().add(answers[:1], sign=-1).apply()
+
+        rating = QuestionTally.objects.get(question=self.rating, choice_key=0)
+        self.assertEqual((rating.count, rating.value_sum, rating.value_sum_sq), (1, 4, 16))
+        self.assertEqual((rating.value_min, rating.value_max), (4, 4))
+        self.assertEqual(QuestionTally.objects.get(question=self.radio, choice_key=self.choices[0].pk).count, 2)
+
+    def test_delete_responses_updates_tallies_counters_and_version(self):
+        writer = SubmissionWriter(self.survey.pk)
+        responses = [
+            writer.write(writer.validate(self.data(choice=number % 3, rating=number + 1)), graduate_id=self.make_graduate(number).pk)
+            for number in range(4)
+        ]
+        version = get_data_version(self.survey.pk)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            deleted = delete_responses([responses[0].pk, responses[1].pk])
+
+        self.assertEqual(deleted, 2)
+        self.assertEqual(Survey.objects.get(pk=self.survey.pk).responses_received, 2)
+        self.assertNotEqual(get_data_version(self.survey.pk), version)
+        remaining = self.tallies()
+        rebuild_tallies([self.survey.pk])
+        self.assertEqual(remaining, self.tallies())
+        self.assertEqual(delete_responses([responses[0].pk]), 0)
+
+
+class InvitationTokenTests(SurveyTestCase):
+    def test_round_trip(self):
+        token = make_invitation_token(self.survey.pk, 12345)
+        self.assertEqual(read_invitation_token(token), (self.survey.pk, 12345))
+
+    def test_tampered_and_legacy_tokens_are_rejected(self):
+        token = make_invitation_token(self.survey.pk, 7)
+        survey_part, graduate_part, signature = token.split('-', 2)
+        self.assertIsNone(read_invitation_token(f'{survey_part}-8-{signature}'))
+        self.assertIsNone(read_invitation_token(token[:-1] + ('A' if token[-1] != 'A' else 'B')))
+        self.assertIsNone(read_invitation_token(secrets.token_urlsafe(16).replace('-', '_')))
+
+    def test_link_expires_with_the_survey(self):
+        # الرمز لا يحمل تاريخاً حتى تبقى الروابط المرسلة صالحة؛ تنتهي صلاحيته بانتهاء الاستبيان
+        graduate = self.make_graduate(1)
+        url = reverse('surveys:take_survey_by_token', args=[make_invitation_token(self.survey.pk, graduate.pk)])
+        self.assertTemplateUsed(self.client.get(url), 'surveys/take_survey.html')
+
+        Survey.objects.filter(pk=self.survey.pk).update(end_date=timezone.now() - timedelta(minutes=1))
+        self.survey.refresh_from_db()
+        self.survey.save()
+        self.assertTemplateUsed(self.client.get(url), 'surveys/survey_unavailable.html')
+
+    def test_completed_survey_is_not_served_again(self):
+        graduate = self.make_graduate(1)
+        SurveyInvitation.objects.create(survey=self.survey, graduate=graduate, invitation_token=secrets.token_urlsafe(16))
+        url = reverse('surveys:take_survey_by_token', args=[make_invitation_token(self.survey.pk, graduate.pk)])
+        self.assertEqual(self.client.post(url, self.data()).status_code, 302)
+        self.assertTemplateUsed(self.client.get(url), 'surveys/survey_unavailable.html')
+
+
+class AnswerTermTests(SurveyTestCase):
+    def test_long_word_and_phrase_are_distinct_terms(self):
+        terms = extract_terms('a' * 120 + ' hello')
+        self.assertEqual(terms[('a' * MAX_TERM_LENGTH, False)], 1)
+        self.assertEqual(terms[('a' * MAX_TERM_LENGTH, True)], 1)
+
+    def test_repeated_words_are_counted(self):
+        terms = extract_terms('التدريب العملي ثم التدريب')
+        self.assertEqual(terms[('تدريب', False)], 2)
+        self.assertEqual(terms[('تدريب عملي', True)], 1)
+
+    def test_long_word_answer_is_saved_and_indexed(self):
+        writer = SubmissionWriter(self.survey.pk)
+        writer.write(writer.validate(self.data(text='a' * 120 + ' hello')), graduate_id=self.make_graduate(1).pk)
+        self.assertEqual(SurveyResponse.objects.count(), 1)
+        self.assertEqual(AnswerTerm.objects.filter(term='a' * MAX_TERM_LENGTH).count(), 2)
+
+    def test_index_failure_does_not_abort_submission(self):
+        writer = SubmissionWriter(self.survey.pk)
+        with mock.patch.object(AnswerTerm.objects, 'bulk_create', side_effect=DatabaseError('index')), \
+                self.assertLogs('surveys.text_analytics', 'ERROR'):
+            writer.write(writer.validate(self.data()), graduate_id=self.make_graduate(1).pk)
+        self.assertEqual(SurveyResponse.objects.count(), 1)
+        self.assertEqual(Survey.objects.get(pk=self.survey.pk).responses_received, 1)
+        self.assertFalse(AnswerTerm.objects.exists())
+
+    def test_index_ignores_duplicate_rows(self):
+        writer = SubmissionWriter(self.survey.pk)
+        response = writer.write(writer.validate(self.data(text='hello world')), graduate_id=self.make_graduate(1).pk)
+        answer = response.answers.get(question=self.text)
+        index_answers([(answer.pk, self.text.pk, 'hello world')])
+        self.assertEqual(AnswerTerm.objects.filter(answer=answer).count(), 3)
+
+
+class HardFailureTests(TestCase):
+    def test_recipient_failures(self):
+        refused = smtplib.SMTPRecipientsRefused({'x@example.com': (550, b'5.1.1 <x@example.com>: User unknown')})
+        self.assertTrue(is_hard_failure('email', error_text(refused)))
+        self.assertTrue(is_hard_failure('email', '550 5.1.1 mailbox unavailable'))
+        self.assertTrue(is_hard_failure('whatsapp', '131026: Message undeliverable'))
+
+    def test_sender_auth_and_config_errors_are_not_hard_failures(self):
+        sender = smtplib.SMTPSenderRefused(553, b'5.7.1 <from@example.com>: Sender address rejected', 'from@example.com')
+        auth = smtplib.SMTPAuthenticationError(535, b'5.7.8 Username and Password not accepted')
+        self.assertFalse(is_hard_failure('email', error_text(sender)))
+        self.assertFalse(is_hard_failure('email', error_text(auth)))
+        self.assertFalse(is_hard_failure('email', '550 5.1.8 sender domain does not exist'))
+        self.assertFalse(is_hard_failure('whatsapp', 'HTTP 400: {"error": {"message": "Object with ID \'123\' does not exist", "code": 100}}'))
+
+    def test_temporary_failures(self):
+        greylisted = smtplib.SMTPRecipientsRefused({'x@example.com': (450, b'4.2.0 Greylisted')})
+        self.assertFalse(is_hard_failure('email', error_text(greylisted)))
+        self.assertFalse(is_hard_failure('email', ''))
+
+
+@override_settings(
+    SURVEY_QUIET_HOURS=None,
+    SURVEY_EMAIL_DEFAULT_LIMITS={'daily_limit': 3, 'per_minute': 100},
+    SURVEY_WHATSAPP_DEFAULT_LIMITS={'daily_limit': 100, 'per_minute': 100},
+)
+class QuotaTests(TestCase):
+    def test_daily_cap_is_shared_between_schedulers(self):
+        first, second = QuotaScheduler(['email'], pace=False), QuotaScheduler(['email'], pace=False)
+        granted = [first.acquire(['email']) is not None for _ in range(2)]
+        granted += [second.acquire(['email']) is not None for _ in range(2)]
+        self.assertEqual(granted, [True, True, True, False])
+        self.assertIsNotNone(second.resume_at)
+        self.assertEqual(SendQuotaUsage.objects.get(window='day').count, 3)
+
+    def test_reservation_checks_the_limit_when_it_writes(self):
+        # عملية أخرى بلغت الحد بعد آخر قراءة: الحجز المشروط يرفض الزيادة
+        scheduler = QuotaScheduler(['email'], pace=False)
+        account = scheduler.accounts['email'][0]
+        now = timezone.now()
+        self.assertIsNone(scheduler._reserve(account, now))
+        SendQuotaUsage.objects.filter(window='day').update(count=3)
+        self.assertEqual(scheduler._reserve(account, now), 'day')
+        self.assertEqual(SendQuotaUsage.objects.get(window='day').count, 3)
+
+    def test_minute_cap_rolls_back_day_reservation(self):
+        with self.settings(SURVEY_EMAIL_DEFAULT_LIMITS={'daily_limit': 10, 'per_minute': 1}):
+            scheduler = QuotaScheduler(['email'], pace=False)
+            self.assertIsNotNone(scheduler.acquire(['email']))
+            self.assertIsNone(scheduler.acquire(['email']))
+        self.assertEqual(SendQuotaUsage.objects.get(window='day').count, 1)
+
+    def test_channel_without_room_releases_the_other(self):
+        with self.settings(SURVEY_WHATSAPP_DEFAULT_LIMITS={'daily_limit': 0, 'per_minute': 100}):
+            self.assertIsNone(QuotaScheduler(['email', 'whatsapp'], pace=False).acquire(['email', 'whatsapp']))
+        self.assertEqual(SendQuotaUsage.objects.get(channel='email', window='day').count, 0)
+
+
+@override_settings(SURVEY_QUIET_HOURS=None)
+@mock.patch('surveys.whatsapp_service.MockWhatsAppService.send_survey_message', return_value=SENT)
+@mock.patch('surveys.whatsapp_service.EmailService.send_invitation_email', return_value=SENT)
+class CampaignTests(SurveyMixin, TransactionTestCase):
+    # خيوط الإرسال تحجز الحصة باتصالاتها الخاصة فلا تعمل داخل معاملة الاختبار
+    def setUp(self):
+        super().setUp()
+        self.graduates = [self.make_graduate(number) for number in range(3)]
+
+    def run_campaign(self):
+        campaign = create_campaign(self.survey, self.graduates, self.user)
+        CampaignRunner(campaign, scheduler=QuotaScheduler(campaign.channels, pace=False)).run()
+        campaign.refresh_from_db()
+        return campaign
+
+    def test_requeued_invitations_do_not_inflate_total_sent(self, *mocks):
+        self.survey.send_method = 'email'
+        self.survey.save()
+        self.run_campaign()
+        sent_at = dict(SurveyInvitation.objects.values_list('graduate_id', 'sent_at'))
+        SurveyInvitation.objects.filter(graduate=self.graduates[0]).update(status='opened')
+
+        campaign = self.run_campaign()
+
+        self.assertEqual(campaign.status, 'completed')
+        self.assertEqual(campaign.email_sent, 2)
+        self.assertEqual(Survey.objects.get(pk=self.survey.pk).total_sent, 3)
+        self.assertEqual(dict(SurveyInvitation.objects.values_list('graduate_id', 'sent_at')), sent_at)
+        self.assertEqual(SurveyInvitation.objects.get(graduate=self.graduates[0]).status, 'opened')
+
+    @override_settings(SURVEY_WHATSAPP_DEFAULT_LIMITS={'daily_limit': 100, 'per_minute': 1})
+    def test_deferred_channel_is_retried(self, *mocks):
+        self.survey.send_method = 'both'
+        self.survey.save()
+        campaign = self.run_campaign()
+        self.assertEqual(campaign.status, 'deferred')
+        self.assertEqual((campaign.email_sent, campaign.whatsapp_sent), (3, 1))
+        self.assertEqual(SurveyInvitation.objects.filter(status='pending', pending_channels='whatsapp').count(), 2)
+
+        for _ in range(2):
+            SendQuotaUsage.objects.filter(window='minute').delete()
+            campaign.status = 'queued'
+            campaign.save(update_fields=['status'])
+            CampaignRunner(campaign, scheduler=QuotaScheduler(campaign.channels, pace=False)).run()
+        campaign.refresh_from_db()
+
+        self.assertEqual(campaign.status, 'completed')
+        self.assertEqual((campaign.email_sent, campaign.whatsapp_sent), (3, 3))
+        self.assertEqual(campaign.get_progress()['percent'], 100)
+        self.assertEqual(Survey.objects.get(pk=self.survey.pk).total_sent, 3)
@@ -0,0 +1,286 @@
+"""
+Text Answer Analytics
+تطبيع الإجابات النصية العربية وتقطيعها إلى كلمات وعبارات تُحفظ في فهرس
+(AnswerTerm) عند حفظ الإجابات، ثم حساب أكثر الكلمات والعبارات تكراراً لكل
+سؤال وتجميع الإجابات المتقاربة من الفهرس بدلاً من مطابقة النصوص الخام
+"""
+
+import hashlib
+import json
+import logging
+import math
+import re
+from collections import Counter
+
+from django.core.cache import cache
+from django.db import DatabaseError, transaction
+from django.db.models import Count, Sum
+
+from .crosstab import DIMENSIONS
+from .definitions import get_data_version, get_survey_definition
+from .models import Answer, AnswerTerm
+
+logger = logging.getLogger(__name__)
+
+TEXT_TYPES = ('text', 'textarea', 'email')
+TEXT_ANALYTICS_TIMEOUT = 60 * 60
+MAX_TERM_LENGTH = 100
+CLUSTER_ANSWERS = 5000
+CLUSTER_THRESHOLD = 0.6
+
+_DIACRITICS = re.compile('[\u0610-\u061a\u064b-\u065f\u0670\u06d6-\u06ed\u0640]')
+_LETTERS = str.maketrans({
+    'أ': 'ا', 'إ': 'ا', 'آ': 'ا', 'ٱ': 'ا',
+    'ى': 'ي', 'ئ': 'ي', 'ؤ': 'و', 'ة': 'ه',
+    **{chr(0x0660 + digit): str(digit) for digit in range(10)},
+    **{chr(0x06f0 + digit): str(digit) for digit in range(10)},
+})
+_WORD = re.compile(r'[^\W_]+')
+_ARTICLES = ('وال', 'بال', 'كال', 'فال', 'ولل', 'فلل', 'لل', 'ال')
+
+
+def normalize(text):
+    """توحيد أشكال الحروف العربية وحذف التشكيل والتطويل وتحويل الأرقام والأحرف الصغيرة"""
+    return _DIACRITICS.sub('', (text or '').lower()).translate(_LETTERS)
+
+
+def _stem(word):
+    """حذف أداة التعريف (وما يسبقها من حروف العطف والجر) إذا بقي جذر من 3 أحرف فأكثر"""
+    for article in _ARTICLES:
+        if word.startswith(article) and len(word) - len(article) >= 3:
+            return word[len(article):]
+    return word
+
+
+STOPWORDS = frozenset(normalize(word) for word in '''
+    في من على إلى عن مع هو هي هم نحن أنا أنت هذا هذه ذلك تلك هناك هنا التي الذي الذين
+    أن إن أو ثم لا ما لم لن قد كان كانت يكون تكون كل بعض غير عند حتى إذا كما لكن بين
+    بعد قبل أيضا جدا فقط أي كيف متى لماذا ليس يجب يمكن به بها له لها لهم فيه فيها منه
+    منها عليه عليها وهو وهي وفي ومن وعلى ولا ولكن أكثر أقل كثير شيء
+    the a an and or of to in on for with is are was be it this that not no yes
+'''.split())
+
+
+def tokenize(text):
+    """
+    كلمات النص المطبّعة بترتيبها، مع None مكان كلمات الوصل المستبعدة حتى
+    لا تُكوَّن عبارة من كلمتين غير متجاورتين
+    """
+    tokens = []
+    for word in _WORD.findall(normalize(text)):
+        if word in STOPWORDS or len(word) < 2:
+            tokens.append(None)
+        else:
+            tokens.append(_stem(word)[:MAX_TERM_LENGTH])
+    return tokens
+
+
+def extract_terms(text):
+    """تكرار الكلمات والعبارات (كلمتان متجاورتان) في النص: {(الكلمة، عبارة؟): العدد}"""
+    tokens = tokenize(text)
+    terms = Counter((token, False) for token in tokens if token)
+    terms.update(
+        (f'{first} {second}'[:MAX_TERM_LENGTH], True)
+        for first, second in zip(tokens, tokens[1:]) if first and second
+    )
+    return terms
+
+
+def build_terms(rows):
+    """صفوف AnswerTerm غير المحفوظة من (معرّف الإجابة، معرّف السؤال، النص)"""
+    return [
+        AnswerTerm(
+            answer_id=answer_id, question_id=question_id, term=term,
+            is_phrase=is_phrase, frequency=min(frequency, 32767),
+        )
+        for answer_id, question_id, text in rows
+        for (term, is_phrase), frequency in extract_terms(text).items()
+    ]
+
+
+def index_answers(rows):
+    """
+    فهرسة إجابات نصية جديدة بعملية إدراج مجمعة واحدة داخل معاملة حفظ
+    الاستجابة. الفهرس ثانوي فلا يُفشل الحفظ: الصفوف المتعارضة (كلمتان تتطابقان
+    في ترتيب MySQL غير الحساس لحالة الأحرف والتشكيل) تُتجاهل، وأي خطأ آخر
+    يُسجل ويُرجع الفهرس وحده إلى نقطة الحفظ، ثم يصلحه الأمر rebuild_answer_terms.
+    """
+    terms = build_terms(rows)
+    if not terms:
+        return
+    try:
+        with transaction.atomic():
+            AnswerTerm.objects.bulk_create(terms, batch_size=1000, ignore_conflicts=True)
+    except DatabaseError:
+        logger.exception('Failed to index %s answer terms', len(terms))
+
+
+def rebuild_answer_terms(survey_ids=None, batch_size=2000):
+    """
+    إعادة بناء فهرس الكلمات لإجابات الأسئلة النصية (بعد تغيير قواعد التطبيع
+    أو لفهرسة إجابات سابقة)، على دفعات كل منها في معاملة. يعيد عدد الصفوف.
+    """
+    answers = Answer.objects.filter(question__question_type__in=TEXT_TYPES).exclude(answer_text='')
+    if survey_ids is not None:
+        answers = answers.filter(question__survey_id__in=survey_ids)
+    total = 0
+    last_id = 0
+    while True:
+        rows = list(
+            answers.filter(id__gt=last_id).order_by('id')
+            .values_list('id', 'question_id', 'answer_text')[:batch_size]
+        )
+        if not rows:
+            break
+        terms = build_terms(rows)
+        with transaction.atomic():
+            AnswerTerm.objects.filter(answer_id__in=[row[0] for row in rows]).delete()
+            AnswerTerm.objects.bulk_create(terms, batch_size=1000, ignore_conflicts=True)
+        total += len(terms)
+        last_id = rows[-1][0]
+    return total
+
+
+def top_terms(terms, limit, phrases=False):
+    """أكثر الكلمات (أو العبارات) وروداً في مجموعة صفوف من الفهرس حسب عدد الإجابات"""
+    rows = (
+        terms.filter(is_phrase=phrases).order_by().values('term')
+        .annotate(answers=Count('id'), occurrences=Sum('frequency'))
+        .order_by('-answers', '-occurrences', 'term')
+    )
+    if phrases:
+        rows = rows.filter(answers__gt=1)
+    return list(rows[:limit])
+
+
+def cluster_near_duplicates(documents, threshold=CLUSTER_THRESHOLD):
+    """
+    تجميع الإجابات المتقاربة: {معرّف الإجابة: مجموعة كلماتها} ← قوائم معرّفات.
+    الإجابات ذات الكلمات نفسها تُجمع مباشرة، ثم تُقارن المجموعات المختلفة
+    بمعامل جاكارد مع ترشيح البادئة (مقارنة المجموعات التي تشترك في إحدى
+    أندر كلماتها فقط) بدلاً من مقارنة كل زوج.
+    """
+    groups = {}
+    for answer_id, terms in documents.items():
+        if terms:
+            groups.setdefault(frozenset(terms), []).append(answer_id)
+    signatures = list(groups)
+    frequency = Counter(term for signature in signatures for term in signature)
+    parent = list(range(len(signatures)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    index = {}
+    for i, signature in enumerate(signatures):
+        ordered = sorted(signature, key=lambda term: (frequency[term], term))
+        prefix = ordered[:len(ordered) - math.ceil(threshold * len(ordered)) + 1]
+        candidates = {j for term in prefix for j in index.get(term, ())}
+        for j in candidates:
+            other = signatures[j]
+            if len(signature & other) / len(signature | other) >= threshold:
+                parent[find(i)] = find(j)
+        for term in prefix:
+            index.setdefault(term, []).append(i)
+
+    clusters = {}
+    for i, signature in enumerate(signatures):
+        clusters.setdefault(find(i), []).append(signature)
+    return [
+        [answer_id for signature in members for answer_id in groups[signature]]
+        for members in clusters.values()
+    ]
+
+
+class TextAnalytics:
+    """
+    تحليل إجابات سؤال نصي من فهرس الكلمات: أكثر الكلمات والعبارات تكراراً
+    ومجموعات الإجابات المتقاربة، مع تصفية اختيارية بصفات الخريج. تُحفظ
+    النتيجة في الكاش بمفتاح يتضمن إصدار بيانات الاستبيان.
+
+    الاستخدام:
+        TextAnalytics(survey_id, question_id, {'college': 'علوم'}).build()
+    """
+
+    def __init__(self, survey_id, question_id, filters=None, limit=20):
+        self.definition = get_survey_definition(survey_id)
+        if self.definition is None:
+            raise ValueError('الاستبيان غير موجود')
+        self.survey_id = self.definition['id']
+        self.question = next(
+            (question for question in self.definition['questions'] if question['id'] == question_id), None
+        )
+        if self.question is None:
+            raise ValueError('السؤال غير موجود في هذا الاستبيان')
+        if self.question['question_type'] not in TEXT_TYPES:
+            raise ValueError('تحليل النصوص متاح للأسئلة النصية فقط')
+        unknown = [name for name in filters or {} if name not in DIMENSIONS]
+        if unknown:
+            raise ValueError(f'صفات غير معروفة: {", ".join(unknown)}')
+        self.filters = {name: value for name, value in (filters or {}).items() if value not in (None, '')}
+        self.limit = limit
+
+    def cache_key(self):
+        params = json.dumps([self.question['id'], sorted(self.filters.items()), self.limit], default=str)
+        digest = hashlib.md5(params.encode()).hexdigest()
+        return f'survey_text:{self.survey_id}:{get_data_version(self.survey_id)}:{digest}'
+
+    def build(self):
+        key = self.cache_key()
+        result = cache.get(key)
+        if result is None:
+            result = self._compute()
+            cache.set(key, result, TEXT_ANALYTICS_TIMEOUT)
+        return result
+
+    def _lookups(self, prefix):
+        lookups = {f'{prefix}response__is_complete': True}
+        lookups.update({
+            f'{prefix}response__graduate__{DIMENSIONS[name][0]}': value for name, value in self.filters.items()
+        })
+        return lookups
+
+    def _compute(self):
+        terms = AnswerTerm.objects.filter(question_id=self.question['id'], **self._lookups('answer__'))
+        answer_ids = list(
+            Answer.objects.filter(question_id=self.question['id'], **self._lookups(''))
+            .exclude(answer_text='').order_by('-id').values_list('id', flat=True)[:CLUSTER_ANSWERS]
+        )
+        documents = {answer_id: set() for answer_id in answer_ids}
+        for answer_id, term in AnswerTerm.objects.filter(
+            answer_id__in=answer_ids, is_phrase=False
+        ).values_list('answer_id', 'term'):
+            documents[answer_id].add(term)
+
+        clusters = sorted(
+            (cluster for cluster in cluster_near_duplicates(documents) if len(cluster) > 1),
+            key=len, reverse=True,
+        )[:self.limit]
+        samples = dict(Answer.objects.filter(
+            id__in=[max(cluster) for cluster in clusters]
+        ).values_list('id', 'answer_text'))
+
+        return {
+            'survey_id': self.survey_id,
+            'question_id': self.question['id'],
+            'question_text': self.question['question_text'],
+            'filters': self.filters,
+            'analyzed_answers': len(answer_ids),
+            'top_terms': top_terms(terms, self.limit),
+            'top_phrases': top_terms(terms, self.limit, phrases=True),
+            'clusters': [
+                {
+                    'size': len(cluster),
+                    'sample': samples.get(max(cluster), ''),
+                    'terms': [
+                        term for term, count in Counter(
+                            term for answer_id in cluster for term in documents[answer_id]
+                        ).most_common(5)
+                    ],
+                }
+                for cluster in clusters
+            ],
+        }
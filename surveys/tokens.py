@@ -0,0 +1,41 @@
+"""
+Signed Invitation Tokens
+رموز دعوات موقعة ومختصرة تحمل معرّف الاستبيان والخريج ويمكن التحقق منها دون قاعدة البيانات
+"""
+
+import base64
+
+from django.utils.crypto import constant_time_compare, salted_hmac
+from django.utils.http import base36_to_int, int_to_base36
+
+SALT = 'surveys.invitation-token'
+# 12 بايت من HMAC-SHA256 (96 بت) تكفي لمنع التخمين مع إبقاء الرابط قصيراً
+SIGNATURE_BYTES = 12
+
+
+def _signature(value):
+    digest = salted_hmac(SALT, value, algorithm='sha256').digest()[:SIGNATURE_BYTES]
+    return base64.urlsafe_b64encode(digest).decode().rstrip('=')
+
+
+def make_invitation_token(survey_id, graduate_id):
+    """رمز بالصيغة <استبيان>-<خريج>-<توقيع> بترميز base36 للمعرفات"""
+    value = f'{int_to_base36(survey_id)}-{int_to_base36(graduate_id)}'
+    return f'{value}-{_signature(value)}'
+
+
+def read_invitation_token(token):
+    """
+    التحقق من الرمز الموقع وإرجاع (معرّف الاستبيان، معرّف الخريج)،
+    أو None إذا لم يكن رمزاً موقعاً صالحاً (مثل رموز الدعوات القديمة).
+    """
+    parts = token.split('-', 2)
+    if len(parts) != 3:
+        return None
+    survey_part, graduate_part, signature = parts
+    if not constant_time_compare(signature, _signature(f'{survey_part}-{graduate_part}')):
+        return None
+    try:
+        return base36_to_int(survey_part), base36_to_int(graduate_part)
+    except ValueError:
+        return None
@@ -0,0 +1,25 @@
+"""
+Email Open/Click Tracking
+روابط تتبع فتح رسائل البريد والضغط على روابطها
+"""
+
+import base64
+
+from django.urls import reverse
+
+from .tokens import make_invitation_token
+
+# صورة GIF شفافة بحجم 1×1
+TRACKING_PIXEL = base64.b64decode('R0lGODlhAQABAIAAAAAAAP///yH5BAEAAAAALAAAAAABAAEAAAIBRAA7')
+
+
+def email_links(domain, survey_id, graduate_id):
+    """
+    روابط رسالة البريد لدعوة واحدة: رابط الاستبيان عبر مسار تتبع الضغط،
+    ورابط صورة تتبع الفتح.
+    """
+    token = make_invitation_token(survey_id, graduate_id)
+    return {
+        'link': f'http://{domain}{reverse("surveys:track_click", args=[token])}',
+        'pixel': f'http://{domain}{reverse("surveys:track_open", args=[token])}',
+    }
@@ -45,5 +45,32 @@ urlpatterns = [
     path('<int:pk>/delete/', views.survey_delete, name='delete'),
     path('<int:pk>/send/', views.send_survey_select, name='send_survey_select'),
     path('take/<str:invitation_token>/', views.take_survey_by_token, name='take_survey_by_token'),
+    path('t/<str:token>/open.gif', views.track_open, name='track_open'),
+    path('t/<str:token>/go/', views.track_click, name='track_click'),
+    path('webhooks/whatsapp/', views.whatsapp_webhook, name='whatsapp_webhook'),
+    # نتائج وتحليلات الاستبيان
+    path('<int:pk>/results/', views.survey_results, name='results'),
+    path('<int:pk>/export/<str:format_type>/', views.survey_export, name='export'),
+    path('<int:pk>/analytics/', views.survey_analytics_detail, name='analytics_detail'),
+    path('<int:pk>/chart-data/', views.api_survey_chart_data, name='chart_data'),
+    path('<int:pk>/crosstab/', views.survey_crosstab, name='crosstab'),
+    path('<int:pk>/statistics/', views.survey_statistics, name='statistics'),
+    path('<int:pk>/text-analytics/', views.survey_text_analytics, name='text_analytics'),
+    path('<int:pk>/funnel/', views.survey_funnel, name='funnel'),
+    # البحث في الإجابات وعرض الاستجابة
+    path('responses/search/', views.response_search, name='response_search'),
+    path('responses/<int:pk>/', views.survey_response_detail, name='response_detail'),
+    # سلاسل الاستبيانات المتكررة (الموجات)
+    path('series/', views.series_list, name='series_list'),
+    path('series/<int:pk>/', views.series_detail, name='series_detail'),
+    path('series/<int:pk>/comparison/', views.series_comparison, name='series_comparison'),
+    # سجلات إرسال الاستبيان
+    path('<int:survey_id>/logs/', views.send_survey_logs, name='send_logs'),
+    # متابعة تقدم حملة الإرسال
+    path('campaigns/<int:pk>/progress/', views.campaign_progress, name='campaign_progress'),
+    # معاينة شريحة المستلمين
+    path('segments/preview/', views.segment_preview, name='segment_preview'),
+    # مؤشرات الحفظ المؤجل للاستجابات
+    path('submissions/metrics/', views.submission_metrics_view, name='submission_metrics'),
 ]
 
@@ -6,7 +6,12 @@ from django.utils import timezone
 from django.urls import reverse
 from django.contrib.sites.models import Site
 from graduate_system import settings
-from .models import SurveyInvitation, SurveySendLog
+from graduates.models import Graduate
+from .counters import increment_counters
+from .models import SurveyInvitation
+from .send_log import SendLogBuffer
+from .suppression import annotate_suppressed
+from .tokens import make_invitation_token
 
 class SurveySender:
     def send_invitations(self, survey, graduates, request):
@@ -16,60 +21,71 @@ class SurveySender:
         """
         successful_sends = []
         failed_sends = []
+        reached = 0
 
-        for graduate in graduates:
-            while True:
-                token = secrets.token_urlsafe(16)
-                if not SurveyInvitation.objects.filter(invitation_token=token).exists():
-                    break
+        # استبعاد العناوين الموقوفة في نفس استعلام جلب الخريجين
+        graduate_ids = [getattr(graduate, 'pk', graduate) for graduate in graduates]
+        graduates = annotate_suppressed(Graduate.objects.filter(pk__in=graduate_ids))
 
-            invitation, created = SurveyInvitation.objects.get_or_create(
-                survey=survey,
-                graduate=graduate
-            )
+        with SendLogBuffer() as send_log:
+            for graduate in graduates:
+                if not graduate.email or graduate.email_suppressed:
+                    failed_sends.append((graduate, 'البريد الإلكتروني غير متاح أو موقوف'))
+                    continue
 
-            # إذا كانت الدعوة موجودة مسبقًا ولكن بدون رمز، أو إذا كانت جديدة، قم بإنشاء رمز
-            if created or not invitation.invitation_token:
-                invitation.invitation_token = token
-                invitation.status = 'pending' # إعادة تعيين الحالة عند إعادة الإرسال
-                invitation.save()
+                while True:
+                    token = secrets.token_urlsafe(16)
+                    if not SurveyInvitation.objects.filter(invitation_token=token).exists():
+                        break
 
-            # إرسال البريد الإلكتروني فقط إذا تم إنشاء الدعوة حديثًا أو إذا أردنا إعادة الإرسال دائمًا
-            # في الوقت الحالي، سنقوم بالإرسال في كل مرة يتم فيها تحديد الخريج
+                invitation, created = SurveyInvitation.objects.get_or_create(
+                    survey=survey,
+                    graduate=graduate
+                )
 
-            # بناء رابط الاستبيان باستخدام Django Sites Framework
-            current_site = Site.objects.get_current()
-            survey_path = reverse('surveys:take_survey_by_token', args=[invitation.invitation_token])
-            survey_url = f'http://{current_site.domain}{survey_path}'
+                # إذا كانت الدعوة موجودة مسبقًا ولكن بدون رمز، أو إذا كانت جديدة، قم بإنشاء رمز
+                if created or not invitation.invitation_token:
+                    invitation.invitation_token = token
+                    invitation.status = 'pending' # إعادة تعيين الحالة عند إعادة الإرسال
+                    invitation.save()
 
-            # Prepare email content
-            subject = f'دعوة للمشاركة في استبيان: {survey.title}'
-            context = {
-                'graduate_name': graduate.full_name,
-                'survey_title': survey.title,
-                'survey_link': survey_url,  # تصحيح اسم المتغير ليتطابق مع القالب
-            }
-            html_message = render_to_string('surveys/survey_email_template.html', context)
-            plain_message = strip_tags(html_message)
-            from_email = settings.DEFAULT_FROM_EMAIL
-            to_email = graduate.email
+                # إرسال البريد الإلكتروني فقط إذا تم إنشاء الدعوة حديثًا أو إذا أردنا إعادة الإرسال دائمًا
+                # في الوقت الحالي، سنقوم بالإرسال في كل مرة يتم فيها تحديد الخريج
 
-            try:
-                send_mail(subject, plain_message, from_email, [to_email], html_message=html_message)
-                SurveySendLog.objects.create(
-                    survey=survey,
-                    graduate=graduate,
-                    status='success',
-                    details=f'Email sent successfully to {to_email}'
-                )
-                successful_sends.append(graduate)
-            except Exception as e:
-                SurveySendLog.objects.create(
-                    survey=survey,
-                    graduate=graduate,
-                    status='failed',
-                    error_message=f'Failed to send email to {to_email}: {str(e)}'
-                )
-                failed_sends.append((graduate, str(e)))
-        
+                # بناء رابط الاستبيان باستخدام Django Sites Framework
+                current_site = Site.objects.get_current()
+                survey_path = reverse('surveys:take_survey_by_token', args=[make_invitation_token(invitation.survey_id, invitation.graduate_id)])
+                survey_url = f'http://{current_site.domain}{survey_path}'
+
+                # Prepare email content
+                subject = f'دعوة للمشاركة في استبيان: {survey.title}'
+                context = {
+                    'graduate_name': graduate.full_name,
+                    'survey_title': survey.title,
+                    'survey_link': survey_url,  # تصحيح اسم المتغير ليتطابق مع القالب
+                }
+                html_message = render_to_string('surveys/survey_email_template.html', context)
+                plain_message = strip_tags(html_message)
+                from_email = settings.DEFAULT_FROM_EMAIL
+                to_email = graduate.email
+
+                try:
+                    send_mail(subject, plain_message, from_email, [to_email], html_message=html_message)
+                    send_log.add(survey, graduate, 'email')
+                    successful_sends.append(graduate)
+                    reached += invitation.sent_at is None
+                    invitation.status = 'sent'
+                    invitation.sent_at = invitation.sent_at or timezone.now()
+                    invitation.save(update_fields=['status', 'sent_at'])
+                except Exception as e:
+                    send_log.add(
+                        survey,
+                        graduate,
+                        'email',
+                        status='failed',
+                        error_message=f'Failed to send email to {to_email}: {str(e)}'
+                    )
+                    failed_sends.append((graduate, str(e)))
+
+        increment_counters(survey.pk, total_sent=reached, email_sent=len(successful_sends))
         return successful_sends, failed_sends
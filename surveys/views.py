@@ -2,37 +2,68 @@ from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.core.paginator import Paginator
-from django.db.models import Q, Count, Avg, Max
-from django.http import JsonResponse, HttpResponse
+from django.db.models import Q, Count, Avg, Max, Sum, Exists, OuterRef
+from django.http import JsonResponse, HttpResponse, Http404, FileResponse
+from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from django.core.mail import send_mail
 from django.conf import settings
 from django.utils import timezone
 from datetime import datetime, timedelta
+from decimal import Decimal, InvalidOperation
 import json
 import secrets
 from django.urls import reverse_lazy, reverse
 from django.http import HttpResponseForbidden
-from .models import Survey, Question, SurveyResponse, Answer, QuestionChoice, SurveyTemplate, SurveyInvitation, SurveySendLog
-from .forms import SurveyForm, QuestionForm, ChoiceForm, SurveyTemplateForm, FlexibleSurveyForm, FlexibleQuestionForm, NewSurveyForm, NewQuestionForm
+from django.db.models.functions import TruncDate
+from .models import Survey, Question, SurveyResponse, Answer, QuestionChoice, SurveyTemplate, SurveyInvitation, SurveySendLog, SurveySendLogDaily, SendCampaign, SurveySeries
+from .forms import SurveyForm, QuestionForm, ChoiceForm, SurveyTemplateForm, FlexibleSurveyForm, FlexibleQuestionForm, NewSurveyForm, NewQuestionForm, RecipientSegmentForm
 from graduates.models import Graduate
 from django.template.loader import render_to_string
 from .utils import SurveySender
+from .send_log import SendLogBuffer
+from .campaigns import create_campaign, start_campaign
+from .segments import RecipientSegment
+from .events import record_click, record_email_open, record_open, record_whatsapp_status
+from .counters import counter_totals, increment_counters
+from .crosstab import DIMENSIONS, CrossTab
+from .definitions import get_survey_definition
+from .exports import EXPORT_FORMATS, write_csv, write_pdf, write_xlsx
+from .funnel import InvitationFunnel
+from .results import SurveyResults, response_summary
+from .search import ResponseSearch
+from .snapshots import get_snapshot, load_payload
+from .statistics import get_numeric_statistics
+from .submissions import (
+    SubmissionWriter, buffered_submissions_enabled, delete_responses, is_completed, stage_submission,
+    submission_metrics,
+)
+from .text_analytics import TextAnalytics
+from .tokens import read_invitation_token
+from .tracking import TRACKING_PIXEL
+from .waves import WaveComparison, add_wave, remove_wave
+from .webhooks import parse_statuses, verify_signature
 from django.utils.html import strip_tags
+from django.core.exceptions import ValidationError
 import secrets
 
+SUBMISSION_INVALID_MESSAGE = 'يرجى التحقق من الإجابات: هناك أسئلة مطلوبة لم تتم الإجابة عليها أو إجابات غير صحيحة.'
+
 @login_required
 def surveys_home(request):
     """صفحة إدارة الاستبيانات الرئيسية"""
-    total_surveys = Survey.objects.count()
-    active_surveys = Survey.objects.filter(status='active').count()
-    total_responses = SurveyResponse.objects.count()
-    sent_surveys = Survey.objects.filter(responses__isnull=False).distinct().count()
-    pending_surveys = Survey.objects.filter(status='active', responses__isnull=True).distinct().count()
-    
-    # حساب معدل الاستجابة
-    total_sent = SurveyInvitation.objects.filter(status='sent').count()
-    response_rate = round((total_responses / total_sent * 100) if total_sent > 0 else 0, 1)
+    # الإحصائيات من عدادات الاستبيانات في استعلام تجميع واحد
+    totals = counter_totals(
+        active=Count('id', filter=Q(status='active')),
+        answered=Count('id', filter=Q(responses_received__gt=0)),
+        pending=Count('id', filter=Q(status='active', responses_received=0)),
+    )
+    total_surveys = totals['surveys']
+    active_surveys = totals['active']
+    total_responses = totals['responses_received']
+    sent_surveys = totals['answered']
+    pending_surveys = totals['pending']
+    response_rate = totals['response_rate']
     
     context = {
         'total_surveys': total_surveys,
@@ -41,13 +72,14 @@ def surveys_home(request):
         'sent_surveys': sent_surveys,
         'pending_surveys': pending_surveys,
         'response_rate': response_rate,
+        'open_rate': totals['open_rate'],
     }
     return render(request, 'surveys/surveys_home.html', context)
 
 @login_required
 def survey_list(request):
     """قائمة الاستبيانات"""
-    surveys = Survey.objects.all().order_by('-created_at')
+    surveys = Survey.objects.annotate(question_count=Count('questions')).order_by('-created_at')
     
     # البحث
     search_query = request.GET.get('search')
@@ -299,121 +331,134 @@ def survey_delete(request, pk):
 @login_required
 def send_survey_select(request, pk):
     survey = get_object_or_404(Survey, pk=pk)
-    graduates = Graduate.objects.filter(is_active=True).order_by('first_name')
+    segment_form = RecipientSegmentForm(request.POST or None)
 
-    if request.method == 'POST':
-        graduate_ids = request.POST.getlist('graduates')
-        if not graduate_ids:
+    if request.method == 'POST' and segment_form.is_valid():
+        campaign = _create_segment_campaign(request, survey, segment_form)
+        if campaign is None:
             messages.error(request, 'يرجى تحديد خريج واحد على الأقل.')
             return redirect('surveys:send_survey_select', pk=pk)
 
-        selected_graduates = Graduate.objects.filter(id__in=graduate_ids)
-        success_count = 0
-        fail_count = 0
-
-        for graduate in selected_graduates:
-            if graduate.email:
-                try:
-                    # Create a unique invitation token
-                    invitation, created = SurveyInvitation.objects.get_or_create(
-                        survey=survey,
-                        graduate=graduate,
-                        defaults={'token': secrets.token_urlsafe(20)}
-                    )
-
-                    # Generate the survey link
-                    survey_link = request.build_absolute_uri(
-                        reverse('surveys:take_survey_by_token', kwargs={'token': invitation.token})
-                    )
-
-                    # Email subject and content
-                    subject = f'دعوة للمشاركة في استبيان: {survey.title}'
-                    html_message = render_to_string('surveys/survey_email_template.html', {
-                        'survey_title': survey.title,
-                        'graduate_name': graduate.full_name,
-                        'survey_link': survey_link,
-                        'survey_description': survey.description
-                    })
-                    plain_message = strip_tags(html_message)
-
-                    send_mail(
-                        subject,
-                        plain_message,
-                        settings.DEFAULT_FROM_EMAIL,
-                        [graduate.email],
-                        html_message=html_message,
-                        fail_silently=False,
-                    )
-
-                    invitation.status = 'sent'
-                    invitation.sent_at = timezone.now()
-                    invitation.save()
-                    success_count += 1
-                    SurveySendLog.objects.create(survey=survey, graduate=graduate, status='success', channel='email')
-                except Exception as e:
-                    fail_count += 1
-                    SurveySendLog.objects.create(survey=survey, graduate=graduate, status='failed', channel='email', details=str(e))
-            else:
-                fail_count += 1
-                SurveySendLog.objects.create(survey=survey, graduate=graduate, status='failed', channel='email', details='No email address')
-
-        if success_count > 0:
-            messages.success(request, f'تم إرسال الاستبيان بنجاح إلى {success_count} خريج عبر البريد الإلكتروني.')
-        if fail_count > 0:
-            messages.warning(request, f'فشل إرسال الاستبيان إلى {fail_count} خريج لعدم وجود بريد إلكتروني أو خطأ في الإرسال.')
-
+        start_campaign(campaign)
+        messages.info(request, 'بدأ إرسال الاستبيان، يمكنك متابعة التقدم من صفحة الاستبيان.')
         return redirect('surveys:detail', pk=survey.pk)
 
     return render(request, 'surveys/send_survey_select.html', {
         'survey': survey,
-        'graduates': graduates
+        'segment_form': segment_form
     })
 
+def _accepts_responses(survey):
+    """الاستبيان (من التعريف المحفوظ) نشط ولم ينته موعده"""
+    return survey['status'] == 'active' and not (survey['end_date'] and survey['end_date'] < timezone.now())
+
+def _survey_unavailable(request, survey):
+    messages.error(request, 'هذا الاستبيان غير متاح حالياً.')
+    return render(request, 'surveys/survey_unavailable.html', {'survey': survey})
+
 def take_survey_by_token(request, invitation_token):
-    invitation = get_object_or_404(SurveyInvitation, invitation_token=invitation_token)
-    survey = invitation.survey
+    """
+    صفحة الاستبيان من رابط الدعوة. الرابط الموقع يحمل معرّف الاستبيان والخريج
+    فلا يحتاج عرض الصفحة إلى استعلام الدعوة (يكفي التحقق من الإكمال باستعلام
+    مفهرس واحد)، ويُسجل الفتح في مخزن الأحداث ليُطبق على الدعوات دفعة واحدة.
+    روابط الدعوات القديمة ما زالت مقبولة.
+    """
+    signed = read_invitation_token(invitation_token)
+    if signed:
+        survey_id, graduate_id = signed
+    else:
+        invitation = get_object_or_404(SurveyInvitation, invitation_token=invitation_token)
+        survey_id, graduate_id = invitation.survey_id, invitation.graduate_id
+
+    survey = get_survey_definition(survey_id)
+    if survey is None:
+        raise Http404
 
     # التحقق من صلاحية الاستبيان والدعوة
-    if survey.status != 'active' or (survey.end_date and survey.end_date < timezone.now()):
-        messages.error(request, 'هذا الاستبيان غير متاح حالياً.')
-        return render(request, 'surveys/survey_unavailable.html', {'survey': survey})
+    if not _accepts_responses(survey):
+        return _survey_unavailable(request, survey)
 
-    if invitation.status == 'completed':
+    if is_completed(survey_id, graduate_id):
         messages.info(request, 'لقد قمت بإكمال هذا الاستبيان مسبقاً. شكراً لمشاركتك.')
         return render(request, 'surveys/survey_unavailable.html', {'survey': survey})
 
-    # تحديث حالة الدعوة إلى 'تم الفتح'
-    if invitation.status == 'sent':
-        invitation.status = 'opened'
-        invitation.opened_at = timezone.now()
-        invitation.save()
-
     if request.method == 'POST':
-        response, created = SurveyResponse.objects.get_or_create(
-            survey=survey,
-            graduate=invitation.graduate
-        )
-
-        for question in survey.questions.all():
-            answer_value = request.POST.get(f'question_{question.pk}')
-            if answer_value:
-                Answer.objects.update_or_create(
-                    response=response,
-                    question=question,
-                    defaults={'text_answer': answer_value}
-                )
-
-        response.is_complete = True
-        response.save()
-
+        invitation = get_object_or_404(SurveyInvitation, survey_id=survey_id, graduate_id=graduate_id)
+        if invitation.status == 'completed':
+            messages.info(request, 'لقد قمت بإكمال هذا الاستبيان مسبقاً. شكراً لمشاركتك.')
+            return render(request, 'surveys/survey_unavailable.html', {'survey': survey})
+
+        writer = SubmissionWriter(survey_id, definition=survey)
+        try:
+            answers = writer.validate(request.POST)
+        except ValidationError:
+            messages.error(request, SUBMISSION_INVALID_MESSAGE)
+            return render(request, 'surveys/take_survey.html', {'survey': survey, 'questions': survey['questions']})
+        writer.write(answers, graduate_id=graduate_id)
+
+        now = timezone.now()
+        if invitation.opened_at is None:
+            increment_counters(survey_id, opened_count=1)
         invitation.status = 'completed'
-        invitation.completed_at = timezone.now()
-        invitation.save()
+        invitation.opened_at = invitation.opened_at or now
+        invitation.completed_at = now
+        invitation.save(update_fields=['status', 'opened_at', 'completed_at'])
 
         messages.success(request, 'شكراً لك! تم إرسال إجاباتك بنجاح.')
-        return redirect('surveys:thank_you', pk=survey.pk)
-
-    return render(request, 'surveys/take_survey.html', {'survey': survey, 'questions': survey.questions.all().order_by('order')})
+        return redirect('surveys:thank_you', pk=survey_id)
+
+    # تسجيل الفتح في المخزن بدلاً من تحديث الدعوة في كل طلب
+    record_open(survey_id, graduate_id)
+
+    return render(request, 'surveys/take_survey.html', {'survey': survey, 'questions': survey['questions']})
+
+
+def track_open(request, token):
+    """صورة تتبع فتح رسالة البريد: تسجل الحدث في المخزن دون قاعدة البيانات"""
+    signed = read_invitation_token(token)
+    if signed:
+        record_email_open(*signed)
+    response = HttpResponse(TRACKING_PIXEL, content_type='image/gif')
+    response['Cache-Control'] = 'no-store, no-cache, must-revalidate, private'
+    return response
+
+
+def track_click(request, token):
+    """تتبع الضغط على رابط البريد ثم التحويل إلى صفحة الاستبيان"""
+    signed = read_invitation_token(token)
+    if signed is None:
+        raise Http404
+    record_click(*signed)
+    return redirect('surveys:take_survey_by_token', invitation_token=token)
+
+
+@csrf_exempt
+@require_http_methods(["GET", "POST"])
+def whatsapp_webhook(request):
+    """
+    استقبال إشعارات حالة رسائل الواتساب. يُتحقق من التوقيع ثم تُسجل الحالات
+    في مخزن الأحداث ويُرد فوراً، ويطبقها الأمر flush_survey_events دفعة واحدة.
+    """
+    if request.method == 'GET':
+        # تأكيد الاشتراك عند تسجيل الـ webhook في لوحة Meta
+        verify_token = getattr(settings, 'WHATSAPP_VERIFY_TOKEN', '')
+        if (
+            verify_token and request.GET.get('hub.mode') == 'subscribe'
+            and request.GET.get('hub.verify_token') == verify_token
+        ):
+            return HttpResponse(request.GET.get('hub.challenge', ''))
+        return HttpResponseForbidden()
+
+    if not verify_signature(request.body, request.headers.get('X-Hub-Signature-256', '')):
+        return HttpResponseForbidden()
+    try:
+        payload = json.loads(request.body)
+    except ValueError:
+        return HttpResponse(status=400)
+
+    for status in parse_statuses(payload):
+        record_whatsapp_status(*status)
+    return HttpResponse('OK')
 
 
 @login_required
@@ -484,31 +529,22 @@ def send_survey(request, pk=None):
 @login_required
 def take_survey(request, pk):
     """ملء الاستبيان"""
-    survey = get_object_or_404(Survey, pk=pk)
+    survey = get_survey_definition(pk)
+    if survey is None:
+        raise Http404
     
     if request.method == 'POST':
-        # حفظ الاستجابة
-        response = SurveyResponse.objects.create(
-            survey=survey,
-            respondent_name=request.POST.get('respondent_name', ''),
-            respondent_email=request.POST.get('respondent_email', ''),
-            submitted_at=timezone.now()
-        )
-        
-        # حفظ الإجابات
-        for question in survey.questions.all():
-            answer_text = request.POST.get(f'question_{question.id}')
-            if answer_text:
-                Answer.objects.create(
-                    response=response,
-                    question=question,
-                    text_answer=answer_text
-                )
-        
-        messages.success(request, 'تم إرسال الاستبيان بنجاح!')
-        return redirect('surveys:thank_you', pk=survey.pk)
+        writer = SubmissionWriter(pk, definition=survey)
+        try:
+            answers = writer.validate(request.POST)
+        except ValidationError:
+            messages.error(request, SUBMISSION_INVALID_MESSAGE)
+        else:
+            writer.write(answers)
+            messages.success(request, 'تم إرسال الاستبيان بنجاح!')
+            return redirect('surveys:thank_you', pk=pk)
     
-    return render(request, 'surveys/take_survey.html', {'survey': survey})
+    return render(request, 'surveys/take_survey.html', {'survey': survey, 'questions': survey['questions']})
 
 @login_required
 def survey_thank_you(request, pk):
@@ -519,65 +555,70 @@ def survey_thank_you(request, pk):
 @login_required
 def survey_results(request, pk):
     """نتائج الاستبيان"""
-    survey = get_object_or_404(Survey, pk=pk)
-    responses = survey.responses.all().order_by('-submitted_at')
-    
-    # إحصائيات عامة
-    total_responses = responses.count()
-    questions = survey.questions.all()
-    
-    # تحليل الإجابات لكل سؤال
-    question_analysis = []
-    for question in questions:
-        answers = Answer.objects.filter(question=question)
-        if question.question_type == 'multiple_choice':
-            choice_counts = {}
-            for choice in question.choices.all():
-                count = answers.filter(text_answer=choice.text).count()
-                choice_counts[choice.text] = count
-            question_analysis.append({
-                'question': question,
-                'type': 'multiple_choice',
-                'choice_counts': choice_counts,
-                'total_answers': answers.count()
-            })
-        else:
-            question_analysis.append({
-                'question': question,
-                'type': 'text',
-                'answers': answers[:10],  # أول 10 إجابات فقط
-                'total_answers': answers.count()
-            })
+    definition = get_survey_definition(pk)
+    if definition is None:
+        raise Http404
+    
+    # الاستبيان المغلق يُعرض من لقطته المجمدة، وإلا تحليل الإجابات باستعلامات مجمعة
+    snapshot = get_snapshot(pk)
+    if snapshot:
+        results = load_payload(snapshot)['results']
+    else:
+        results = SurveyResults(pk, definition=definition).build()
     
     context = {
-        'survey': survey,
-        'responses': responses,
-        'total_responses': total_responses,
-        'question_analysis': question_analysis,
+        'survey': definition,
+        'total_responses': results['total_responses'],
+        'question_analysis': results['questions'],
+        'snapshot': snapshot,
     }
     return render(request, 'surveys/survey_results.html', context)
 
+@login_required
+@require_http_methods(["GET"])
+def survey_export(request, pk, format_type):
+    """تصدير استجابات الاستبيان ونتائجه (من ملفات اللقطة للاستبيان المغلق)"""
+    if format_type not in EXPORT_FORMATS:
+        raise Http404
+    content_type, extension = EXPORT_FORMATS[format_type]
+    filename = f'survey_{pk}_results.{extension}'
+
+    snapshot = get_snapshot(pk)
+    file = getattr(snapshot, f'{format_type}_file', None)
+    if file:
+        return FileResponse(file.open('rb'), as_attachment=True, filename=filename, content_type=content_type)
+
+    definition = get_survey_definition(pk)
+    if definition is None:
+        raise Http404
+    response = HttpResponse(content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    if format_type == 'csv':
+        write_csv(pk, definition, response)
+    elif format_type == 'xlsx':
+        write_xlsx(pk, definition, SurveyResults(pk, definition=definition).build(), response)
+    else:
+        write_pdf(definition, SurveyResults(pk, definition=definition).build(), response)
+    return response
+
 @login_required
 def survey_analytics(request):
     """تحليلات الاستبيانات"""
-    surveys = Survey.objects.all()
-    total_surveys = surveys.count()
-    total_responses = SurveyResponse.objects.count()
-    
-    # إحصائيات الاستبيانات النشطة
-    active_surveys = surveys.filter(status='active')
-    active_responses = SurveyResponse.objects.filter(survey__status='active').count()
-    
-    # معدل الاستجابة
-    total_invitations = SurveyInvitation.objects.filter(status='sent').count()
-    response_rate = round((total_responses / total_invitations * 100) if total_invitations > 0 else 0, 1)
+    totals = counter_totals(
+        active=Count('id', filter=Q(status='active')),
+        active_responses=Sum('responses_received', filter=Q(status='active')),
+    )
+    top_surveys = Survey.objects.filter(responses_received__gt=0).order_by('-responses_received')[:10]
     
     context = {
-        'total_surveys': total_surveys,
-        'total_responses': total_responses,
-        'active_surveys': active_surveys.count(),
-        'active_responses': active_responses,
-        'response_rate': response_rate,
+        'total_surveys': totals['surveys'],
+        'total_responses': totals['responses_received'],
+        'active_surveys': totals['active'],
+        'active_responses': totals['active_responses'] or 0,
+        'response_rate': totals['response_rate'],
+        'avg_response_rate': totals['response_rate'],
+        'open_rate': totals['open_rate'],
+        'top_surveys': top_surveys,
     }
     return render(request, 'surveys/survey_analytics.html', context)
 
@@ -593,65 +634,239 @@ def api_survey_chart_data(request, pk):
     """API للحصول على بيانات الرسوم البيانية للاستبيان"""
     survey = get_object_or_404(Survey, pk=pk)
     
-    # بيانات الاستجابة عبر الزمن
-    responses = survey.responses.all()
-    dates = []
-    counts = []
+    # بيانات الاستجابة عبر الزمن (آخر 7 أيام) في استعلام مجمع واحد
+    today = timezone.localdate()
+    first_day = today - timedelta(days=6)
+    per_day = dict(
+        survey.responses.filter(submitted_at__date__gte=first_day)
+        .annotate(day=TruncDate('submitted_at')).order_by()
+        .values('day').annotate(count=Count('id')).values_list('day', 'count')
+    )
+    dates = [first_day + timedelta(days=i) for i in range(7)]
     
-    for i in range(7):  # آخر 7 أيام
-        date = timezone.now().date() - timedelta(days=i)
-        count = responses.filter(submitted_at__date=date).count()
-        dates.append(date.strftime('%Y-%m-%d'))
-        counts.append(count)
+    # توزيع الإجابات لكل سؤال من عدادات الأسئلة
+    results = SurveyResults(pk).build()
     
     data = {
-        'dates': list(reversed(dates)),
-        'counts': list(reversed(counts)),
-        'total_responses': responses.count(),
+        'dates': [day.strftime('%Y-%m-%d') for day in dates],
+        'counts': [per_day.get(day, 0) for day in dates],
+        'total_responses': survey.responses_received,
+        'questions': [
+            {
+                'id': question['question_id'],
+                'text': question['question_text'],
+                'type': question['question_type'],
+                'answered': question['total_responses'],
+                'labels': [choice['label'] for choice in question['choices_data']],
+                'counts': [choice['count'] for choice in question['choices_data']],
+                'average': question.get('average'),
+            }
+            for question in results['questions']
+        ],
     }
     
     return JsonResponse(data)
 
+@login_required
+@require_http_methods(["GET"])
+def survey_crosstab(request, pk):
+    """
+    API لتوزيع إجابات سؤال حسب صفة أو صفتين من صفات الخريجين.
+    المعاملات: question، dimensions (مفصولة بفواصل)، وأي صفة كمرشح مثل college=...
+    """
+    question_id = request.GET.get('question', '')
+    dimensions = [name for name in request.GET.get('dimensions', '').split(',') if name]
+    filters = {name: request.GET[name] for name in DIMENSIONS if name in request.GET}
+    try:
+        crosstab = CrossTab(pk, int(question_id) if question_id.isdigit() else None, dimensions, filters)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    return JsonResponse(crosstab.build())
+
+@login_required
+@require_http_methods(["GET"])
+def survey_text_analytics(request, pk):
+    """
+    API لتحليل إجابات سؤال نصي: أكثر الكلمات والعبارات ومجموعات الإجابات المتقاربة.
+    المعاملات: question، وأي صفة من صفات الخريج كمرشح مثل college=...
+    """
+    question_id = request.GET.get('question', '')
+    filters = {name: request.GET[name] for name in DIMENSIONS if name in request.GET}
+    try:
+        analytics = TextAnalytics(pk, int(question_id) if question_id.isdigit() else None, filters)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    return JsonResponse(analytics.build())
+
+@login_required
+@require_http_methods(["GET"])
+def response_search(request):
+    """
+    البحث في إجابات جميع الاستبيانات للموظفين. المعاملات: q (العبارات بين
+    علامتي تنصيص)، survey، question، choice (يمكن تكراره)، number_question
+    مع number_min وnumber_max، وأي صفة من صفات الخريج مثل college=...
+    """
+    def number(name):
+        value = request.GET.get(name, '').strip()
+        try:
+            return Decimal(value) if value else None
+        except InvalidOperation:
+            raise ValueError('قيمة رقمية غير صحيحة')
+
+    def identifier(name):
+        value = request.GET.get(name, '')
+        return int(value) if value.isdigit() else None
+
+    query = request.GET.get('q', '').strip()
+    filters = {name: request.GET[name] for name in DIMENSIONS if name in request.GET}
+    page_obj = error = None
+    if query:
+        try:
+            search = ResponseSearch(
+                query,
+                survey_id=identifier('survey'),
+                question_id=identifier('question'),
+                filters=filters,
+                choice_ids=[int(value) for value in request.GET.getlist('choice') if value.isdigit()],
+                number_question_id=identifier('number_question'),
+                number_min=number('number_min'),
+                number_max=number('number_max'),
+            )
+            page_obj = search.page(request.GET.get('page'))
+        except ValueError as e:
+            error = str(e)
+
+    params = request.GET.copy()
+    params.pop('page', None)
+    context = {
+        'query': query,
+        'page_obj': page_obj,
+        'error': error,
+        'surveys': Survey.objects.order_by('-created_at').values('id', 'title'),
+        'selected_survey': identifier('survey'),
+        'dimensions': [(name, label, filters.get(name, '')) for name, (field, label) in DIMENSIONS.items()],
+        'query_string': params.urlencode(),
+    }
+    return render(request, 'surveys/response_search.html', context)
+
+@login_required
+def survey_response_detail(request, pk):
+    """عرض استجابة واحدة بجميع إجاباتها"""
+    response = get_object_or_404(SurveyResponse.objects.select_related('survey', 'graduate'), pk=pk)
+    answers = (
+        response.answers.select_related('question').prefetch_related('selected_choices')
+        .order_by('question__order', 'question_id')
+    )
+    return render(request, 'surveys/survey_response_detail.html', {
+        'response': response,
+        'survey': response.survey,
+        'answers': answers,
+    })
+
+@login_required
+@require_http_methods(["GET"])
+def survey_funnel(request, pk):
+    """
+    API لمسار دعوات الاستبيان (إرسال ← فتح ← إكمال) حسب القناة.
+    المعاملات: dimension (صفة خريج اختيارية للتقسيم)، وأي صفة كمرشح مثل college=...
+    """
+    filters = {name: request.GET[name] for name in DIMENSIONS if name in request.GET}
+    try:
+        funnel = InvitationFunnel(pk, request.GET.get('dimension'), filters)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    return JsonResponse(funnel.build())
+
+@login_required
+def series_list(request):
+    """سلاسل الاستبيانات المتكررة وإنشاء سلسلة جديدة"""
+    if request.method == 'POST':
+        title = request.POST.get('title', '').strip()
+        if title:
+            series = SurveySeries.objects.create(
+                title=title,
+                description=request.POST.get('description', ''),
+                template_name=request.POST.get('template_name', ''),
+                created_by=request.user,
+            )
+            messages.success(request, 'تم إنشاء السلسلة بنجاح!')
+            return redirect('surveys:series_detail', pk=series.pk)
+        messages.error(request, 'يجب إدخال عنوان السلسلة')
+    series = SurveySeries.objects.annotate(wave_count=Count('waves', distinct=True)).order_by('-created_at')
+    return render(request, 'surveys/series_list.html', {'series_list': series})
+
+@login_required
+def series_detail(request, pk):
+    """مقارنة موجات السلسلة، وإضافة استبيان كموجة جديدة أو فصله"""
+    series = get_object_or_404(SurveySeries, pk=pk)
+    if request.method == 'POST':
+        survey = get_object_or_404(Survey, pk=request.POST.get('survey') or 0)
+        if request.POST.get('action') == 'remove':
+            if survey.series_id == series.pk:
+                remove_wave(survey)
+                messages.success(request, f'تم فصل "{survey.title}" عن السلسلة')
+        else:
+            matched, created = add_wave(series, survey, request.POST.get('wave_label', '').strip())
+            messages.success(
+                request, f'تمت إضافة الموجة: {matched} سؤال مطابق و{created} سؤال جديد في السلسلة'
+            )
+        return redirect('surveys:series_detail', pk=series.pk)
+
+    comparison = WaveComparison(pk).build()
+    context = {
+        'series': series,
+        'comparison': comparison,
+        'available_surveys': Survey.objects.exclude(series=series).order_by('-created_at').values('id', 'title'),
+    }
+    return render(request, 'surveys/series_detail.html', context)
+
+@login_required
+@require_http_methods(["GET"])
+def series_comparison(request, pk):
+    """API لمقارنة نتائج موجات السلسلة واتجاهاتها"""
+    try:
+        comparison = WaveComparison(pk)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=404)
+    return JsonResponse(comparison.build())
+
+@login_required
+@require_http_methods(["GET"])
+def survey_statistics(request, pk):
+    """API لإحصائيات أسئلة التقييم والأسئلة الرقمية"""
+    statistics = get_numeric_statistics(pk)
+    if statistics is None:
+        raise Http404
+    return JsonResponse({'survey_id': pk, 'questions': {str(key): value for key, value in statistics.items()}})
+
 @login_required
 def survey_analytics_detail(request, pk):
     """تفاصيل تحليلات الاستبيان"""
     survey = get_object_or_404(Survey, pk=pk)
-    responses = survey.responses.all()
-    
-    # إحصائيات مفصلة
-    total_responses = responses.count()
-    questions = survey.questions.all()
-    
-    # تحليل الإجابات
-    question_stats = []
-    for question in questions:
-        answers = Answer.objects.filter(question=question)
-        if question.question_type == 'multiple_choice':
-            choice_stats = []
-            for choice in question.choices.all():
-                count = answers.filter(text_answer=choice.text).count()
-                percentage = round((count / total_responses * 100) if total_responses > 0 else 0, 1)
-                choice_stats.append({
-                    'choice': choice.text,
-                    'count': count,
-                    'percentage': percentage
-                })
-            question_stats.append({
-                'question': question,
-                'type': 'multiple_choice',
-                'choices': choice_stats
-            })
-        else:
-            question_stats.append({
-                'question': question,
-                'type': 'text',
-                'answer_count': answers.count()
-            })
+    
+    # الاستبيان المغلق يُعرض من لقطته المجمدة، وإلا تُحسب التجميعات مباشرة
+    snapshot = get_snapshot(pk)
+    if snapshot:
+        payload = load_payload(snapshot)
+        summary, results, statistics, funnel = (
+            payload['summary'], payload['results'], payload['statistics'], payload['funnel'],
+        )
+    else:
+        summary = response_summary(pk)
+        results = SurveyResults(pk).build()
+        statistics = get_numeric_statistics(pk)
+        funnel = InvitationFunnel(pk).build()
+    for question in results['questions']:
+        question['statistics'] = statistics.get(question['question_id'])
     
     context = {
         'survey': survey,
-        'total_responses': total_responses,
-        'question_stats': question_stats,
+        **summary,
+        'average_completion_time': '-',
+        'questions_analysis': results['questions'],
+        'funnel': funnel,
+        'snapshot': snapshot,
+        'recent_responses': survey.responses.select_related('graduate').order_by('-submitted_at')[:10],
     }
     return render(request, 'surveys/survey_analytics_detail.html', context)
 
@@ -908,9 +1123,8 @@ def export_survey_responses(survey, surveyresponses, format_type):
 def bulk_delete_responses(request):
     """حذف جماعي للاستجابات"""
     if request.method == 'POST':
-        response_ids = request.POST.getlist('response_ids')
-        SurveyResponse.objects.filter(id__in=response_ids).delete()
-        messages.success(request, f'تم حذف {len(response_ids)} استجابة بنجاح!')
+        deleted = delete_responses(request.POST.getlist('response_ids'))
+        messages.success(request, f'تم حذف {deleted} استجابة بنجاح!')
     return redirect('surveys:list')
 
 @login_required
@@ -919,7 +1133,7 @@ def delete_response(request):
     if request.method == 'POST':
         response_id = request.POST.get('response_id')
         response = get_object_or_404(SurveyResponse, id=response_id)
-        response.delete()
+        delete_responses([response.pk])
         messages.success(request, 'تم حذف الاستجابة بنجاح!')
     return redirect('surveys:list')
 
@@ -933,117 +1147,157 @@ def get_graduates(request):
         graduates = graduates.filter(college__icontains=college)
     
     data = [{'id': g.id, 'name': g.full_name, 'email': g.email} for g in graduates]
+    return JsonResponse({'graduates': data})
+
+@login_required
 def send_survey_bulk(request):
     """إرسال جماعي للاستبيانات"""
-    if request.method == 'POST':
+    segment_form = RecipientSegmentForm(request.POST or None)
+    if request.method == 'POST' and segment_form.is_valid():
         survey_id = request.POST.get('survey_id')
-        graduate_ids = request.POST.getlist('graduate_ids')
-        
         survey = get_object_or_404(Survey, id=survey_id)
-        graduates = Graduate.objects.filter(id__in=graduate_ids)
         
-        success_count = 0
-        fail_count = 0
-
-        for graduate in graduates:
-            if graduate.email:
-                try:
-                    # Create a unique invitation token
-                    invitation, created = SurveyInvitation.objects.get_or_create(
-                        survey=survey,
-                        graduate=graduate,
-                        defaults={'token': secrets.token_urlsafe(20)}
-                    )
-
-                    # Generate the survey link
-                    survey_link = request.build_absolute_uri(
-                        reverse('surveys:take_survey_by_token', kwargs={'token': invitation.token})
-                    )
-
-                    # Email subject and content
-                    subject = f'دعوة للمشاركة في استبيان: {survey.title}'
-                    html_message = render_to_string('surveys/survey_email_template.html', {
-                        'survey_title': survey.title,
-                        'graduate_name': graduate.full_name,
-                        'survey_link': survey_link,
-                        'survey_description': survey.description
-                    })
-                    plain_message = strip_tags(html_message)
-
-                    send_mail(
-                        subject,
-                        plain_message,
-                        settings.DEFAULT_FROM_EMAIL,
-                        [graduate.email],
-                        html_message=html_message,
-                        fail_silently=False,
-                    )
-
-                    invitation.status = 'sent'
-                    invitation.sent_at = timezone.now()
-                    invitation.save()
-                    success_count += 1
-                    SurveySendLog.objects.create(survey=survey, graduate=graduate, status='success', channel='email')
-                except Exception as e:
-                    fail_count += 1
-                    SurveySendLog.objects.create(survey=survey, graduate=graduate, status='failed', channel='email', details=str(e))
-            else:
-                fail_count += 1
-                SurveySendLog.objects.create(survey=survey, graduate=graduate, status='failed', channel='email', details='No email address')
-
-        if success_count > 0:
-            messages.success(request, f'تم إرسال الاستبيان بنجاح إلى {success_count} خريج عبر البريد الإلكتروني.')
-        if fail_count > 0:
-            messages.warning(request, f'فشل إرسال الاستبيان إلى {fail_count} خريج لعدم وجود بريد إلكتروني أو خطأ في الإرسال.')
-
-        return redirect('surveys:detail', pk=survey.pk)
+        campaign = _create_segment_campaign(request, survey, segment_form)
+        if campaign is None:
+            messages.error(request, 'يرجى تحديد خريج واحد على الأقل.')
+        else:
+            start_campaign(campaign)
+            messages.info(request, 'بدأ إرسال الاستبيان، يمكنك متابعة التقدم من صفحة الاستبيان.')
+            return redirect('surveys:detail', pk=survey.pk)
     
     surveys = Survey.objects.filter(status='active')
-    graduates = Graduate.objects.filter(is_active=True)
     
     return render(request, 'surveys/send_survey_bulk.html', {
         'surveys': surveys,
-        'graduates': graduates
+        'segment_form': segment_form
     })
 
+def _create_segment_campaign(request, survey, segment_form):
+    """
+    إنشاء حملة إرسال من الشريحة كاملة (تُحل على الخادم عند التشغيل)
+    أو من خريجين محددين يدوياً داخل الشريحة.
+    """
+    segment = RecipientSegment(segment_form.cleaned_data)
+    if request.POST.get('select_all') == '1':
+        return create_campaign(survey, user=request.user, segment=segment)
+
+    graduate_ids = request.POST.getlist('graduates')
+    if not graduate_ids:
+        return None
+    return create_campaign(survey, segment.queryset().filter(id__in=graduate_ids), user=request.user)
+
+@login_required
+@require_http_methods(["GET"])
+def segment_preview(request):
+    """API لمعاينة عدد الشريحة وصفحة من الخريجين المطابقين (تقسيم بالمفتاح)"""
+    segment_form = RecipientSegmentForm(request.GET)
+    if not segment_form.is_valid():
+        return JsonResponse({'errors': segment_form.errors}, status=400)
+    
+    segment = RecipientSegment(segment_form.cleaned_data)
+    after = request.GET.get('after', '')
+    after = int(after) if after.isdigit() else 0
+    page_size = 50
+    graduates = segment.page(after=after, size=page_size)
+    
+    data = {
+        'graduates': [
+            {
+                'id': g['pk'],
+                'name': f"{g['first_name']} {g['last_name']}",
+                'email': g['email'],
+                'college': g['college'],
+            }
+            for g in graduates
+        ],
+        'next_after': graduates[-1]['pk'] if len(graduates) == page_size else None,
+    }
+    # العدد يُحسب مع الصفحة الأولى فقط
+    if not after:
+        data['count'] = segment.count()
+    return JsonResponse(data)
+
+@login_required
+@require_http_methods(["GET"])
+def campaign_progress(request, pk):
+    """API خفيفة لمتابعة تقدم حملة الإرسال (قراءة صف واحد دون عدّ السجلات)"""
+    campaign = get_object_or_404(SendCampaign, pk=pk)
+    return JsonResponse(campaign.get_progress())
+
 @login_required
 def send_survey_logs(request, survey_id):
-    """سجلات إرسال الاستبيان"""
+    """سجلات إرسال الاستبيان: ملخصات يومية مع السجلات التفصيلية مقسمة بالمفتاح"""
     survey = get_object_or_404(Survey, pk=survey_id)
-    logs = SurveySendLog.objects.filter(survey=survey).order_by('-sent_at')
-    
-    return render(request, 'surveys/send_survey_logs.html', {
+    page_size = 50
+
+    # الملخصات اليومية للأيام التي تم تلخيصها
+    rollups = list(SurveySendLogDaily.objects.filter(survey=survey))
+    last_rolled_day = max((r.day for r in rollups), default=None)
+
+    # السجلات التي لم تدخل في الملخص بعد تُحسب مباشرة
+    recent_logs = SurveySendLog.objects.filter(survey=survey)
+    if last_rolled_day:
+        recent_logs = recent_logs.filter(sent_at__date__gt=last_rolled_day)
+    status_counts = {row['status']: row['count'] for row in recent_logs.values('status').annotate(count=Count('id')).order_by()}
+    for rollup in rollups:
+        status_counts[rollup.status] = status_counts.get(rollup.status, 0) + rollup.count
+
+    # تقسيم بالمفتاح (keyset) على المعرّف بدلاً من OFFSET
+    logs = SurveySendLog.objects.filter(survey=survey).select_related('graduate').annotate(
+        has_responded=Exists(SurveyResponse.objects.filter(survey=survey, graduate=OuterRef('graduate')))
+    ).order_by('-id')
+    before = request.GET.get('before')
+    if before and before.isdigit():
+        logs = logs.filter(id__lt=int(before))
+    logs = list(logs[:page_size + 1])
+    next_before = logs[page_size - 1].id if len(logs) > page_size else None
+    logs = logs[:page_size]
+
+    return render(request, 'surveys/send_logs.html', {
         'survey': survey,
-        'logs': logs
+        'logs': logs,
+        'rollups': rollups,
+        'next_before': next_before,
+        'is_first_page': not before,
+        'total_sent': sum(status_counts.values()),
+        'successful_sent': sum(status_counts.get(s, 0) for s in ('sent', 'delivered', 'read')),
+        'failed_sent': status_counts.get('failed', 0),
     })
 
+def _save_public_submission(writer, answers):
+    """حفظ الاستجابة العامة مباشرة، أو في جدول الانتظار عند تفعيل الحفظ المؤجل"""
+    if buffered_submissions_enabled():
+        stage_submission(writer.survey_id, answers)
+    else:
+        writer.write(answers)
+
+
+@login_required
+def submission_metrics_view(request):
+    """مؤشرات جدول انتظار الاستجابات العامة (JSON)"""
+    return JsonResponse(submission_metrics())
+
+
 def take_survey_public(request, pk):
     """ملء الاستبيان للعامة (بدون تسجيل دخول)"""
-    survey = get_object_or_404(Survey, pk=pk)
+    survey = get_survey_definition(pk)
+    if survey is None:
+        raise Http404
+    if not _accepts_responses(survey):
+        return _survey_unavailable(request, survey)
     
     if request.method == 'POST':
-        # حفظ الاستجابة
-        response = SurveyResponse.objects.create(
-            survey=survey,
-            respondent_name=request.POST.get('respondent_name', ''),
-            respondent_email=request.POST.get('respondent_email', ''),
-            submitted_at=timezone.now()
-        )
-        
-        # حفظ الإجابات
-        for question in survey.questions.all():
-            answer_text = request.POST.get(f'question_{question.id}')
-            if answer_text:
-                Answer.objects.create(
-                    response=response,
-                    question=question,
-                    text_answer=answer_text
-                )
-        
-        messages.success(request, 'تم إرسال الاستبيان بنجاح!')
-        return redirect('surveys:thank_you_public', pk=survey.pk)
+        writer = SubmissionWriter(pk, definition=survey)
+        try:
+            answers = writer.validate(request.POST)
+        except ValidationError:
+            messages.error(request, SUBMISSION_INVALID_MESSAGE)
+        else:
+            _save_public_submission(writer, answers)
+            messages.success(request, 'تم إرسال الاستبيان بنجاح!')
+            return redirect('surveys:thank_you_public', pk=pk)
     
-    return render(request, 'surveys/take_survey_public.html', {'survey': survey})
+    return render(request, 'surveys/take_survey_public.html', {'survey': survey, 'questions': survey['questions']})
 
 def survey_thank_you_public(request, pk):
     """صفحة شكر للعامة"""
@@ -1089,13 +1343,14 @@ def survey_create_from_template(request, template_id):
 def new_surveys_home(request):
     """الصفحة الرئيسية الجديدة للاستبيانات"""
     surveys = Survey.objects.all().order_by('-created_at')[:10]
-    total_surveys = Survey.objects.count()
-    active_surveys = Survey.objects.filter(status='active').count()
+    totals = counter_totals(active=Count('id', filter=Q(status='active')))
     
     context = {
         'surveys': surveys,
-        'total_surveys': total_surveys,
-        'active_surveys': active_surveys,
+        'total_surveys': totals['surveys'],
+        'active_surveys': totals['active'],
+        'total_responses': totals['responses_received'],
+        'response_rate': totals['response_rate'],
     }
     return render(request, 'surveys/new_surveys_home.html', context)
 
@@ -1151,7 +1406,7 @@ def new_survey_created(request):
 @login_required
 def new_survey_list(request):
     """قائمة الاستبيانات (واجهة جديدة)"""
-    surveys = Survey.objects.all().order_by('-created_at')
+    surveys = Survey.objects.annotate(question_count=Count('questions')).order_by('-created_at')
     # البحث
     search_query = request.GET.get('search')
     if search_query:
@@ -1162,9 +1417,9 @@ def new_survey_list(request):
     # الفلترة حسب الحالة
     status_filter = request.GET.get('status')
     if status_filter == 'active':
-        surveys = surveys.filter(is_active=True)
+        surveys = surveys.filter(status='active')
     elif status_filter == 'inactive':
-        surveys = surveys.filter(is_active=False)
+        surveys = surveys.exclude(status='active')
     # التقسيم إلى صفحات
     paginator = Paginator(surveys, 12)
     page_number = request.GET.get('page')
@@ -1185,6 +1440,7 @@ def new_survey_detail(request, pk):
     context = {
         'survey': survey,
         'questions': questions,
+        'campaign': survey.campaigns.order_by('-created_at').first(),
     }
     return render(request, 'surveys/new_survey_detail.html', context)
 
@@ -1254,57 +1510,43 @@ def new_question_delete(request, survey_pk, question_pk):
 
 @login_required
 def new_survey_send(request, pk):
-    """إرسال الاستبيان للخريجين"""
+    """إرسال الاستبيان لشريحة من الخريجين"""
     survey = get_object_or_404(Survey, pk=pk)
-    graduates = Graduate.objects.filter(is_active=True)
-    
-    if request.method == 'POST':
-        selected_graduates = request.POST.getlist('graduates')
-        if selected_graduates:
-            selected_graduates = Graduate.objects.filter(id__in=selected_graduates)
-            
-            # إرسال الاستبيان
-            sender = SurveySender()
-            successful_sends, failed_sends = sender.send_invitations(survey, selected_graduates, request)
-            
-            if len(successful_sends) > 0:
-                messages.success(request, f'تم إرسال الاستبيان إلى {len(successful_sends)} خريج بنجاح!')
-
-            if len(failed_sends) > 0:
-                messages.warning(request, f'فشل في إرسال الاستبيان إلى {len(failed_sends)} خريج.')
-            
+    segment_form = RecipientSegmentForm(request.POST or None)
+    
+    if request.method == 'POST' and segment_form.is_valid():
+        # إنشاء حملة إرسال تعمل في الخلفية ومتابعة تقدمها من صفحة الاستبيان
+        campaign = _create_segment_campaign(request, survey, segment_form)
+        if campaign is not None:
+            start_campaign(campaign)
+            messages.info(request, 'بدأ إرسال الاستبيان، يمكنك متابعة التقدم من هذه الصفحة.')
             return redirect('surveys:detail', pk=survey.pk)
-        else:
-            messages.error(request, 'يرجى اختيار خريجين على الأقل.')
+        messages.error(request, 'يرجى اختيار خريجين على الأقل.')
     
     return render(request, 'surveys/new_survey_send.html', {
         'survey': survey,
-        'graduates': graduates
+        'segment_form': segment_form
     })
 
 def new_take_survey(request, pk):
     """أخذ الاستبيان (للخريجين)"""
-    survey = get_object_or_404(Survey, pk=pk)
-    questions = survey.questions.all().order_by('order')
+    survey = get_survey_definition(pk)
+    if survey is None:
+        raise Http404
+    if not _accepts_responses(survey):
+        return _survey_unavailable(request, survey)
+    questions = survey['questions']
     
     if request.method == 'POST':
-        # معالجة الإجابات
-        response = SurveyResponse.objects.create(
-            survey=survey,
-            graduate=None,  # للاستبيانات العامة
-            is_complete=True
-        )
-        
-        for question in questions:
-            answer_text = request.POST.get(f'question_{question.id}')
-            if answer_text:
-                Answer.objects.create(
-                    response=response,
-                    question=question,
-                    answer_text=answer_text
-                )
-        
-        return redirect('surveys:submit', pk=survey.pk)
+        # معالجة الإجابات (استجابة عامة بدون خريج)
+        writer = SubmissionWriter(pk, definition=survey)
+        try:
+            answers = writer.validate(request.POST)
+        except ValidationError:
+            messages.error(request, SUBMISSION_INVALID_MESSAGE)
+        else:
+            _save_public_submission(writer, answers)
+            return redirect('surveys:submit', pk=pk)
     
     return render(request, 'surveys/new_take_survey.html', {
         'survey': survey,
@@ -1349,9 +1591,10 @@ def send_select(request):
 @login_required
 def view_survey(request, pk):
     """عرض الاستبيان فقط بشكل جمالي وجذاب بدون أزرار تحكم"""
-    survey = get_object_or_404(Survey, pk=pk)
-    questions = survey.questions.all().order_by('order')
+    survey = get_survey_definition(pk)
+    if survey is None:
+        raise Http404
     return render(request, 'surveys/view_survey.html', {
         'survey': survey,
-        'questions': questions
+        'questions': survey['questions']
     }) 
\ No newline at end of file
@@ -0,0 +1,205 @@
+"""
+Survey Waves
+ربط الاستبيانات المتكررة (موجات) بسلسلة واحدة وتوحيد أسئلتها المتكافئة،
+ومقارنة النتائج بين الموجات من عدادات الأسئلة المحسوبة مسبقاً
+(QuestionTally) بدلاً من صفوف الإجابات
+"""
+
+import hashlib
+import re
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Max
+
+from .definitions import get_data_version
+from .models import Question, QuestionTally, SeriesQuestion, Survey, SurveySeries
+from .text_analytics import normalize
+
+WAVES_TIMEOUT = 60 * 60
+CHOICE_TYPES = ('radio', 'select', 'checkbox')
+NUMERIC_TYPES = ('number', 'rating')
+_WORD = re.compile(r'[^\W_]+')
+
+
+def text_key(text):
+    """مفتاح مقارنة النصوص بين الموجات: الكلمات المطبّعة دون علامات الترقيم"""
+    return ' '.join(_WORD.findall(normalize(text)))
+
+
+def add_wave(series, survey, label=''):
+    """
+    إضافة استبيان كموجة في السلسلة وربط أسئلته بأسئلة السلسلة المطابقة
+    في النص والنوع، مع إنشاء أسئلة سلسلة جديدة لما لا يطابق. الأسئلة
+    المربوطة مسبقاً بسؤال من نفس السلسلة لا تتغير.
+    يعيد (عدد الأسئلة المربوطة بأسئلة موجودة، عدد الأسئلة الجديدة).
+    """
+    with transaction.atomic():
+        canonical = {
+            (text_key(question.question_text), question.question_type): question
+            for question in series.questions.all()
+        }
+        next_order = (series.questions.aggregate(last=Max('order'))['last'] or 0) + 1
+        matched = created = 0
+        questions = list(survey.questions.select_related('series_question').order_by('order', 'id'))
+        for question in questions:
+            if question.series_question and question.series_question.series_id == series.pk:
+                continue
+            key = (text_key(question.question_text), question.question_type)
+            if key in canonical:
+                matched += 1
+            else:
+                canonical[key] = SeriesQuestion.objects.create(
+                    series=series, question_text=question.question_text,
+                    question_type=question.question_type, order=next_order,
+                )
+                next_order += 1
+                created += 1
+            question.series_question = canonical[key]
+        Question.objects.bulk_update(questions, ['series_question'])
+
+        survey.series = series
+        survey.wave_label = label or survey.wave_label or str(survey.start_date.year)
+        # الحفظ يبطل تعريف الاستبيان المحفوظ في الكاش (bulk_update لا يرسل إشارات)
+        survey.save(update_fields=['series', 'wave_label'])
+    return matched, created
+
+
+def remove_wave(survey):
+    """فصل استبيان عن سلسلته مع إلغاء ربط أسئلته"""
+    with transaction.atomic():
+        survey.questions.update(series_question=None)
+        survey.series = None
+        survey.wave_label = ''
+        survey.save(update_fields=['series', 'wave_label'])
+
+
+def _rate(part, whole):
+    return round(part / whole * 100, 1) if whole else 0
+
+
+class WaveComparison:
+    """
+    مقارنة نتائج أسئلة السلسلة عبر موجاتها: لكل سؤال موحد عدد الإجابات
+    ونسبها في كل موجة، ونسب الخيارات (موحدة بنص الخيار) أو المتوسط
+    والانحراف المعياري للأسئلة الرقمية، والاتجاه والتغير بين آخر موجتين.
+    تُقرأ من عدادات الأسئلة باستعلام واحد، وتُحفظ في الكاش بمفتاح يتضمن
+    إصدار بيانات كل موجة.
+
+    الاستخدام:
+        WaveComparison(series_id).build()
+    """
+
+    def __init__(self, series_id):
+        self.series = SurveySeries.objects.filter(pk=series_id).first()
+        if self.series is None:
+            raise ValueError('السلسلة غير موجودة')
+        self.waves = list(
+            Survey.objects.filter(series=self.series).order_by('start_date', 'id')
+            .values('id', 'title', 'wave_label', 'start_date', 'status', 'responses_received')
+        )
+
+    def cache_key(self):
+        versions = ','.join(f"{wave['id']}:{get_data_version(wave['id'])}" for wave in self.waves)
+        return f'survey_series:{self.series.pk}:{hashlib.md5(versions.encode()).hexdigest()}'
+
+    def build(self):
+        key = self.cache_key()
+        result = cache.get(key)
+        if result is None:
+            result = self._compute()
+            cache.set(key, result, WAVES_TIMEOUT)
+        return result
+
+    def _tallies(self):
+        """{(معرّف الموجة، سؤال السلسلة): {'total': عداد السؤال، 'choices': {مفتاح النص: [النص، العدد]}}}"""
+        rows = QuestionTally.objects.filter(
+            question__survey__series=self.series, question__series_question__isnull=False,
+        ).values_list(
+            'question__survey_id', 'question__series_question_id', 'choice__choice_text',
+            'count', 'value_sum', 'value_sum_sq',
+        )
+        tallies = {}
+        for survey_id, series_question_id, choice_text, count, value_sum, value_sum_sq in rows:
+            item = tallies.setdefault((survey_id, series_question_id), {'total': None, 'choices': {}})
+            if choice_text is None:
+                item['total'] = (count, value_sum, value_sum_sq)
+            else:
+                entry = item['choices'].setdefault(text_key(choice_text), [choice_text, 0])
+                entry[1] += count
+        return tallies
+
+    def _compute(self):
+        tallies = self._tallies()
+        labels = [wave['wave_label'] or wave['title'] for wave in self.waves]
+        questions = []
+        for series_question in self.series.questions.all():
+            question_type = series_question.question_type
+            choice_labels = {}
+            waves = []
+            for wave in self.waves:
+                item = tallies.get((wave['id'], series_question.pk))
+                count, value_sum, value_sum_sq = (item or {}).get('total') or (0, 0, 0)
+                result = {
+                    'survey_id': wave['id'],
+                    'answered': count,
+                    'response_rate': _rate(count, wave['responses_received']),
+                }
+                if question_type in CHOICE_TYPES:
+                    choices = (item or {}).get('choices', {})
+                    for key, (text, choice_count) in choices.items():
+                        choice_labels.setdefault(key, text)
+                    result['choices'] = {key: [choice_count, _rate(choice_count, count)] for key, (text, choice_count) in choices.items()}
+                elif question_type in NUMERIC_TYPES:
+                    average = float(value_sum) / count if count else None
+                    result['average'] = round(average, 3) if average is not None else None
+                    result['stddev'] = (
+                        round(max(float(value_sum_sq) / count - average ** 2, 0) ** 0.5, 3) if count else None
+                    )
+                waves.append(result)
+
+            entry = {
+                'id': series_question.pk,
+                'question_text': series_question.question_text,
+                'question_type': question_type,
+                'waves': waves,
+            }
+            if question_type in CHOICE_TYPES:
+                entry['choices'] = [
+                    {
+                        'label': text,
+                        'counts': [wave['choices'].get(key, [0, 0])[0] for wave in waves],
+                        'percentages': [wave['choices'].get(key, [0, 0])[1] for wave in waves],
+                    }
+                    for key, text in choice_labels.items()
+                ]
+                for choice in entry['choices']:
+                    choice['change'] = (
+                        round(choice['percentages'][-1] - choice['percentages'][-2], 1) if len(waves) > 1 else None
+                    )
+                for wave in waves:
+                    del wave['choices']
+            elif question_type in NUMERIC_TYPES:
+                averages = [wave['average'] for wave in waves]
+                entry['trend'] = averages
+                entry['change'] = (
+                    round(averages[-1] - averages[-2], 3)
+                    if len(averages) > 1 and None not in averages[-2:] else None
+                )
+            questions.append(entry)
+
+        return {
+            'series': {'id': self.series.pk, 'title': self.series.title, 'template_name': self.series.template_name},
+            'waves': [
+                {
+                    'survey_id': wave['id'],
+                    'label': label,
+                    'title': wave['title'],
+                    'status': wave['status'],
+                    'start_date': wave['start_date'].date().isoformat(),
+                    'responses': wave['responses_received'],
+                }
+                for wave, label in zip(self.waves, labels)
+            ],
+            'questions': questions,
+        }
@@ -0,0 +1,73 @@
+"""
+WhatsApp Status Webhook
+استقبال إشعارات حالة رسائل الواتساب (Graph API) والتحقق من توقيعها
+"""
+
+import hashlib
+import hmac
+
+from django.conf import settings
+
+
+def sign_payload(body, secret=None):
+    """قيمة ترويسة X-Hub-Signature-256 لمحتوى الطلب"""
+    secret = secret if secret is not None else getattr(settings, 'WHATSAPP_APP_SECRET', '')
+    return 'sha256=' + hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+
+
+def verify_signature(body, header):
+    """
+    التحقق من أن الطلب مرسل من Meta بتوقيع HMAC-SHA256 بسر التطبيق.
+    بدون سر تطبيق مضبوط تُرفض جميع الطلبات.
+    """
+    secret = getattr(settings, 'WHATSAPP_APP_SECRET', '')
+    if not secret or not header:
+        return False
+    return hmac.compare_digest(sign_payload(body, secret), header)
+
+
+def parse_statuses(payload):
+    """
+    استخراج إشعارات الحالة من محتوى الطلب بصيغة
+    entry[].changes[].value.statuses[]. يعيد قائمة من
+    (معرّف الرسالة، الحالة، الطابع الزمني، رسالة الخطأ).
+    """
+    statuses = []
+    for entry in payload.get('entry') or []:
+        for change in entry.get('changes') or []:
+            value = change.get('value') or {}
+            for status in value.get('statuses') or []:
+                message_id = status.get('id')
+                if not message_id or not status.get('status'):
+                    continue
+                error = ''
+                if status.get('errors'):
+                    first = status['errors'][0]
+                    error = f'{first.get("code", "")} {first.get("title") or first.get("message") or ""}'.strip()
+                try:
+                    timestamp = int(status.get('timestamp') or 0)
+                except (TypeError, ValueError):
+                    timestamp = 0
+                statuses.append((message_id, status['status'], timestamp, error))
+    return statuses
+
+
+def build_status_payload(statuses, phone_number_id=''):
+    """بناء محتوى طلب بصيغة Graph API من قائمة (معرّف الرسالة، الحالة، الطابع الزمني)"""
+    return {
+        'object': 'whatsapp_business_account',
+        'entry': [{
+            'id': phone_number_id or 'replay',
+            'changes': [{
+                'field': 'messages',
+                'value': {
+                    'messaging_product': 'whatsapp',
+                    'metadata': {'phone_number_id': phone_number_id},
+                    'statuses': [
+                        {'id': message_id, 'status': status, 'timestamp': str(timestamp)}
+                        for message_id, status, timestamp in statuses
+                    ],
+                },
+            }],
+        }],
+    }
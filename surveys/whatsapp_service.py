@@ -8,6 +8,8 @@ import json
 from django.conf import settings
 from django.core.cache import cache
 
+from .suppression import error_text
+
 
 class WhatsAppService:
     """خدمة إرسال رسائل الواتساب"""
@@ -18,15 +20,12 @@ class WhatsAppService:
         self.phone_number_id = getattr(settings, 'WHATSAPP_PHONE_NUMBER_ID', '')
     
     def send_message(self, phone_number, message):
-        """إرسال رسالة واتساب"""
+        """إرسال رسالة واتساب إلى رقم موحد بصيغة E.164 (phone_normalized)"""
         try:
-            # تنظيف رقم الهاتف
-            phone_number = self._clean_phone_number(phone_number)
-            
-            # إعداد الرسالة
+            # إعداد الرسالة (الواجهة تقبل الرقم الدولي دون علامة +)
             payload = {
                 "messaging_product": "whatsapp",
-                "to": phone_number,
+                "to": phone_number.lstrip('+'),
                 "type": "text",
                 "text": {
                     "body": message
@@ -69,20 +68,6 @@ class WhatsAppService:
         message = survey.get_whatsapp_message(graduate)
         return self.send_message(phone_number, message)
     
-    def _clean_phone_number(self, phone_number):
-        """تنظيف رقم الهاتف"""
-        # إزالة المسافات والرموز
-        cleaned = ''.join(filter(str.isdigit, str(phone_number)))
-        
-        # إضافة رمز البلد إذا لم يكن موجوداً
-        if not cleaned.startswith('966'):
-            if cleaned.startswith('0'):
-                cleaned = '966' + cleaned[1:]
-            else:
-                cleaned = '966' + cleaned
-        
-        return cleaned
-    
     def is_configured(self):
         """التحقق من إعداد الخدمة"""
         return bool(self.access_token and self.phone_number_id)
@@ -133,7 +118,7 @@ class EmailService:
     def __init__(self):
         self.from_email = getattr(settings, 'DEFAULT_FROM_EMAIL', 'noreply@example.com')
     
-    def send_survey_email(self, survey, graduate, request=None):
+    def send_survey_email(self, survey, graduate, request=None, connection=None, from_email=None):
         """إرسال استبيان عبر البريد الإلكتروني"""
         try:
             from django.core.mail import send_mail
@@ -151,9 +136,10 @@ class EmailService:
             send_mail(
                 subject,
                 message,
-                self.from_email,
+                from_email or self.from_email,
                 [graduate.email],
                 fail_silently=False,
+                connection=connection,
             )
             
             return {
@@ -164,19 +150,93 @@ class EmailService:
         except Exception as e:
             return {
                 'success': False,
-                'error': str(e)
+                'error': error_text(e)
+            }
+    
+    def send_invitation_email(self, survey, graduate, survey_url, subject=None, connection=None, from_email=None,
+                              tracking_pixel_url=None):
+        """إرسال دعوة استبيان برابط خاص بالخريج باستخدام قالب البريد (مع صورة تتبع الفتح إن وُجدت)"""
+        try:
+            from django.core.mail import send_mail
+            from django.template.loader import render_to_string
+            from django.utils.html import strip_tags
+            
+            html_message = render_to_string('surveys/survey_email_template.html', {
+                'graduate_name': graduate.full_name,
+                'survey_title': survey.title,
+                'survey_description': survey.description,
+                'survey_link': survey_url,
+                'tracking_pixel_url': tracking_pixel_url,
+            })
+            send_mail(
+                subject or f'دعوة للمشاركة في استبيان: {survey.title}',
+                strip_tags(html_message),
+                from_email or self.from_email,
+                [graduate.email],
+                html_message=html_message,
+                fail_silently=False,
+                connection=connection,
+            )
+            
+            return {
+                'success': True,
+                'message': 'تم إرسال البريد الإلكتروني بنجاح'
+            }
+            
+        except Exception as e:
+            return {
+                'success': False,
+                'error': error_text(e)
+            }
+    
+    def send_digest_email(self, graduate, items, connection=None, from_email=None):
+        """إرسال رسالة واحدة تجمع روابط عدة استبيانات للخريج (items: عنوان ووصف ورابط)"""
+        try:
+            from django.core.mail import send_mail
+            from django.template.loader import render_to_string
+            from django.utils.html import strip_tags
+            
+            html_message = render_to_string('surveys/survey_digest_email.html', {
+                'graduate_name': graduate.full_name,
+                'surveys': items,
+            })
+            send_mail(
+                f'دعوة للمشاركة في {len(items)} استبيانات',
+                strip_tags(html_message),
+                from_email or self.from_email,
+                [graduate.email],
+                html_message=html_message,
+                fail_silently=False,
+                connection=connection,
+            )
+            
+            return {
+                'success': True,
+                'message': 'تم إرسال البريد الإلكتروني بنجاح'
+            }
+            
+        except Exception as e:
+            return {
+                'success': False,
+                'error': error_text(e)
             }
     
     def send_survey_to_graduates(self, survey, graduates, request=None):
         """إرسال استبيان لجميع الخريجين عبر البريد الإلكتروني"""
+        from graduates.models import Graduate
+        from .suppression import annotate_suppressed
+        
         results = []
+        # استبعاد العناوين الموقوفة في نفس استعلام جلب الخريجين
+        graduate_ids = [getattr(graduate, 'pk', graduate) for graduate in graduates]
+        graduates = annotate_suppressed(Graduate.objects.filter(pk__in=graduate_ids))
         
         for graduate in graduates:
-            if not graduate.email:
+            if not graduate.email or graduate.email_suppressed:
                 results.append({
                     'graduate': graduate,
                     'success': False,
-                    'error': 'لا يوجد بريد إلكتروني'
+                    'error': 'لا يوجد بريد إلكتروني' if not graduate.email else 'البريد الإلكتروني موقوف بسبب فشل سابق'
                 })
                 continue
             
@@ -198,32 +258,68 @@ class SurveySender:
         self.email_service = EmailService()
     
     def send_survey(self, survey, graduates, request=None):
-        """إرسال استبيان بالطريقة المحددة"""
+        """
+        إرسال استبيان بالطريقة المحددة. عند اختيار القناتين تعمل كل قناة
+        كمسار متوازٍ مستقل بخيوطه وحدوده، وتُدمج النتائج لكل خريج.
+        """
+        from graduates.models import Graduate
+        from .dispatch import ChannelDispatcher
+        from .quotas import QuotaScheduler
+        from .suppression import annotate_suppressed
+        
+        channels = ['email', 'whatsapp'] if survey.send_method == 'both' else [survey.send_method]
         results = {
             'email': [],
             'whatsapp': [],
+            'recipients': [],
             'total_sent': 0,
             'total_failed': 0
         }
         
-        if survey.send_method in ['email', 'both']:
-            email_results = self.email_service.send_survey_to_graduates(survey, graduates, request)
-            results['email'] = email_results
-            
-            for result in email_results:
-                if result['success']:
-                    results['total_sent'] += 1
-                else:
-                    results['total_failed'] += 1
+        graduate_ids = [getattr(graduate, 'pk', graduate) for graduate in graduates]
+        graduates = list(annotate_suppressed(Graduate.objects.filter(pk__in=graduate_ids)))
+        contacts = {
+            'email': lambda g: g.email and not g.email_suppressed,
+            'whatsapp': lambda g: g.phone_normalized and not g.phone_suppressed,
+        }
+        senders = {
+            'email': lambda g, account: self._outcome(self.email_service.send_survey_email(
+                survey, g, request, connection=account.get_connection(), from_email=account.from_email
+            )),
+            'whatsapp': lambda g, account: self._outcome(
+                account.get_whatsapp_service().send_survey_message(g.phone_normalized, survey, g)
+            ),
+        }
+        outcomes = ChannelDispatcher(QuotaScheduler(channels)).dispatch(
+            {channel: [(g.pk, g) for g in graduates if contacts[channel](g)] for channel in channels},
+            {channel: senders[channel] for channel in channels},
+        )
         
-        if survey.send_method in ['whatsapp', 'both']:
-            whatsapp_results = self.whatsapp_service.send_survey_to_graduates(survey, graduates)
-            results['whatsapp'] = whatsapp_results
-            
-            for result in whatsapp_results:
-                if result['success']:
+        for graduate in graduates:
+            recipient = {'graduate': graduate, 'success': False, 'channels': {}}
+            for channel in channels:
+                outcome, error, message_id = outcomes.get(graduate.pk, {}).get(
+                    channel, ('failed', 'لا توجد بيانات تواصل أو العنوان موقوف', '')
+                )
+                if outcome == 'deferred':
+                    outcome, error = 'failed', 'تم تجاوز حصة الإرسال المتاحة حالياً'
+                entry = {
+                    'graduate': graduate, 'success': outcome == 'sent',
+                    'error': error or None, 'message_id': message_id,
+                }
+                results[channel].append(entry)
+                recipient['channels'][channel] = entry
+                recipient['success'] = recipient['success'] or entry['success']
+                if entry['success']:
                     results['total_sent'] += 1
                 else:
                     results['total_failed'] += 1
+            results['recipients'].append(recipient)
         
-        return results 
\ No newline at end of file
+        return results
+    
+    def _outcome(self, result):
+        """تحويل نتيجة خدمة الإرسال إلى (النتيجة، رسالة الخطأ، معرّف الرسالة)"""
+        if result['success']:
+            return 'sent', '', result.get('message_id') or ''
+        return 'failed', result.get('error') or '', ''